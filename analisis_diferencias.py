@@ -0,0 +1,250 @@
+"""Análisis de las diferencias del recuento: totales de FALTANTE y SOBRANTE por pasillo y por
+artículo (en bultos y en unidades) y la tasa de diferencias de cada pasillo sobre su stock.
+
+La hoja Diferencias se lee una vez y se vuelve a leer solo si esa hoja cambió; se le suman las
+diferencias anotadas que todavía no se guardaron en el Excel, así el resumen se puede sacar en
+cualquier momento del recuento.
+"""
+import os
+import threading
+import numpy as np
+import pandas as pd
+from inventario import (
+    obtener_inventario, obtener_ruta, elegir_motor, huellas_hojas, firma_archivo, normalizar_stock, SEPARADOR_SNAPSHOT
+)
+from diferencias import HOJA_DIFERENCIAS, ENCABEZADOS_DIFERENCIAS, DiarioDiferencias
+from consultas import FilasReporte
+from reportes import crear_pdf_resumen_diferencias, crear_pdf_detalle_diferencias
+from cliente import es_servidor, obtener_cliente
+from medicion import etapa, contar
+
+FALTANTE = "FALTANTE"
+SOBRANTE = "SOBRANTE"
+# Una diferencia se identifica por la fila del stock (dónde, qué y en qué pallet) y su estado
+CLAVE = ['Localizador', 'Artículo', 'LPN']
+
+COLUMNAS_DETALLE = ['Pasillo', 'Localizador', 'Artículo', 'Desc Artículo', 'Bultos', 'Unidades', 'LPN', 'Estado']
+COLUMNAS_PASILLOS = ['Pasillo', 'Filas Stock', 'Bultos Stock', 'Filas Faltantes', 'Bultos Faltantes',
+                     'Filas Sobrantes', 'Bultos Sobrantes', 'Neto Bultos', '% Filas', '% Bultos']
+COLUMNAS_ARTICULOS = ['Artículo', 'Desc Artículo', 'Bultos Faltantes', 'Bultos Sobrantes', 'Neto Bultos',
+                      'Neto Unidades', 'Localizadores']
+
+NOMBRE_RESUMEN = "Diferencias_resumen"
+NOMBRE_DETALLE = "Diferencias_detalle"
+
+# Hoja Diferencias ya leída de cada Excel: ruta -> (huella de la hoja, DataFrame)
+_hojas_leidas = {}
+_lock_hojas = threading.Lock()
+
+
+def _leer_hoja(ruta_archivo, motor):
+    """Filas de la hoja Diferencias (como texto) y la cantidad de filas de la hoja con el encabezado"""
+    huellas = huellas_hojas(ruta_archivo)
+    if huellas is not None and HOJA_DIFERENCIAS not in huellas:
+        return pd.DataFrame(columns=ENCABEZADOS_DIFERENCIAS), 0
+    # Un .xls no tiene huellas por hoja: se vuelve a leer si cambió el archivo
+    huella = huellas[HOJA_DIFERENCIAS] if huellas is not None else firma_archivo(ruta_archivo)
+
+    with _lock_hojas:
+        leida = _hojas_leidas.get(ruta_archivo)
+    if leida is not None and leida[0] == huella:
+        return leida[1]
+
+    motor = elegir_motor(motor, ruta_archivo)
+    try:
+        hoja = pd.read_excel(ruta_archivo, sheet_name=HOJA_DIFERENCIAS, engine="openpyxl" if motor and motor.startswith("openpyxl") else motor,
+                             dtype={columna: str for columna in CLAVE})
+        resultado = (hoja.reindex(columns=ENCABEZADOS_DIFERENCIAS), len(hoja) + 1)
+    except ValueError:
+        # Sin hoja Diferencias todavía
+        resultado = (pd.DataFrame(columns=ENCABEZADOS_DIFERENCIAS), 0)
+
+    with _lock_hojas:
+        _hojas_leidas[ruta_archivo] = (huella, resultado)
+    return resultado
+
+
+def leer_diferencias(ruta_archivo, motor="auto"):
+    """Todas las diferencias del Excel: las de la hoja Diferencias más las pendientes de guardar.
+    Devuelve (DataFrame con las columnas de la hoja, cantidad de filas sin guardar)."""
+    hoja, filas_hoja = _leer_hoja(ruta_archivo, motor)
+    pendientes = DiarioDiferencias(ruta_archivo).filas_pendientes(filas_hoja)
+    if not pendientes:
+        return hoja, 0
+    pendientes = pd.DataFrame(pendientes, columns=ENCABEZADOS_DIFERENCIAS)
+    return pd.concat([hoja.astype(object), pendientes], ignore_index=True), len(pendientes)
+
+
+def _bultos_en_stock(diferencias, stock):
+    # Bultos de esas filas en el stock cargado (para las anotadas a mano sin cantidad)
+    en_stock = stock[CLAVE + ['En Mano Bultos']].astype({columna: str for columna in CLAVE})
+    en_stock = en_stock.groupby(CLAVE, sort=False)['En Mano Bultos'].sum()
+    return en_stock.reindex(pd.MultiIndex.from_frame(diferencias[CLAVE])).fillna(0).to_numpy(np.int64)
+
+
+def _tasa(parte, total):
+    # Porcentaje con un decimal; NaN si no hay stock para comparar
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.round(np.where(total > 0, parte * 100.0 / np.where(total > 0, total, 1), np.nan), 1)
+
+
+def analizar_diferencias(diferencias, inventario):
+    """Cruza las diferencias con una carga del inventario (inventario.datos), todo por columnas:
+    - detalle: cada diferencia con su pasillo, bultos y unidades (bultos x 'u x b' de Conversiones)
+    - pasillos: filas y bultos faltantes/sobrantes por pasillo, neto y % sobre el stock del pasillo
+    - articulos: bultos faltantes/sobrantes por artículo, neto en bultos y en unidades
+    - totales: cantidades generales
+    Una misma fila anotada dos veces con el mismo estado cuenta una sola vez."""
+    filas_anotadas = len(diferencias)
+    # Misma limpieza que el stock: códigos como texto, En Mano entero y el localizador partido
+    detalle = normalizar_stock(diferencias)
+    detalle['Estado'] = detalle['Estado'].astype(object).where(detalle['Estado'].notna(), '').astype(str).str.strip().str.upper()
+    detalle = detalle[detalle['Estado'].isin([FALTANTE, SOBRANTE])]
+    detalle = detalle.drop_duplicates(CLAVE + ['Estado'], keep='last').reset_index(drop=True)
+
+    bultos = detalle['En Mano'].astype('Float64').to_numpy(np.float64, na_value=np.nan)
+    sin_cantidad = np.isnan(bultos)
+    if sin_cantidad.any():
+        bultos[sin_cantidad] = _bultos_en_stock(detalle[sin_cantidad], inventario.stock)
+    detalle['Bultos'] = bultos.astype(np.int64)
+    unidades_por_bulto = pd.to_numeric(detalle['Artículo'].map(inventario.unidades_por_bulto), errors='coerce')
+    detalle['Unidades'] = (detalle['Bultos'] * unidades_por_bulto.fillna(1)).astype(np.int64)
+    detalle['Pasillo'] = detalle['Pasillo'].astype(str)
+    detalle = detalle[COLUMNAS_DETALLE].sort_values(['Pasillo', 'Localizador', 'Artículo', 'Estado'], kind='stable', ignore_index=True)
+
+    faltante = (detalle['Estado'] == FALTANTE).to_numpy()
+    signo = np.where(faltante, -1, 1)
+    partes = pd.DataFrame({
+        'Pasillo': detalle['Pasillo'],
+        'Artículo': detalle['Artículo'],
+        'Filas Faltantes': faltante.astype(np.int64),
+        'Bultos Faltantes': np.where(faltante, detalle['Bultos'], 0),
+        'Filas Sobrantes': (~faltante).astype(np.int64),
+        'Bultos Sobrantes': np.where(faltante, 0, detalle['Bultos']),
+        'Neto Bultos': signo * detalle['Bultos'].to_numpy(),
+        'Neto Unidades': signo * detalle['Unidades'].to_numpy(),
+    })
+
+    # Por pasillo, contra el stock de ese pasillo
+    stock = inventario.stock
+    en_stock = stock.groupby('Pasillo', observed=True, sort=False).agg(
+        **{'Filas Stock': ('Artículo', 'size'), 'Bultos Stock': ('En Mano Bultos', 'sum')})
+    en_stock.index = en_stock.index.astype(str)
+    pasillos = partes.groupby('Pasillo', sort=True)[
+        ['Filas Faltantes', 'Bultos Faltantes', 'Filas Sobrantes', 'Bultos Sobrantes', 'Neto Bultos']].sum()
+    pasillos = pasillos.join(en_stock, how='left').fillna({'Filas Stock': 0, 'Bultos Stock': 0}).reset_index()
+    pasillos = pasillos.astype({'Filas Stock': np.int64, 'Bultos Stock': np.int64})
+    pasillos['% Filas'] = _tasa((pasillos['Filas Faltantes'] + pasillos['Filas Sobrantes']).to_numpy(), pasillos['Filas Stock'].to_numpy())
+    pasillos['% Bultos'] = _tasa((pasillos['Bultos Faltantes'] + pasillos['Bultos Sobrantes']).to_numpy(), pasillos['Bultos Stock'].to_numpy())
+    pasillos = pasillos[COLUMNAS_PASILLOS]
+
+    # Por artículo, de la mayor diferencia neta a la menor
+    articulos = partes.groupby('Artículo', sort=False).agg(**{
+        'Bultos Faltantes': ('Bultos Faltantes', 'sum'),
+        'Bultos Sobrantes': ('Bultos Sobrantes', 'sum'),
+        'Neto Bultos': ('Neto Bultos', 'sum'),
+        'Neto Unidades': ('Neto Unidades', 'sum'),
+    })
+    por_articulo = detalle.groupby('Artículo', sort=False)
+    articulos['Desc Artículo'] = por_articulo['Desc Artículo'].first()
+    articulos['Localizadores'] = por_articulo['Localizador'].nunique()
+    articulos = articulos.reset_index()
+    articulos = articulos.assign(orden=-articulos['Neto Bultos'].abs()).sort_values(['orden', 'Artículo'], kind='stable')
+    articulos = articulos[COLUMNAS_ARTICULOS].reset_index(drop=True)
+
+    totales = {
+        'filas_anotadas': filas_anotadas,
+        'filas_ignoradas': filas_anotadas - len(detalle),
+        'filas_faltantes': int(partes['Filas Faltantes'].sum()),
+        'bultos_faltantes': int(partes['Bultos Faltantes'].sum()),
+        'filas_sobrantes': int(partes['Filas Sobrantes'].sum()),
+        'bultos_sobrantes': int(partes['Bultos Sobrantes'].sum()),
+        'neto_bultos': int(partes['Neto Bultos'].sum()),
+        'neto_unidades': int(partes['Neto Unidades'].sum()),
+        'pasillos': len(pasillos),
+        'articulos': len(articulos),
+    }
+    return {'detalle': detalle, 'pasillos': pasillos, 'articulos': articulos, 'totales': totales}
+
+
+def analisis_a_json(analisis):
+    """El análisis como viaja desde el servidor: cada tabla como listas por columna"""
+    return {
+        nombre: {columna: valores.tolist() for columna, valores in tabla.items()} if isinstance(tabla, pd.DataFrame) else tabla
+        for nombre, tabla in analisis.items()
+    }
+
+
+def analisis_desde_json(datos):
+    columnas = {'detalle': COLUMNAS_DETALLE, 'pasillos': COLUMNAS_PASILLOS, 'articulos': COLUMNAS_ARTICULOS}
+    analisis = {nombre: pd.DataFrame(datos[nombre], columns=columnas[nombre]) for nombre in columnas}
+    analisis['totales'] = datos['totales']
+    return analisis
+
+
+def analisis_diferencias(archivo_excel):
+    """Lee las diferencias del Excel (más las pendientes) y las analiza contra su inventario.
+    Con un servidor de consultas, el análisis lo hace el servidor con su Excel."""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        raise ValueError("No se ha seleccionado ningún archivo")
+
+    if es_servidor(ruta_archivo):
+        with etapa("servidor"):
+            return analisis_desde_json(obtener_cliente(ruta_archivo).analisis_diferencias())
+    if SEPARADOR_SNAPSHOT in ruta_archivo:
+        raise ValueError("Los snapshots del historial no tienen diferencias: seleccionar el Excel del recuento")
+
+    with etapa("lectura"):
+        inventario = obtener_inventario(ruta_archivo)
+        diferencias, sin_guardar = leer_diferencias(ruta_archivo, inventario.motor)
+    with etapa("análisis"):
+        analisis = analizar_diferencias(diferencias, inventario.datos)
+    analisis['totales'].update(archivo=os.path.basename(ruta_archivo), sin_guardar=sin_guardar)
+    contar("filas", len(analisis['detalle']))
+    return analisis
+
+
+def _renglones_totales(totales):
+    renglones = [
+        f"Faltantes: {totales['filas_faltantes']} filas, {totales['bultos_faltantes']} bultos   ·   "
+        f"Sobrantes: {totales['filas_sobrantes']} filas, {totales['bultos_sobrantes']} bultos",
+        f"Neto: {totales['neto_bultos']:+d} bultos ({totales['neto_unidades']:+d} unidades)   ·   "
+        f"{totales['pasillos']} pasillos, {totales['articulos']} artículos",
+    ]
+    if totales.get('sin_guardar'):
+        renglones.append(f"Incluye {totales['sin_guardar']} filas anotadas que todavía no se guardaron en el Excel")
+    if totales['filas_ignoradas']:
+        renglones.append(f"{totales['filas_ignoradas']} filas repetidas o sin estado FALTANTE / SOBRANTE no se cuentan")
+    return renglones
+
+
+def _bloques_detalle(detalle):
+    # {título de la sección: filas por columna en el orden de la tabla del PDF}
+    columnas = ['Localizador', 'Artículo', 'Desc Artículo', 'Bultos', 'LPN', 'Estado']
+    bloques = {}
+    for pasillo, filas in detalle.groupby('Pasillo', sort=False):
+        faltan = filas.loc[filas['Estado'] == FALTANTE, 'Bultos'].sum()
+        sobran = filas.loc[filas['Estado'] == SOBRANTE, 'Bultos'].sum()
+        titulo = f"Pasillo {pasillo or '(sin pasillo)'} - faltan {faltan} y sobran {sobran} bultos"
+        bloques[titulo] = FilasReporte(filas[columna].tolist() for columna in columnas)
+    return bloques
+
+
+def reportes_diferencias(archivo_excel, carpeta_destino="pdfs", invariant=None):
+    """Arma Diferencias_resumen.pdf (totales, por pasillo y por artículo) y Diferencias_detalle.pdf
+    (cada diferencia, por pasillo) en carpeta_destino. Devuelve (ruta del resumen, ruta del detalle, totales)."""
+    analisis = analisis_diferencias(archivo_excel)
+    totales = analisis['totales']
+    titulo = f"Diferencias del recuento - {totales.get('archivo', '')}"
+
+    with etapa("pdf"):
+        ruta_resumen = crear_pdf_resumen_diferencias(
+            NOMBRE_RESUMEN, titulo, _renglones_totales(totales),
+            FilasReporte(analisis['pasillos'][columna].tolist() for columna in COLUMNAS_PASILLOS),
+            FilasReporte(analisis['articulos'][columna].tolist() for columna in COLUMNAS_ARTICULOS),
+            carpeta_destino, invariant=invariant
+        )
+        ruta_detalle = crear_pdf_detalle_diferencias(NOMBRE_DETALLE, titulo, _bloques_detalle(analisis['detalle']),
+                                                     carpeta_destino, invariant=invariant)
+    return ruta_resumen, ruta_detalle, totales
@@ -0,0 +1,267 @@
+"""Mediciones de rendimiento con libros de stock sintéticos (no son tests).
+
+Genera Excel con varias hojas de stock (localizadores Pxx.yyy.z.w / Dxx.yyy.z.w, filas en UN
+y en bultos) y una hoja Conversiones, y mide la carga, las búsquedas, el pase a bultos,
+el PDF de pasillo y el registro de diferencias con cada tamaño. También informa la memoria
+del inventario (bytes por fila) antes y después de compactar los tipos.
+
+Ejemplos:
+    python benchmark.py
+    python benchmark.py --filas 1000 10000 --salida bench_antes.json
+    python benchmark.py --salida bench_despues.json --comparar bench_antes.json
+
+Todo se ejecuta en una carpeta temporal (libros, caché, PDFs y diarios de diferencias),
+así no se tocan los archivos del proyecto.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from inventario import InventarioStore, obtener_inventario, memoria_stock, MOTORES, MOTOR_POR_DEFECTO, HOJAS_EXCLUIDAS
+from consultas import obtener_datos_por_articulo, obtener_datos_por_pasillo, obtener_datos_por_localizador, pasar_a_bultos
+from reportes import crear_pdf_pasillo
+from diferencias import agregar_diferencia
+
+TAMANIOS = [1000, 10000, 100000]
+HOJAS_STOCK = 3
+REPETICIONES = 5
+
+
+def generar_libro(ruta_archivo, filas, hojas=HOJAS_STOCK, semilla=1):
+    """Escribe un Excel sintético con `filas` filas de stock repartidas en `hojas` hojas.
+    Devuelve los artículos, localizadores y pasillos generados (para elegir qué buscar)."""
+    azar = random.Random(semilla)
+    articulos = [str(azar.randint(100000, 999999)) for _ in range(max(filas // 8, 10))]
+    pasillos = [f"P{n:02d}" for n in range(1, 41)] + [f"D{n:02d}" for n in range(1, 41)]
+
+    columnas = {nombre: [] for nombre in [
+        'Organización', 'Subinventario', 'Localizador', 'Artículo', 'Desc Artículo', 'Revisión', 'Lote',
+        'En Mano', 'UDM Primaria', 'Reservado', 'Disponible', 'Estado', 'Costo', 'Fecha', 'LPN'
+    ]}
+    for _ in range(filas):
+        articulo = azar.choice(articulos)
+        unidad = azar.random() < 0.6
+        columnas['Organización'].append('MAR')
+        columnas['Subinventario'].append('DEPOSITO')
+        columnas['Localizador'].append(
+            f"{azar.choice(pasillos)}.{azar.randint(1, 120):03d}.{azar.randint(1, 6)}.{azar.randint(1, 4)}"
+        )
+        columnas['Artículo'].append(int(articulo))
+        columnas['Desc Artículo'].append(f"PRODUCTO {articulo} X {azar.choice([6, 12, 24])} UN")
+        columnas['Revisión'].append(None)
+        columnas['Lote'].append(None)
+        columnas['En Mano'].append(azar.randint(1, 2400) if unidad else azar.randint(1, 120))
+        columnas['UDM Primaria'].append('UN' if unidad else 'BU')
+        columnas['Reservado'].append(0)
+        columnas['Disponible'].append(0)
+        columnas['Estado'].append('Activo')
+        columnas['Costo'].append(round(azar.uniform(10, 5000), 2))
+        columnas['Fecha'].append('2025-09-15')
+        columnas['LPN'].append(f"LPN{azar.randint(1, 10**7)}" if azar.random() < 0.5 else None)
+
+    stock = pd.DataFrame(columnas)
+    # Algunos artículos sin conversión, como pasa en los libros reales
+    conversiones = pd.DataFrame({
+        'Artículo': [int(articulo) for articulo in articulos if azar.random() < 0.9],
+    })
+    conversiones['u x b'] = [azar.choice([6, 12, 24, 48]) for _ in range(len(conversiones))]
+
+    tamanio_hoja = -(-filas // hojas)
+    with pd.ExcelWriter(ruta_archivo) as writer:
+        for numero in range(hojas):
+            hoja = stock.iloc[numero * tamanio_hoja:(numero + 1) * tamanio_hoja]
+            hoja.to_excel(writer, sheet_name=f"Stock{numero + 1}", index=False)
+        conversiones.to_excel(writer, sheet_name='Conversiones', index=False)
+
+    return articulos, stock['Localizador'].tolist(), pasillos
+
+
+def medir(funcion, repeticiones=REPETICIONES):
+    """Corre la función varias veces y devuelve los tiempos en segundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def _resultado(nombre, filas, tiempos, **extra):
+    return dict({
+        "funcion": nombre,
+        "filas": filas,
+        "repeticiones": len(tiempos),
+        "mediana": statistics.median(tiempos),
+        "minimo": min(tiempos),
+        "maximo": max(tiempos),
+    }, **extra)
+
+
+def medir_memoria(inventario, filas):
+    """Bytes por fila del inventario tal como sale de normalizar cada hoja (antes)
+    y todo lo que queda en memoria ya compactado (después)"""
+    partes = [inventario.hoja(nombre) for nombre in inventario.hojas if nombre not in HOJAS_EXCLUIDAS]
+    antes = memoria_stock(pd.concat(partes, ignore_index=True))
+    despues = inventario.memoria()
+    return {
+        "funcion": "memoria_stock",
+        "filas": filas,
+        "bytes_antes": antes["bytes"],
+        "bytes": despues["bytes"],
+        "bytes_por_fila_antes": antes["bytes_por_fila"],
+        "bytes_por_fila": despues["bytes_por_fila"],
+        "columnas_antes": antes["columnas"],
+        "columnas": despues["columnas"],
+    }
+
+
+def medir_tamanio(filas, carpeta, repeticiones=REPETICIONES, motor=MOTOR_POR_DEFECTO):
+    ruta_archivo = os.path.join(carpeta, f"stock_{filas}.xlsx")
+    inicio = time.perf_counter()
+    articulos, localizadores, pasillos = generar_libro(ruta_archivo, filas)
+    print(f"{filas} filas: libro generado en {time.perf_counter() - inicio:.1f} s", file=sys.stderr)
+
+    azar = random.Random(filas)
+    resultados = []
+
+    # Carga: siempre un inventario nuevo (desde el Excel y desde la caché en disco)
+    def cargar_excel():
+        InventarioStore(ruta_archivo, motor).cargar(reconstruir_cache=True)
+
+    def cargar_cache():
+        InventarioStore(ruta_archivo, motor).cargar()
+
+    # La carga del Excel es lo más lento: con menos repeticiones alcanza
+    resultados.append(_resultado("carga_excel", filas, medir(cargar_excel, max(1, repeticiones // 2))))
+    resultados.append(_resultado("carga_cache", filas, medir(cargar_cache, repeticiones)))
+
+    inventario = obtener_inventario(ruta_archivo, motor=motor)
+    resultados.append(medir_memoria(inventario, filas))
+
+    # Las búsquedas se miden sobre el inventario ya cargado (como en la aplicación)
+    busquedas = 50
+    muestra_articulos = [azar.choice(articulos) for _ in range(busquedas)]
+    muestra_localizadores = [azar.choice(localizadores) for _ in range(busquedas)]
+    muestra_pasillos = [azar.choice(pasillos) for _ in range(busquedas)]
+
+    def en_lote(funcion, valores):
+        return lambda: [funcion(valor, ruta_archivo) for valor in valores]
+
+    for nombre, funcion, valores in [
+        ("obtener_datos_por_articulo", obtener_datos_por_articulo, muestra_articulos),
+        ("obtener_datos_por_pasillo", obtener_datos_por_pasillo, muestra_pasillos),
+        ("obtener_datos_por_localizador", obtener_datos_por_localizador, muestra_localizadores),
+    ]:
+        tiempos = medir(en_lote(funcion, valores), repeticiones)
+        resultados.append(_resultado(nombre, filas, [t / busquedas for t in tiempos], llamadas=busquedas))
+
+    en_mano = [azar.randint(1, 2400) for _ in range(busquedas)]
+    tiempos = medir(lambda: [pasar_a_bultos(articulo, cantidad, ruta_archivo)
+                             for articulo, cantidad in zip(muestra_articulos, en_mano)], repeticiones)
+    resultados.append(_resultado("pasar_a_bultos", filas, [t / busquedas for t in tiempos], llamadas=busquedas))
+
+    # PDF del pasillo más grande
+    pasillo = max(pasillos, key=lambda p: len(inventario.filas_por_pasillo(p)))
+    datos_por_pasillo = obtener_datos_por_pasillo(pasillo, ruta_archivo)
+    carpeta_pdfs = os.path.join(carpeta, "pdfs")
+    tiempos = medir(lambda: crear_pdf_pasillo(pasillo, datos_por_pasillo, carpeta_pdfs, invariant=1, cache=False), repeticiones)
+    ruta_pdf = os.path.join(carpeta_pdfs, f"pasillo{pasillo}.pdf")
+    resultados.append(_resultado("crear_pdf_pasillo", filas, tiempos,
+                                 filas_pdf=len(datos_por_pasillo), bytes_pdf=os.path.getsize(ruta_pdf)))
+    # Reimpresión sin cambios: hash de las filas + PDF tomado de la caché
+    crear_pdf_pasillo(pasillo, datos_por_pasillo, carpeta_pdfs, invariant=1)
+    tiempos = medir(lambda: crear_pdf_pasillo(pasillo, datos_por_pasillo, carpeta_pdfs, invariant=1), repeticiones)
+    resultados.append(_resultado("crear_pdf_pasillo_cache", filas, tiempos, filas_pdf=len(datos_por_pasillo)))
+
+    # Diferencias: solo el registro en el diario (el volcado al Excel se hace al guardar)
+    datos = obtener_datos_por_localizador(muestra_localizadores[0], ruta_archivo)
+    tiempos = medir(lambda: agregar_diferencia(datos, "FALTANTE", ruta_archivo), repeticiones)
+    resultados.append(_resultado("agregar_diferencia", filas, tiempos))
+
+    return resultados
+
+
+def comparar(actuales, anteriores):
+    """Tabla de tiempos actuales contra una corrida anterior (cociente < 1 = más rápido)"""
+    previos = {(r["funcion"], r["filas"]): r for r in anteriores["resultados"]}
+    lineas = [f"{'función':<32}{'filas':>8}{'antes (ms)':>14}{'ahora (ms)':>14}{'cociente':>10}"]
+    for resultado in actuales["resultados"]:
+        previo = previos.get((resultado["funcion"], resultado["filas"]))
+        if previo is None or "mediana" not in resultado:
+            continue
+        cociente = resultado["mediana"] / previo["mediana"] if previo["mediana"] else float('nan')
+        lineas.append(
+            f"{resultado['funcion']:<32}{resultado['filas']:>8}"
+            f"{previo['mediana'] * 1000:>14.3f}{resultado['mediana'] * 1000:>14.3f}{cociente:>10.2f}"
+        )
+
+    # Memoria: bytes por fila del inventario en las dos corridas
+    for resultado in actuales["resultados"]:
+        previo = previos.get((resultado["funcion"], resultado["filas"]))
+        if "bytes_por_fila" in resultado:
+            antes = previo["bytes_por_fila"] if previo else resultado["bytes_por_fila_antes"]
+            lineas.append(f"{'bytes por fila':<32}{resultado['filas']:>8}{antes:>14.1f}{resultado['bytes_por_fila']:>14.1f}"
+                          f"{resultado['bytes_por_fila'] / antes if antes else float('nan'):>10.2f}")
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide carga, búsquedas y PDFs con libros sintéticos")
+    parser.add_argument("--filas", type=int, nargs="+", default=TAMANIOS, help="tamaños a medir (por defecto 1000 10000 100000)")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--motor", choices=[MOTOR_POR_DEFECTO] + MOTORES, default=MOTOR_POR_DEFECTO, help="lector del Excel")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--conservar", action="store_true", help="no borrar la carpeta temporal (libros y PDFs)")
+    args = parser.parse_args(argv)
+
+    # Caché, PDFs y diarios usan rutas relativas: todo queda dentro de la carpeta temporal
+    carpeta = tempfile.mkdtemp(prefix="benchmark_")
+    directorio_original = os.getcwd()
+    os.chdir(carpeta)
+
+    try:
+        resultados = []
+        for filas in args.filas:
+            resultados.extend(medir_tamanio(filas, carpeta, args.repeticiones, args.motor))
+    finally:
+        os.chdir(directorio_original)
+        if args.conservar:
+            print(f"Archivos en {carpeta}", file=sys.stderr)
+        else:
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+    informe = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "motor": args.motor,
+        "resultados": resultados,
+    }
+
+    texto = json.dumps(informe, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            print(comparar(informe, json.load(f)), file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
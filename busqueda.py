@@ -0,0 +1,143 @@
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+# Puntaje de cada palabra buscada según cómo aparece en la descripción (o en el código)
+PUNTAJE_CODIGO = 4
+PUNTAJE_PALABRA = 3
+PUNTAJE_PREFIJO = 2
+PUNTAJE_SUBCADENA = 1
+
+LARGO_MINIMO = 2
+LIMITE_SUGERENCIAS = 10
+
+
+def plegar_texto(texto):
+    """Minúsculas, sin acentos y solo letras/números separados por espacios ("Azúcar x1Kg" -> "azucar x1kg")"""
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^0-9a-z]+', ' ', texto.lower()).strip()
+
+
+def plegar_serie(serie):
+    # Lo mismo que plegar_texto, pero para una columna entera de una vez
+    plegada = serie.astype(str).str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    return plegada.str.lower().str.replace(r'[^0-9a-z]+', ' ', regex=True).str.strip()
+
+
+def trigramas(palabra):
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+class IndiceDescripciones:
+    """Índice de búsqueda por descripción: palabras plegadas (sin acentos) -> artículos,
+    más trigramas de cada palabra para encontrar pedazos de palabra ("azuc", "ucar").
+    Se arma una vez por carga del inventario."""
+
+    def __init__(self, stock):
+        # Una entrada por artículo, con la primera descripción (como obtener_descripcion)
+        pares = stock[['Artículo', 'Desc Artículo']].drop_duplicates('Artículo')
+        pares = pares[pares['Artículo'].astype(str) != '']
+        self.articulos = pares['Artículo'].astype(str).tolist()
+        self.descripciones = pares['Desc Artículo'].astype(str).tolist()
+
+        # Palabra -> entradas: se ordena por palabra y cada una ocupa un tramo del arreglo de entradas
+        palabras = plegar_serie(pd.Series(self.descripciones, dtype=object)).str.split().explode().dropna()
+        tabla = pd.DataFrame({'palabra': palabras.to_numpy(dtype=object), 'entrada': palabras.index.to_numpy()})
+        tabla = tabla.drop_duplicates().sort_values(['palabra', 'entrada'], kind='stable')
+        vocabulario, inicios = np.unique(tabla['palabra'].to_numpy(dtype=object), return_index=True)
+        self.vocabulario = vocabulario.tolist()
+        self._entradas = tabla['entrada'].to_numpy(dtype=np.int32)
+        self._inicios = np.append(inicios, len(self._entradas))
+
+        # Trigrama -> palabras del vocabulario que lo contienen
+        self._trigramas = {}
+        for numero, palabra in enumerate(self.vocabulario):
+            for trigrama in trigramas(palabra):
+                self._trigramas.setdefault(trigrama, []).append(numero)
+
+        # Códigos ordenados para buscar por prefijo de código
+        orden = np.argsort(np.array(self.articulos, dtype=object), kind='stable')
+        self._codigos = [self.articulos[i] for i in orden]
+        self._orden_codigos = orden
+
+    def __len__(self):
+        return len(self.articulos)
+
+    def _entradas_de(self, numero_palabra):
+        return self._entradas[self._inicios[numero_palabra]:self._inicios[numero_palabra + 1]]
+
+    def _palabras_que_contienen(self, termino):
+        """Números de palabra del vocabulario con su puntaje para el término"""
+        if len(termino) < 3:
+            # Muy corto para trigramas: palabras que empiezan así (por el vocabulario ordenado)
+            inicio = bisect_left(self.vocabulario, termino)
+            fin = bisect_left(self.vocabulario, termino + '\uffff')
+            encontradas = [(numero, PUNTAJE_PALABRA if self.vocabulario[numero] == termino else PUNTAJE_PREFIJO)
+                           for numero in range(inicio, fin)]
+            if len(termino) == LARGO_MINIMO:
+                # y con dos letras también adentro de la palabra ("er" -> yerba), recorriendo el vocabulario;
+                # una sola letra está en casi todas las palabras y no filtraría nada
+                encontradas += [(numero, PUNTAJE_SUBCADENA) for numero, palabra in enumerate(self.vocabulario)
+                                if termino in palabra and not palabra.startswith(termino)]
+            return encontradas
+
+        candidatas = None
+        for trigrama in trigramas(termino):
+            palabras = self._trigramas.get(trigrama)
+            if not palabras:
+                return []
+            candidatas = set(palabras) if candidatas is None else candidatas.intersection(palabras)
+            if not candidatas:
+                return []
+
+        encontradas = []
+        for numero in candidatas:
+            palabra = self.vocabulario[numero]
+            if palabra == termino:
+                encontradas.append((numero, PUNTAJE_PALABRA))
+            elif palabra.startswith(termino):
+                encontradas.append((numero, PUNTAJE_PREFIJO))
+            elif termino in palabra:
+                encontradas.append((numero, PUNTAJE_SUBCADENA))
+        return encontradas
+
+    def _puntajes_termino(self, termino):
+        """entrada -> mejor puntaje del término en esa entrada"""
+        puntajes = {}
+        for numero, puntaje in self._palabras_que_contienen(termino):
+            for entrada in self._entradas_de(numero).tolist():
+                if puntajes.get(entrada, 0) < puntaje:
+                    puntajes[entrada] = puntaje
+
+        if termino.isdigit():
+            inicio = bisect_left(self._codigos, termino)
+            fin = bisect_left(self._codigos, termino + '\uffff')
+            for entrada in self._orden_codigos[inicio:fin].tolist():
+                puntajes[entrada] = PUNTAJE_CODIGO
+        return puntajes
+
+    def buscar(self, texto, limite=LIMITE_SUGERENCIAS):
+        """Artículos cuya descripción tiene todas las palabras buscadas (enteras o como pedazo),
+        o cuyo código empieza con el número buscado. Devuelve [(articulo, descripcion)] del
+        más parecido al menos parecido."""
+        terminos = plegar_texto(texto).split()
+        if not terminos or len(''.join(terminos)) < LARGO_MINIMO:
+            return []
+
+        # Primero los términos más largos: suelen ser los más selectivos
+        total = None
+        for termino in sorted(set(terminos), key=len, reverse=True):
+            puntajes = self._puntajes_termino(termino)
+            if total is None:
+                total = puntajes
+            else:
+                total = {entrada: puntaje + puntajes[entrada] for entrada, puntaje in total.items() if entrada in puntajes}
+            if not total:
+                return []
+
+        mejores = heapq.nsmallest(limite, total.items(),
+                                  key=lambda item: (-item[1], self.descripciones[item[0]], self.articulos[item[0]]))
+        return [(self.articulos[entrada], self.descripciones[entrada]) for entrada, _ in mejores]
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import shutil
+import time
+import pandas as pd
+
+try:
+    from pyarrow import feather
+except ImportError:
+    # Sin pyarrow no hay caché en disco: se lee siempre el Excel
+    feather = None
+
+# Cambiar la versión cuando cambie cómo se normaliza el inventario (invalida las cachés viejas)
+VERSION_CACHE = 4
+CARPETA_CACHE = "cache"
+LIMITE_CACHE_BYTES = 500 * 1024 * 1024
+
+
+def cache_disponible():
+    return feather is not None
+
+
+def hash_archivo(ruta_archivo):
+    """Hash del contenido del Excel: el mismo export en otra PC o con otra fecha da la misma clave"""
+    h = hashlib.sha256()
+    with open(ruta_archivo, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def clave_cache(ruta_archivo):
+    return f"{hash_archivo(ruta_archivo)}-v{VERSION_CACHE}"
+
+
+def clave_hoja(huella):
+    return f"{huella}-v{VERSION_CACHE}"
+
+
+def _rutas_cache(clave, carpeta_cache):
+    return (os.path.join(carpeta_cache, f"{clave}.stock.feather"),
+            os.path.join(carpeta_cache, f"{clave}.conversiones.feather"))
+
+
+def leer_cache(clave, carpeta_cache=CARPETA_CACHE):
+    """Devuelve (stock, unidades_por_bulto) desde la caché, o None si no está"""
+    if feather is None:
+        return None
+
+    rutas = _rutas_cache(clave, carpeta_cache)
+    if not all(os.path.exists(ruta) for ruta in rutas):
+        return None
+
+    try:
+        # Sin compresión + memory_map: se mapea el archivo en vez de copiarlo
+        stock = feather.read_table(rutas[0], memory_map=True).to_pandas()
+        conversiones = feather.read_table(rutas[1], memory_map=True).to_pandas()
+    except Exception as e:
+        print(f"Error al leer la caché {clave}: {str(e)}")
+        return None
+
+    # Marcar como usada recién (para el orden LRU de la limpieza)
+    ahora = time.time()
+    for ruta in rutas:
+        try:
+            os.utime(ruta, (ahora, ahora))
+        except OSError:
+            pass
+
+    unidades_por_bulto = dict(zip(conversiones['Artículo'], conversiones['u x b']))
+    return stock, unidades_por_bulto
+
+
+def escribir_cache(clave, stock, unidades_por_bulto, carpeta_cache=CARPETA_CACHE, limite_bytes=LIMITE_CACHE_BYTES):
+    """Guarda el inventario normalizado y las conversiones en formato columnar"""
+    if feather is None:
+        return False
+
+    os.makedirs(carpeta_cache, exist_ok=True)
+    conversiones = pd.DataFrame({
+        'Artículo': list(unidades_por_bulto.keys()),
+        'u x b': list(unidades_por_bulto.values()),
+    })
+
+    for df, ruta in zip((stock, conversiones), _rutas_cache(clave, carpeta_cache)):
+        # Escribir a un temporal y renombrar: otra PC nunca lee un archivo a medio escribir
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            feather.write_feather(df, temporal, compression='uncompressed')
+            os.replace(temporal, ruta)
+        except Exception as e:
+            print(f"Error al escribir la caché {clave}: {str(e)}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return False
+
+    limpiar_cache(carpeta_cache, limite_bytes)
+    return True
+
+
+def _ruta_hoja(clave, carpeta_cache):
+    return os.path.join(carpeta_cache, f"{clave}.hoja.feather")
+
+
+def leer_cache_hoja(clave, carpeta_cache=CARPETA_CACHE):
+    """Datos ya procesados de una hoja (por huella de la hoja), o None si no están"""
+    ruta = _ruta_hoja(clave, carpeta_cache)
+    if feather is None or not os.path.exists(ruta):
+        return None
+
+    try:
+        df = feather.read_table(ruta, memory_map=True).to_pandas()
+    except Exception as e:
+        print(f"Error al leer la caché {clave}: {str(e)}")
+        return None
+
+    ahora = time.time()
+    try:
+        os.utime(ruta, (ahora, ahora))
+    except OSError:
+        pass
+    return df
+
+
+def escribir_cache_hoja(clave, df, carpeta_cache=CARPETA_CACHE, limite_bytes=LIMITE_CACHE_BYTES):
+    """Guarda los datos procesados de una hoja: si mañana cambia otra hoja, esta no se vuelve a leer"""
+    if feather is None:
+        return False
+
+    os.makedirs(carpeta_cache, exist_ok=True)
+    ruta = _ruta_hoja(clave, carpeta_cache)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(df, temporal, compression='uncompressed')
+        os.replace(temporal, ruta)
+    except Exception as e:
+        print(f"Error al escribir la caché {clave}: {str(e)}")
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+
+    limpiar_cache(carpeta_cache, limite_bytes)
+    return True
+
+
+def copiar_cache_hoja(clave_origen, clave_destino, carpeta_cache=CARPETA_CACHE):
+    """La misma hoja con otra huella (el libro se volvió a guardar sin tocarla): reusar sus datos"""
+    origen = _ruta_hoja(clave_origen, carpeta_cache)
+    destino = _ruta_hoja(clave_destino, carpeta_cache)
+    if feather is None or not os.path.exists(origen) or os.path.exists(destino):
+        return False
+
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(origen, temporal)
+        os.replace(temporal, destino)
+    except OSError as e:
+        print(f"Error al copiar la caché {clave_origen}: {str(e)}")
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+    return True
+
+
+def limpiar_cache(carpeta_cache=CARPETA_CACHE, limite_bytes=LIMITE_CACHE_BYTES):
+    """Borra las cachés usadas hace más tiempo hasta quedar por debajo del límite"""
+    if not os.path.isdir(carpeta_cache):
+        return
+
+    # clave -> [archivos, tamaño total, último uso]
+    entradas = {}
+    for nombre in os.listdir(carpeta_cache):
+        if not nombre.endswith('.feather'):
+            continue
+        ruta = os.path.join(carpeta_cache, nombre)
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue
+        entrada = entradas.setdefault(nombre.split('.')[0], [[], 0, 0])
+        entrada[0].append(ruta)
+        entrada[1] += estado.st_size
+        entrada[2] = max(entrada[2], estado.st_mtime)
+
+    total = sum(entrada[1] for entrada in entradas.values())
+    for archivos, tamanio, _ in sorted(entradas.values(), key=lambda entrada: entrada[2]):
+        if total <= limite_bytes:
+            break
+        for ruta in archivos:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+        total -= tamanio
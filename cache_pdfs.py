@@ -0,0 +1,177 @@
+"""Caché de los PDFs generados, por contenido.
+
+Cada reporte se identifica por un hash de sus datos (los mismos textos que se dibujan) y de
+VERSION_PDF. Si ya se generó un PDF con esa clave, se reutiliza en vez de volver a dibujarlo:
+reimprimir todo el depósito sin cambios en el stock es casi instantáneo.
+
+Los PDFs guardados quedan en <carpeta de PDFs>/.renders/<clave>.pdf con un manifiesto
+(tamaño y último uso de cada uno); cuando pasan de los límites se borran los menos usados.
+El PDF con su nombre de siempre (pasilloA.pdf, Articulo1.pdf...) es un enlace a ese archivo
+(o una copia, si el disco no admite enlaces).
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Cambiar la versión cuando cambie cómo se dibujan los reportes (invalida los PDFs guardados)
+VERSION_PDF = 1
+CARPETA_RENDERS = ".renders"
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+MAXIMO_RENDERS = 2000
+LIMITE_RENDERS_BYTES = 256 * 1024 * 1024
+
+_lock_manifiesto = threading.Lock()
+
+
+def _agregar_al_hash(resumen, valor):
+    columnas = getattr(valor, 'columnas', None)
+    if columnas is not None:
+        # FilasReporte: se hashea columna por columna
+        valor = columnas
+    if isinstance(valor, dict):
+        for clave, contenido in valor.items():
+            _agregar_al_hash(resumen, clave)
+            _agregar_al_hash(resumen, contenido)
+    elif isinstance(valor, (list, tuple)):
+        if valor and not isinstance(valor[0], (list, tuple, dict)) and getattr(valor[0], 'columnas', None) is None:
+            # Una columna de valores simples: un solo texto
+            resumen.update("\x1f".join(map(str, valor)).encode('utf-8', 'surrogatepass'))
+        else:
+            for item in valor:
+                _agregar_al_hash(resumen, item)
+        resumen.update(b"\x1e")
+        return
+    else:
+        resumen.update(str(valor).encode('utf-8', 'surrogatepass'))
+    resumen.update(b"\x1d")
+
+
+def clave_reporte(*partes):
+    """Hash del contenido de un reporte: tipo, nombre, opciones y filas (FilasReporte, listas de
+    tuplas o diccionarios de eso). Los mismos datos dan la misma clave en cualquier PC."""
+    resumen = hashlib.sha256(f"pdf-v{VERSION_PDF}".encode())
+    for parte in partes:
+        _agregar_al_hash(resumen, parte)
+    return resumen.hexdigest()
+
+
+def _enlazar(origen, destino):
+    # Enlace duro (no copia los bytes); si el disco no lo permite, copia. Se arma al lado y se
+    # reemplaza de una vez, así el destino nunca queda a medio escribir.
+    temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(origen, temporal)
+    except OSError:
+        shutil.copyfile(origen, temporal)
+    os.replace(temporal, destino)
+
+
+def soltar_enlace(ruta_pdf):
+    """Antes de escribir un PDF encima de otro: si es un enlace a uno guardado en la caché, se
+    borra primero, para no pisar el guardado escribiendo a través del enlace"""
+    try:
+        if os.stat(ruta_pdf).st_nlink > 1:
+            os.remove(ruta_pdf)
+    except FileNotFoundError:
+        pass
+
+
+class CachePdfs:
+    """PDFs guardados de una carpeta de destino. Se usa con with: al salir se actualiza el
+    manifiesto y se borran los PDFs guardados menos usados si se pasó de los límites."""
+
+    def __init__(self, carpeta_destino):
+        self.carpeta = os.path.join(carpeta_destino, CARPETA_RENDERS)
+        self.ruta_manifiesto = os.path.join(self.carpeta, ARCHIVO_MANIFIESTO)
+        self._usados = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *error):
+        self.guardar_manifiesto()
+
+    def _ruta(self, clave):
+        return os.path.join(self.carpeta, f"{clave}.pdf")
+
+    def reutilizar(self, clave, ruta_destino):
+        """Si hay un PDF guardado con esa clave lo deja en ruta_destino y devuelve True"""
+        ruta = self._ruta(clave)
+        try:
+            tamanio = os.path.getsize(ruta)
+            # Ya es el mismo archivo (el caso de reimprimir sin cambios): no hay nada que hacer
+            if not (os.path.exists(ruta_destino) and os.path.samefile(ruta, ruta_destino)):
+                _enlazar(ruta, ruta_destino)
+        except OSError:
+            return False
+        self._usados[clave] = {"tamanio": tamanio, "usado": time.time()}
+        return True
+
+    def registrar(self, clave, ruta_generada):
+        """Guarda un PDF recién generado bajo su clave"""
+        ruta = self._ruta(clave)
+        try:
+            os.makedirs(self.carpeta, exist_ok=True)
+            if not os.path.exists(ruta):
+                _enlazar(ruta_generada, ruta)
+            self._usados[clave] = {"tamanio": os.path.getsize(ruta), "usado": time.time()}
+        except OSError as e:
+            # Sin caché el PDF sigue estando donde se pidió
+            print(f"Error al guardar el PDF en la caché: {str(e)}")
+
+    def _leer_manifiesto(self):
+        try:
+            with open(self.ruta_manifiesto, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def guardar_manifiesto(self):
+        if not self._usados:
+            return
+        with _lock_manifiesto:
+            manifiesto = self._leer_manifiesto()
+            manifiesto.update(self._usados)
+            self._usados = {}
+
+            # Los PDFs guardados que no están en el manifiesto (por ejemplo, de otro proceso que
+            # escribió al mismo tiempo) también cuentan, con la fecha del archivo como último uso
+            try:
+                nombres = os.listdir(self.carpeta)
+            except OSError:
+                return
+            presentes = {}
+            for nombre in nombres:
+                if not nombre.endswith(".pdf"):
+                    continue
+                clave = nombre[:-4]
+                entrada = manifiesto.get(clave)
+                if entrada is None:
+                    try:
+                        estado = os.stat(os.path.join(self.carpeta, nombre))
+                    except OSError:
+                        continue
+                    entrada = {"tamanio": estado.st_size, "usado": estado.st_mtime}
+                presentes[clave] = entrada
+
+            # Se borran los menos usados hasta quedar dentro de los límites
+            total = sum(entrada["tamanio"] for entrada in presentes.values())
+            for clave in sorted(presentes, key=lambda c: presentes[c]["usado"]):
+                if len(presentes) <= MAXIMO_RENDERS and total <= LIMITE_RENDERS_BYTES:
+                    break
+                try:
+                    os.remove(self._ruta(clave))
+                except OSError:
+                    continue
+                total -= presentes.pop(clave)["tamanio"]
+
+            temporal = f"{self.ruta_manifiesto}.tmp"
+            try:
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(presentes, f)
+                os.replace(temporal, self.ruta_manifiesto)
+            except OSError as e:
+                print(f"Error al guardar el manifiesto de la caché de PDFs: {str(e)}")
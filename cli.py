@@ -0,0 +1,345 @@
+"""Generación de reportes sin interfaz gráfica (para tareas programadas).
+
+Ejemplos:
+    python cli.py articulo 123456 654321 --archivo stock.xlsx
+    python cli.py articulo --lista recuento.csv --combinado Recuento --archivo stock.xlsx
+    python cli.py pasillos --filtro "P*" --archivo stock.xlsx --trabajadores 4
+    python cli.py diferencia P02.041.3.1 --estado FALTANTE --guardar --archivo stock.xlsx
+    python cli.py buscar "azucar 1kg" --archivo stock.xlsx
+    python cli.py comparar stock_ayer.xlsx --archivo stock.xlsx
+    python cli.py resumen-diferencias --archivo stock.xlsx
+    python cli.py importar stock_lunes.xlsx stock_martes.xlsx --db historial.db
+    python cli.py historial 123456 --desde 2025-09-01 --db historial.db
+
+Códigos de salida: 0 todo bien, 1 error, 2 argumentos inválidos, 3 algún reporte sin datos
+(en comparar: ningún cambio entre los dos libros; en resumen-diferencias: ninguna diferencia anotada;
+en historial: el artículo o localizador no aparece en ningún snapshot).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from inventario import obtener_inventario, MOTORES, MOTOR_POR_DEFECTO
+from reportes import renderizar_pdfs, contar_paginas, crear_pdf_articulos
+from consultas import (
+    trabajos_pasillos, trabajos_articulos, obtener_datos_por_articulos, obtener_datos_por_pasillo,
+    obtener_datos_por_localizador, leer_codigos, buscar_por_descripcion
+)
+from diferencias import agregar_diferencia, guardar_diferencias, diferencias_pendientes
+from comparacion import comparar_libros
+from analisis_diferencias import reportes_diferencias
+from historial import RUTA_HISTORIAL, importar_libro, listar_snapshots, historial_articulo, historial_localizador
+from cliente import es_servidor, obtener_cliente
+from medicion import medir_operacion, activar_perfil, etapa
+
+SALIDA_OK = 0
+SALIDA_ERROR = 1
+SALIDA_SIN_DATOS = 3
+
+COLUMNAS_LOCALIZADOR = ["Localizador", "Artículo", "Desc Artículo", "En Mano", "LPN"]
+
+
+def _codigos(args):
+    codigos = list(args.codigos)
+    for ruta_lista in args.lista or []:
+        codigos.extend(leer_codigos(ruta_lista))
+    return codigos
+
+
+def _json(valor):
+    # Los valores de numpy/pandas no son serializables tal cual
+    if valor is None or valor != valor:
+        return None
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def _renderizar(trabajos, args):
+    """Renderiza los trabajos y arma el detalle de cada reporte para el resumen"""
+    with etapa("pdf"):
+        resultados = renderizar_pdfs(trabajos, args.trabajadores, detalle=True, cache=not args.sin_cache)
+    reportes = []
+    for (_, nombre, datos, _), (ruta, segundos) in zip(trabajos, resultados):
+        reportes.append({
+            "nombre": nombre,
+            "ruta": ruta,
+            "filas": len(datos),
+            "paginas": contar_paginas(ruta),
+            "segundos": round(segundos, 3),
+        })
+    return reportes
+
+
+def comando_articulo(args, resumen):
+    codigos = _codigos(args)
+    if not codigos:
+        raise ValueError("No se indicó ningún artículo")
+
+    if args.combinado:
+        inicio = time.perf_counter()
+        datos_por_articulo, no_encontrados = obtener_datos_por_articulos(codigos, args.archivo)
+        with etapa("pdf"):
+            ruta_pdf = crear_pdf_articulos(args.combinado, datos_por_articulo, no_encontrados, args.salida,
+                                           cache=not args.sin_cache)
+        resumen["reportes"] = [{
+            "nombre": args.combinado,
+            "ruta": ruta_pdf,
+            "filas": sum(len(filas) for filas in datos_por_articulo.values()),
+            "paginas": contar_paginas(ruta_pdf),
+            "segundos": round(time.perf_counter() - inicio, 3),
+        }]
+        resumen["sin_datos"] += no_encontrados
+        return
+
+    trabajos = trabajos_articulos(codigos, args.archivo, args.salida)
+    resumen["reportes"] = _renderizar(trabajos, args)
+
+
+def comando_pasillo(args, resumen):
+    pasillos = [pasillo.strip().upper() for pasillo in _codigos(args)]
+    trabajos = [("pasillo", pasillo, obtener_datos_por_pasillo(pasillo, args.archivo), args.salida) for pasillo in pasillos]
+    if not trabajos:
+        raise ValueError("No se indicó ningún pasillo")
+    resumen["reportes"] = _renderizar(trabajos, args)
+
+
+def comando_pasillos(args, resumen):
+    trabajos = trabajos_pasillos(args.archivo, args.filtro, args.salida)
+    resumen["reportes"] = _renderizar(trabajos, args)
+
+
+def comando_localizador(args, resumen):
+    localizadores = []
+    for localizador in _codigos(args):
+        filas = obtener_datos_por_localizador(localizador, args.archivo)
+        localizadores.append({
+            "localizador": localizador,
+            "filas": [dict(zip(COLUMNAS_LOCALIZADOR, map(_json, fila))) for fila in filas],
+        })
+        if not filas:
+            resumen["sin_datos"].append(localizador)
+    resumen["localizadores"] = localizadores
+
+
+def comando_buscar(args, resumen):
+    texto = " ".join(args.texto)
+    sugerencias = buscar_por_descripcion(texto, args.archivo, args.limite)
+    resumen["articulos"] = [
+        {"articulo": articulo, "descripcion": descripcion, "localizadores": localizadores}
+        for articulo, descripcion, localizadores in sugerencias
+    ]
+    if not sugerencias:
+        resumen["sin_datos"].append(texto)
+
+
+def comando_comparar(args, resumen):
+    inicio = time.perf_counter()
+    ruta_pdf, ruta_xlsx, cambios = comparar_libros(args.anterior, args.archivo, args.salida)
+    resumen["anterior"] = args.anterior
+    resumen["cambios"] = cambios
+    resumen["excel"] = ruta_xlsx
+    resumen["reportes"] = [{
+        "nombre": os.path.splitext(os.path.basename(ruta_pdf))[0],
+        "ruta": ruta_pdf,
+        "filas": sum(cambios.values()),
+        "paginas": contar_paginas(ruta_pdf),
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }]
+
+
+def comando_resumen_diferencias(args, resumen):
+    inicio = time.perf_counter()
+    ruta_resumen, ruta_detalle, totales = reportes_diferencias(args.archivo, args.salida)
+    resumen["totales"] = totales
+    segundos = round(time.perf_counter() - inicio, 3)
+    resumen["reportes"] = [{
+        "nombre": os.path.splitext(os.path.basename(ruta))[0],
+        "ruta": ruta,
+        "filas": filas,
+        "paginas": contar_paginas(ruta),
+        "segundos": segundos,
+    } for ruta, filas in [(ruta_resumen, totales["pasillos"]), (ruta_detalle, totales["filas_faltantes"] + totales["filas_sobrantes"])]]
+
+
+def comando_diferencia(args, resumen):
+    for localizador in _codigos(args):
+        datos = obtener_datos_por_localizador(localizador, args.archivo)
+        if not datos:
+            resumen["sin_datos"].append(localizador)
+            continue
+        with etapa("diario"):
+            if not agregar_diferencia(datos, args.estado, args.archivo):
+                raise RuntimeError(f"No se pudo anotar la diferencia de {localizador}")
+    resumen["pendientes"] = diferencias_pendientes(args.archivo)
+    if args.guardar:
+        with etapa("guardado"):
+            resumen["guardadas"] = guardar_diferencias(args.archivo)
+
+
+def comando_importar(args, resumen):
+    if args.fecha and len(args.libros) > 1:
+        raise ValueError("--fecha solo sirve para importar un libro (si no, todos quedarían en el mismo snapshot)")
+    if args.fecha:
+        datetime.strptime(args.fecha, "%Y-%m-%d")
+    for ruta in args.libros:
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No se encontró el archivo {ruta}")
+
+    importados = []
+    for ruta in args.libros:
+        with etapa("importacion"):
+            filas = importar_libro(ruta, args.fecha, args.db)
+        importados.append({"archivo": ruta, "filas": filas})
+    resumen["db"] = args.db
+    resumen["importados"] = importados
+    resumen["snapshots"] = [fecha for fecha, _, _ in listar_snapshots(args.db)]
+
+
+def comando_historial(args, resumen):
+    if not os.path.exists(args.db):
+        raise FileNotFoundError(f"No se encontró el historial {args.db}")
+
+    if args.localizador:
+        filas = historial_localizador(args.codigo, args.desde, args.hasta, args.db)
+        columnas = ["fecha", "articulo", "en_mano", "lpn"]
+    else:
+        filas = historial_articulo(args.codigo, args.desde, args.hasta, args.db)
+        columnas = ["fecha", "localizador", "en_mano", "lpn"]
+    resumen["db"] = args.db
+    resumen["historial"] = [dict(zip(columnas, fila)) for fila in filas]
+    if not filas:
+        resumen["sin_datos"].append(args.codigo)
+
+
+def armar_parser():
+    parser = argparse.ArgumentParser(description="Genera los reportes PDF del Excel de stock sin abrir la interfaz")
+    base = argparse.ArgumentParser(add_help=False)
+    base.add_argument("--resumen", help="además de imprimirlo, guardar el resumen JSON en este archivo")
+    base.add_argument("--perfil", action="store_true", help="guardar un perfil de cProfile en logs/perfiles")
+
+    comun = argparse.ArgumentParser(add_help=False, parents=[base])
+    comun.add_argument("--archivo", required=True, help="Excel de stock (o historial.db::AAAA-MM-DD, o http://PC:8765 de servidor.py)")
+    comun.add_argument("--salida", default="pdfs", help="carpeta de los PDFs (por defecto: pdfs)")
+    comun.add_argument("--trabajadores", type=int, default=None, help="procesos para renderizar (1 = sin procesos)")
+    comun.add_argument("--sin-cache", action="store_true", help="volver a dibujar los PDFs aunque sus datos no hayan cambiado")
+    comun.add_argument("--motor", choices=[MOTOR_POR_DEFECTO] + MOTORES, default=None, help="lector del Excel")
+    comun.add_argument("--reconstruir-cache", action="store_true", help="volver a leer el Excel entero aunque esté en la caché (y rehacerla)")
+
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    sub = subparsers.add_parser("articulo", parents=[comun], help="un PDF por artículo")
+    sub.add_argument("codigos", nargs="*", help="códigos de artículo")
+    sub.add_argument("--lista", action="append", help="archivo con códigos (txt, o columna Artículo de un CSV/Excel)")
+    sub.add_argument("--combinado", metavar="NOMBRE", help="un solo PDF NOMBRE.pdf agrupado por artículo")
+    sub.set_defaults(funcion=comando_articulo)
+
+    sub = subparsers.add_parser("pasillo", parents=[comun], help="un PDF por pasillo indicado")
+    sub.add_argument("codigos", nargs="*", help="pasillos (ej: P02 D35)")
+    sub.add_argument("--lista", action="append", help="archivo con pasillos (uno por línea)")
+    sub.set_defaults(funcion=comando_pasillo)
+
+    sub = subparsers.add_parser("pasillos", parents=[comun], help="un PDF por cada pasillo del Excel")
+    sub.add_argument("--filtro", default=None, help='filtro de pasillos: "P*", "D01-D12", "P02, P05"')
+    sub.set_defaults(funcion=comando_pasillos)
+
+    sub = subparsers.add_parser("localizador", parents=[comun], help="muestra las filas de los localizadores (JSON)")
+    sub.add_argument("codigos", nargs="*", help="localizadores (ej: P02.041.3.1)")
+    sub.add_argument("--lista", action="append", help="archivo con localizadores (uno por línea)")
+    sub.set_defaults(funcion=comando_localizador)
+
+    sub = subparsers.add_parser("buscar", parents=[comun], help="busca artículos por descripción o código (JSON)")
+    sub.add_argument("texto", nargs="+", help='palabras o pedazos de la descripción (ej: "azuc 1kg")')
+    sub.add_argument("--limite", type=int, default=10, help="cantidad máxima de artículos (por defecto: 10)")
+    sub.set_defaults(funcion=comando_buscar)
+
+    sub = subparsers.add_parser("comparar", parents=[comun], help="cambios de stock entre otro libro (anterior) y --archivo (PDF + Excel)")
+    sub.add_argument("anterior", help="Excel de stock anterior (o historial.db::AAAA-MM-DD)")
+    sub.set_defaults(funcion=comando_comparar)
+
+    sub = subparsers.add_parser("diferencia", parents=[comun], help="anota diferencias de los localizadores")
+    sub.add_argument("codigos", nargs="*", help="localizadores")
+    sub.add_argument("--lista", action="append", help="archivo con localizadores (uno por línea)")
+    sub.add_argument("--estado", required=True, choices=["FALTANTE", "SOBRANTE"])
+    sub.add_argument("--guardar", action="store_true", help="pasar las diferencias pendientes al Excel al terminar")
+    sub.set_defaults(funcion=comando_diferencia)
+
+    sub = subparsers.add_parser("resumen-diferencias", parents=[comun],
+                                help="totales de faltantes/sobrantes por pasillo y por artículo, y el detalle (PDFs)")
+    sub.set_defaults(funcion=comando_resumen_diferencias)
+
+    # El historial trabaja con su base SQLite, sin un Excel de stock abierto
+    sub = subparsers.add_parser("importar", parents=[base], help="guarda libros de stock como snapshots del historial")
+    sub.add_argument("libros", nargs="+", help="Excel de stock a importar")
+    sub.add_argument("--fecha", help="fecha del snapshot AAAA-MM-DD (por defecto: la de modificación de cada archivo)")
+    sub.add_argument("--db", default=RUTA_HISTORIAL, help=f"base del historial (por defecto: {RUTA_HISTORIAL})")
+    sub.set_defaults(funcion=comando_importar, archivo=None)
+
+    sub = subparsers.add_parser("historial", parents=[base], help="dónde estuvo un artículo (o qué hubo en un localizador) en cada snapshot (JSON)")
+    sub.add_argument("codigo", help="código de artículo (o localizador con --localizador)")
+    sub.add_argument("--localizador", action="store_true", help="el código es un localizador")
+    sub.add_argument("--desde", help="primera fecha AAAA-MM-DD")
+    sub.add_argument("--hasta", help="última fecha AAAA-MM-DD")
+    sub.add_argument("--db", default=RUTA_HISTORIAL, help=f"base del historial (por defecto: {RUTA_HISTORIAL})")
+    sub.set_defaults(funcion=comando_historial, archivo=None)
+
+    return parser
+
+
+def _cargar_inventario(args, resumen):
+    if es_servidor(args.archivo):
+        # El inventario ya lo tiene cargado el servidor de consultas
+        with etapa("servidor"):
+            resumen["origen"] = f"servidor: {obtener_cliente(args.archivo).estado()['resumen']}"
+        return
+    if not os.path.exists(args.archivo.split("::", 1)[0]):
+        raise FileNotFoundError(f"No se encontró el archivo {args.archivo}")
+
+    # Cargar el inventario una vez, con el motor pedido; las consultas lo reutilizan
+    with etapa("lectura"):
+        inventario = obtener_inventario(args.archivo, reconstruir_cache=args.reconstruir_cache, motor=args.motor)
+    resumen["origen"] = inventario.origen
+    resumen["motor"] = inventario.motor_usado
+    resumen["carga_segundos"] = round(inventario.segundos_carga, 3)
+
+
+def main(argv=None):
+    args = armar_parser().parse_args(argv)
+    inicio = time.perf_counter()
+    resumen = {"comando": args.comando, "archivo": args.archivo, "reportes": [], "sin_datos": []}
+    if args.perfil:
+        activar_perfil()
+
+    try:
+        with medir_operacion(f"cli_{args.comando}", archivo=args.archivo) as operacion:
+            # importar e historial no tienen --archivo: trabajan solo con la base del historial
+            if args.archivo is not None:
+                _cargar_inventario(args, resumen)
+
+            args.funcion(args, resumen)
+
+        resumen["sin_datos"] += [reporte["nombre"] for reporte in resumen["reportes"] if not reporte["filas"]]
+        codigo = SALIDA_SIN_DATOS if resumen["sin_datos"] else SALIDA_OK
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        resumen["error"] = str(e)
+        codigo = SALIDA_ERROR
+
+    resumen["etapas"] = {etapa: round(segundos, 3) for etapa, segundos in operacion.etapas.items()}
+    if "perfil" in operacion.datos:
+        resumen["perfil"] = operacion.datos["perfil"]
+
+    resumen["segundos_total"] = round(time.perf_counter() - inicio, 3)
+    resumen["codigo_salida"] = codigo
+
+    texto = json.dumps(resumen, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.resumen:
+        with open(args.resumen, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
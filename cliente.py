@@ -0,0 +1,147 @@
+"""Cliente del servidor de consultas (servidor.py).
+
+Cuando el "archivo" elegido es la dirección de un servidor ("http://192.168.0.10:8765"),
+las consultas y las diferencias se piden al servidor en vez de leer el Excel en esta PC.
+"""
+import http.client
+import json
+import threading
+from urllib.parse import urlencode, urlsplit
+
+PREFIJO_SERVIDOR = "http://"
+PUERTO_POR_DEFECTO = 8765
+TIEMPO_ESPERA = 30
+
+_clientes = {}
+_lock_clientes = threading.Lock()
+
+
+def es_servidor(ruta):
+    return str(ruta).startswith(PREFIJO_SERVIDOR)
+
+
+def direccion_servidor(texto):
+    """"192.168.0.10", "192.168.0.10:8765" o "http://..." -> "http://192.168.0.10:8765" """
+    texto = str(texto).strip().rstrip('/')
+    if not es_servidor(texto):
+        texto = PREFIJO_SERVIDOR + texto
+    partes = urlsplit(texto)
+    return f"{PREFIJO_SERVIDOR}{partes.hostname}:{partes.port or PUERTO_POR_DEFECTO}"
+
+
+class ErrorServidor(Exception):
+    """El servidor respondió con un error (el mensaje es el que mandó el servidor)"""
+
+    def __init__(self, mensaje, estado):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ClienteInventario:
+    """Consultas al servidor por HTTP/JSON. Cada hilo usa su propia conexión y la reutiliza
+    (keep-alive) entre consultas, así no se abre una conexión por búsqueda."""
+
+    def __init__(self, url, tiempo_espera=TIEMPO_ESPERA):
+        partes = urlsplit(direccion_servidor(url))
+        self.url = f"{PREFIJO_SERVIDOR}{partes.hostname}:{partes.port}"
+        self.host = partes.hostname
+        self.puerto = partes.port
+        self.tiempo_espera = tiempo_espera
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=self.tiempo_espera)
+            self._local.conexion = conexion
+        return conexion
+
+    def _cerrar(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is not None:
+            conexion.close()
+        self._local.conexion = None
+
+    def pedir(self, metodo, ruta, parametros=None, cuerpo=None):
+        """Hace el pedido y devuelve el JSON de la respuesta (ErrorServidor si el servidor falló)"""
+        if parametros:
+            ruta = f"{ruta}?{urlencode(parametros, doseq=True)}"
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8') if cuerpo is not None else None
+        encabezados = {"Content-Type": "application/json"} if datos is not None else {}
+
+        for intento in range(2):
+            enviado = False
+            try:
+                conexion = self._conexion()
+                conexion.request(metodo, ruta, body=datos, headers=encabezados)
+                enviado = True
+                respuesta = conexion.getresponse()
+                contenido = respuesta.read()
+            except (http.client.HTTPException, OSError):
+                self._cerrar()
+                # Una conexión guardada que el servidor ya cerró falla al primer uso: se reintenta
+                # una vez con una nueva (un POST solo si no llegó a enviarse)
+                if intento or (enviado and metodo != "GET"):
+                    raise
+                continue
+
+            if respuesta.will_close:
+                self._cerrar()
+            resultado = json.loads(contenido.decode('utf-8')) if contenido else {}
+            if respuesta.status >= 400:
+                raise ErrorServidor(resultado.get("error", f"Error {respuesta.status}"), respuesta.status)
+            return resultado
+
+    def estado(self):
+        return self.pedir("GET", "/estado")
+
+    def articulo(self, articulo):
+        return self.pedir("GET", "/articulo", {"codigo": articulo})["columnas"]
+
+    def articulos(self, articulos):
+        resultado = self.pedir("POST", "/articulos", cuerpo={"codigos": [str(articulo) for articulo in articulos]})
+        return resultado["articulos"], resultado["no_encontrados"]
+
+    def pasillo(self, pasillo):
+        return self.pedir("GET", "/pasillo", {"pasillo": pasillo})["columnas"]
+
+    def pasillos(self, filtro=None):
+        """[(pasillo, columnas)] en el orden de impresión"""
+        if isinstance(filtro, (list, tuple)):
+            filtro = ", ".join(filtro)
+        parametros = {"filtro": filtro} if filtro else None
+        return self.pedir("GET", "/pasillos", parametros)["pasillos"]
+
+    def localizador(self, localizador):
+        return self.pedir("GET", "/localizador", {"localizador": localizador})["columnas"]
+
+    def descripcion(self, articulo):
+        return self.pedir("GET", "/descripcion", {"codigo": articulo})["descripcion"]
+
+    def buscar(self, texto, limite):
+        return self.pedir("GET", "/buscar", {"texto": texto, "limite": limite})["articulos"]
+
+    def agregar_diferencia(self, datos, estado):
+        filas = [list(fila) for fila in datos]
+        return self.pedir("POST", "/diferencias", cuerpo={"filas": filas, "estado": estado})["pendientes"]
+
+    def guardar_diferencias(self):
+        return self.pedir("POST", "/diferencias/guardar", cuerpo={})["guardadas"]
+
+    def diferencias_pendientes(self):
+        return self.pedir("GET", "/diferencias")["pendientes"]
+
+    def analisis_diferencias(self):
+        """Tablas del análisis de diferencias como listas por columna (analisis_desde_json las arma)"""
+        return self.pedir("GET", "/diferencias/analisis")
+
+
+def obtener_cliente(url):
+    """Un cliente por servidor, compartido por toda la aplicación"""
+    url = direccion_servidor(url)
+    with _lock_clientes:
+        cliente = _clientes.get(url)
+        if cliente is None:
+            cliente = ClienteInventario(url)
+            _clientes[url] = cliente
+        return cliente
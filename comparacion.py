@@ -0,0 +1,184 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from inventario import obtener_inventario, obtener_ruta
+from consultas import FilasReporte
+from reportes import crear_pdf_comparacion
+from medicion import etapa, contar
+
+# Una fila del stock se identifica por dónde está, qué es y en qué pallet
+CLAVE = ['Localizador', 'Artículo', 'LPN']
+# La clave de una fila es un número en base (valores distintos de cada columna + 1): hasta acá entra en un int64
+MAXIMO_CLAVE = np.iinfo(np.int64).max
+
+# Tipos de cambio, en el orden en que salen en los reportes
+MOVIDO = "MOVIDO"
+CANTIDAD = "CANTIDAD"
+AGREGADO = "AGREGADO"
+QUITADO = "QUITADO"
+ESTADOS = [MOVIDO, CANTIDAD, AGREGADO, QUITADO]
+TITULOS_ESTADOS = {
+    MOVIDO: "Movidos de localizador",
+    CANTIDAD: "Cambió la cantidad",
+    AGREGADO: "Agregados",
+    QUITADO: "Quitados",
+}
+
+COLUMNAS_COMPARACION = ['Estado', 'Localizador', 'Localizador Anterior', 'Artículo', 'Desc Artículo',
+                        'Bultos Antes', 'Bultos Ahora', 'Diferencia', 'LPN']
+HOJA_RESUMEN = "Resumen"
+HOJA_CAMBIOS = "Cambios"
+
+
+def _codigos_comunes(antes, ahora):
+    """Códigos enteros de una columna de cada inventario con las mismas categorías (mismo texto, mismo código)"""
+    antes = antes.astype('category')
+    ahora = ahora.astype('category')
+    categorias = antes.cat.categories.union(ahora.cat.categories)
+    return (antes.cat.set_categories(categorias).cat.codes.to_numpy(np.int64),
+            ahora.cat.set_categories(categorias).cat.codes.to_numpy(np.int64), len(categorias))
+
+
+def _claves(anterior, actual):
+    """(Localizador, Artículo, LPN) de cada fila como un solo entero, comparable entre los dos stocks"""
+    codigos = [_codigos_comunes(anterior[columna], actual[columna]) for columna in CLAVE]
+    combinaciones = 1
+    for _, _, cantidad in codigos:
+        combinaciones *= cantidad + 1
+
+    if combinaciones > MAXIMO_CLAVE:
+        # No entran en un int64: se numeran solo las combinaciones que aparecen, en el mismo orden
+        tabla = pd.DataFrame({columna: np.concatenate([antes, ahora]) for columna, (antes, ahora, _) in zip(CLAVE, codigos)})
+        claves = tabla.groupby(CLAVE, sort=True).ngroup().to_numpy(np.int64)
+        return claves[:len(anterior)], claves[len(anterior):]
+
+    claves_antes = np.zeros(len(anterior), dtype=np.int64)
+    claves_ahora = np.zeros(len(actual), dtype=np.int64)
+    for codigos_antes, codigos_ahora, cantidad in codigos:
+        # +1: los vacíos tienen código -1
+        claves_antes = claves_antes * (cantidad + 1) + codigos_antes + 1
+        claves_ahora = claves_ahora * (cantidad + 1) + codigos_ahora + 1
+    return claves_antes, claves_ahora
+
+
+def _agrupar(stock, claves):
+    """Claves únicas, primera fila de cada una (para los textos) y sus bultos sumados
+    (sin LPN, "-", el mismo artículo puede estar repetido en un localizador)"""
+    unicas, primeras, inversa = np.unique(claves, return_index=True, return_inverse=True)
+    bultos = np.bincount(inversa, weights=stock['En Mano Bultos'].to_numpy(dtype=np.float64), minlength=len(unicas))
+    return unicas, primeras, bultos.astype(np.int64)
+
+
+def _filas(stock, posiciones, bultos_antes, bultos_ahora):
+    filas = pd.DataFrame({
+        columna: stock[columna].iloc[posiciones].to_numpy(dtype=object)
+        for columna in CLAVE + ['Desc Artículo']
+    })
+    filas['Localizador Anterior'] = ''
+    filas['Bultos Antes'] = bultos_antes
+    filas['Bultos Ahora'] = bultos_ahora
+    return filas
+
+
+def _con_lpn_unico(filas):
+    # Solo se puede seguir un pallet que tiene LPN y aparece una sola vez de cada lado
+    filas = filas[filas['LPN'] != '-']
+    return filas[~filas.duplicated(['Artículo', 'LPN'], keep=False)]
+
+
+def comparar_inventarios(anterior, actual):
+    """Cruza dos inventarios cargados por (Localizador, Artículo, LPN) de una sola vez y devuelve
+    las filas que cambiaron, en bultos (con las conversiones de cada libro):
+    MOVIDO (mismo artículo y LPN en otro localizador), CANTIDAD, AGREGADO y QUITADO."""
+    claves_antes, claves_ahora = _claves(anterior.stock, actual.stock)
+    unicas_antes, primeras_antes, bultos_antes = _agrupar(anterior.stock, claves_antes)
+    unicas_ahora, primeras_ahora, bultos_ahora = _agrupar(actual.stock, claves_ahora)
+
+    # Cruce completo sobre las claves enteras ordenadas: en los dos, solo antes, solo ahora
+    _, en_antes, en_ahora = np.intersect1d(unicas_antes, unicas_ahora, assume_unique=True, return_indices=True)
+    distinta = bultos_antes[en_antes] != bultos_ahora[en_ahora]
+    cambios = _filas(actual.stock, primeras_ahora[en_ahora[distinta]],
+                     bultos_antes[en_antes[distinta]], bultos_ahora[en_ahora[distinta]])
+    solo_antes = ~np.isin(unicas_antes, unicas_ahora, assume_unique=True)
+    quitados = _filas(anterior.stock, primeras_antes[solo_antes], bultos_antes[solo_antes], 0)
+    solo_ahora = ~np.isin(unicas_ahora, unicas_antes, assume_unique=True)
+    agregados = _filas(actual.stock, primeras_ahora[solo_ahora], 0, bultos_ahora[solo_ahora])
+
+    # Un pallet que dejó un localizador y apareció en otro es un movimiento, no un alta y una baja
+    origenes = _con_lpn_unico(quitados)[['Artículo', 'LPN', 'Localizador', 'Bultos Antes']]
+    movidos = _con_lpn_unico(agregados).drop(columns=['Localizador Anterior', 'Bultos Antes']).merge(
+        origenes.rename(columns={'Localizador': 'Localizador Anterior'}), on=['Artículo', 'LPN'], sort=False
+    )
+    movidos_clave = pd.MultiIndex.from_frame(movidos[['Artículo', 'LPN']])
+    quitados = quitados[~pd.MultiIndex.from_frame(quitados[['Artículo', 'LPN']]).isin(movidos_clave)]
+    agregados = agregados[~pd.MultiIndex.from_frame(agregados[['Artículo', 'LPN']]).isin(movidos_clave)]
+
+    partes = [
+        movidos.assign(Estado=MOVIDO),
+        cambios.assign(Estado=CANTIDAD),
+        agregados.assign(Estado=AGREGADO),
+        quitados.assign(Estado=QUITADO),
+    ]
+    resultado = pd.concat([parte.reindex(columns=COLUMNAS_COMPARACION) for parte in partes], ignore_index=True)
+    resultado = resultado.astype({'Bultos Antes': np.int64, 'Bultos Ahora': np.int64})
+    resultado['Diferencia'] = resultado['Bultos Ahora'] - resultado['Bultos Antes']
+    resultado['Estado'] = pd.Categorical(resultado['Estado'], categories=ESTADOS)
+    return resultado.sort_values(['Estado', 'Localizador', 'Artículo'], kind='stable', ignore_index=True)
+
+
+def resumen_comparacion(comparacion):
+    """Cantidad de filas de cada tipo de cambio, en el orden de ESTADOS"""
+    cantidades = comparacion['Estado'].value_counts()
+    return {estado: int(cantidades.get(estado, 0)) for estado in ESTADOS}
+
+
+def _bloques(comparacion):
+    # {título de la sección: filas por columna en el orden de la tabla del PDF}
+    columnas = COLUMNAS_COMPARACION[1:]
+    bloques = {}
+    for estado, filas in comparacion.groupby('Estado', sort=True, observed=False):
+        bloques[TITULOS_ESTADOS[estado]] = FilasReporte(filas[columna].tolist() for columna in columnas)
+    return bloques
+
+
+def guardar_excel_comparacion(comparacion, ruta_xlsx):
+    """Excel con una hoja de resumen (cantidades por tipo de cambio) y otra con todas las filas"""
+    resumen = pd.DataFrame(list(resumen_comparacion(comparacion).items()), columns=['Estado', 'Filas'])
+    with pd.ExcelWriter(ruta_xlsx, engine='openpyxl') as writer:
+        resumen.to_excel(writer, sheet_name=HOJA_RESUMEN, index=False)
+        comparacion.astype({'Estado': str}).to_excel(writer, sheet_name=HOJA_CAMBIOS, index=False)
+    return ruta_xlsx
+
+
+def _nombre(archivo):
+    # Nombre corto del libro (o del snapshot) que sirva como parte de un nombre de archivo
+    nombre = re.sub(r'\.xls[xm]?$', '', os.path.basename(archivo), flags=re.IGNORECASE)
+    return re.sub(r'[^\w.-]+', '_', nombre)
+
+
+def comparar_libros(archivo_anterior, archivo_actual, carpeta_destino="pdfs", invariant=None):
+    """Compara dos libros de stock (o snapshots del historial) y deja el resultado en
+    Comparacion_<anterior>_<actual>.pdf y .xlsx dentro de carpeta_destino.
+    Devuelve (ruta del PDF, ruta del Excel, cantidades por tipo de cambio)."""
+    ruta_anterior = obtener_ruta(archivo_anterior)
+    ruta_actual = obtener_ruta(archivo_actual)
+    if not ruta_anterior or not ruta_actual:
+        raise ValueError("Faltan los dos archivos a comparar")
+
+    with etapa("lectura"):
+        anterior = obtener_inventario(ruta_anterior)
+        actual = obtener_inventario(ruta_actual)
+
+    with etapa("comparación"):
+        comparacion = comparar_inventarios(anterior, actual)
+    contar("filas", len(comparacion))
+
+    nombre_archivo = f"Comparacion_{_nombre(ruta_anterior)}_{_nombre(ruta_actual)}"
+    titulo = f"Cambios de {os.path.basename(ruta_anterior)} a {os.path.basename(ruta_actual)}"
+    with etapa("pdf"):
+        ruta_pdf = crear_pdf_comparacion(nombre_archivo, titulo, _bloques(comparacion), carpeta_destino, invariant=invariant)
+    with etapa("excel"):
+        ruta_xlsx = guardar_excel_comparacion(comparacion, os.path.join(carpeta_destino, f"{nombre_archivo}.xlsx"))
+
+    return ruta_pdf, ruta_xlsx, resumen_comparacion(comparacion)
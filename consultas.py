@@ -0,0 +1,401 @@
+import os
+import re
+import pandas as pd
+from inventario import obtener_inventario, obtener_ruta
+from reportes import renderizar_pdfs, crear_pdf_articulos
+from medicion import etapa, contar
+from busqueda import LIMITE_SUGERENCIAS
+from cliente import es_servidor, obtener_cliente
+
+
+# Orden de los datos de cada fila según el reporte
+COLUMNAS_ARTICULO = ['Artículo', 'Desc Artículo', 'En Mano Bultos', 'Localizador', 'LPN']
+COLUMNAS_PASILLO = ['Localizador', 'Artículo', 'Desc Artículo', 'En Mano Bultos', 'LPN']
+
+
+def pasar_a_bultos(articulo, en_mano, ruta_archivo):
+    # Las unidades por bulto se calculan una sola vez al cargar el archivo (hoja "Conversiones")
+    unidades_por_bulto = obtener_inventario(ruta_archivo).unidades_por_bulto.get(str(articulo))
+
+    # Sin conversión (o en cero) se deja el stock como está
+    if unidades_por_bulto:
+        return int (en_mano / unidades_por_bulto)
+    
+    return en_mano
+
+
+class FilasReporte:
+    """Filas de un reporte guardadas por columna (una lista por campo) en vez de una tupla por fila.
+    Se recorre, se indexa y se compara como la lista de tuplas, y los PDFs toman las columnas directo."""
+    __slots__ = ('columnas',)
+
+    def __init__(self, columnas):
+        self.columnas = tuple(columnas)
+
+    def __len__(self):
+        return len(self.columnas[0]) if self.columnas else 0
+
+    def __iter__(self):
+        return zip(*self.columnas)
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return FilasReporte(columna[posicion] for columna in self.columnas)
+        return tuple(columna[posicion] for columna in self.columnas)
+
+    def __eq__(self, otras):
+        return list(self) == list(otras)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def _filas_reporte(filas, columnas):
+    """Filas del inventario con las columnas pedidas, armadas columna por columna.
+    Las columnas ya vienen tipadas de la carga: no hace falta convertir fila por fila."""
+    contar("filas con error", int((filas['Error'] != '').sum()))
+    # Los textos salen de las categorías: cada valor repetido es el mismo objeto en todas las filas
+    return FilasReporte(filas[columna].tolist() for columna in columnas)
+
+
+def obtener_datos_por_articulo(articulo, archivo_excel):
+    resultados = []
+    ruta_archivo = obtener_ruta(archivo_excel)
+    
+    try:
+        # Verificar que la ruta no esté vacía
+        if not ruta_archivo:
+            print("Error: No se ha seleccionado ningún archivo")
+            return []
+
+        # Con un servidor de consultas, el inventario lo tiene cargado el servidor
+        if es_servidor(ruta_archivo):
+            with etapa("servidor"):
+                resultados = FilasReporte(obtener_cliente(ruta_archivo).articulo(articulo))
+            contar("filas", len(resultados))
+            return resultados
+        
+        # El inventario se lee una sola vez y se reutiliza mientras el archivo no cambie
+        with etapa("lectura"):
+            inventario = obtener_inventario(ruta_archivo)
+        
+        # Buscar en el índice las filas del artículo
+        with etapa("filtro"):
+            coincidencias = inventario.filas_por_articulo(articulo)
+
+        # Extraer los datos en el orden solicitado (En Mano ya pasado a bultos para las filas en UN)
+        with etapa("conversión"):
+            resultados = _filas_reporte(coincidencias, COLUMNAS_ARTICULO)
+        
+        contar("filas", len(resultados))
+        return resultados
+        
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
+        return []
+    except Exception as e:
+        print(f"Error al procesar el archivo: {str(e)}")
+        return []
+
+
+def separar_codigos(texto):
+    """Códigos pegados en un cuadro de texto: separados por líneas, espacios, comas o punto y coma"""
+    return [codigo for codigo in re.split(r'[\s,;]+', texto) if codigo]
+
+
+def leer_codigos(ruta_lista, columna=None):
+    """Códigos de una lista en archivo: columna de un CSV o Excel (por defecto "Artículo",
+    o la primera si no existe) o un texto plano con un código por línea (# para comentarios)"""
+    extension = os.path.splitext(ruta_lista)[1].lower()
+    if extension in ('.csv', '.xlsx', '.xls'):
+        if extension == '.csv':
+            df = pd.read_csv(ruta_lista, dtype=str, sep=None, engine='python')
+        else:
+            df = pd.read_excel(ruta_lista, dtype=str)
+        if columna is None:
+            columna = 'Artículo' if 'Artículo' in df.columns else df.columns[0]
+        return [str(codigo).strip() for codigo in df[columna].dropna() if str(codigo).strip()]
+
+    with open(ruta_lista, encoding='utf-8') as f:
+        return separar_codigos("\n".join(linea.split('#', 1)[0] for linea in f))
+
+
+def obtener_datos_por_articulos(articulos, archivo_excel):
+    """Datos de varios artículos resueltos de una sola vez.
+    Devuelve ({articulo: filas como en obtener_datos_por_articulo}, códigos no encontrados)."""
+    ruta_archivo = obtener_ruta(archivo_excel)
+
+    try:
+        if not ruta_archivo:
+            print("Error: No se ha seleccionado ningún archivo")
+            return {}, list(articulos)
+
+        if es_servidor(ruta_archivo):
+            with etapa("servidor"):
+                columnas_por_articulo, no_encontrados = obtener_cliente(ruta_archivo).articulos(articulos)
+            resultados = {articulo: FilasReporte(columnas) for articulo, columnas in columnas_por_articulo.items()}
+            contar("filas", sum(len(filas) for filas in resultados.values()))
+            contar("no encontrados", len(no_encontrados))
+            return resultados, no_encontrados
+
+        with etapa("lectura"):
+            inventario = obtener_inventario(ruta_archivo)
+
+        # Un solo cruce de la lista contra el inventario, en vez de una búsqueda por código
+        with etapa("filtro"):
+            coincidencias, no_encontrados = inventario.filas_por_articulos(articulos)
+        with etapa("conversión"):
+            filas = _filas_reporte(coincidencias, COLUMNAS_ARTICULO)
+
+        # Las filas de cada artículo vienen juntas: se corta la tabla donde cambia el código
+        resultados = {}
+        # (con otro nombre: si algo falla, los no encontrados son los artículos pedidos)
+        codigos = filas.columnas[0]
+        inicio = 0
+        for fin in range(1, len(codigos) + 1):
+            if fin == len(codigos) or codigos[fin] != codigos[inicio]:
+                resultados[codigos[inicio]] = filas[inicio:fin]
+                inicio = fin
+
+        contar("filas", len(coincidencias))
+        contar("no encontrados", len(no_encontrados))
+        return resultados, no_encontrados
+
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
+        return {}, list(articulos)
+    except Exception as e:
+        print(f"Error al procesar el archivo: {str(e)}")
+        return {}, list(articulos)
+
+
+def armar_datos_pasillo(filas_pasillo, inventario):
+    # Localizador, Artículo, Desc Artículo, En Mano (en bultos) y LPN de cada fila del pasillo
+    with etapa("conversión"):
+        return _filas_reporte(filas_pasillo, COLUMNAS_PASILLO)
+
+
+def obtener_datos_por_pasillo(pasillo, archivo_excel):
+    resultados = []
+    ruta_archivo = obtener_ruta(archivo_excel)
+    
+    try:
+        # Verificar que la ruta no esté vacía
+        if not ruta_archivo:
+            print("Error: No se ha seleccionado ningún archivo")
+            return []
+
+        if es_servidor(ruta_archivo):
+            with etapa("servidor"):
+                resultados = FilasReporte(obtener_cliente(ruta_archivo).pasillo(pasillo))
+            contar("filas", len(resultados))
+            return resultados
+        
+        # Inventario ya cargado (todas las hojas de stock juntas)
+        with etapa("lectura"):
+            inventario = obtener_inventario(ruta_archivo)
+        
+        # Rango del índice ordenado: las filas ya vienen por altura y posición
+        with etapa("filtro"):
+            filas_pasillo = inventario.filas_por_pasillo(pasillo)
+        resultados = armar_datos_pasillo(filas_pasillo, inventario)
+        contar("filas", len(resultados))
+        
+        return resultados
+    
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
+        return []
+    except Exception as e:
+        print(f"Error al procesar el archivo: {str(e)}")
+        return []
+
+
+def obtener_descripcion(articulo, archivo_excel):
+    ruta_archivo = obtener_ruta(archivo_excel)
+    try:
+        # Verificar que la ruta no esté vacía
+        if not ruta_archivo:
+            print("Error: No se ha seleccionado ningún archivo")
+            return ""
+
+        if es_servidor(ruta_archivo):
+            with etapa("servidor"):
+                return obtener_cliente(ruta_archivo).descripcion(articulo)
+
+        with etapa("lectura"):
+            inventario = obtener_inventario(ruta_archivo)
+
+        # Buscar en el índice las filas del artículo
+        with etapa("filtro"):
+            coincidencias = inventario.filas_por_articulo(articulo)
+
+        if not coincidencias.empty:
+            # Devolver la primera descripción encontrada
+            return str(coincidencias.iloc[0]['Desc Artículo'])
+
+        # Si no se encontró nada
+        return ""
+
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
+        return ""
+    except Exception as e:
+        print(f"Error al procesar el archivo: {str(e)}")
+        return ""
+
+
+def armar_sugerencias(datos, texto, limite=LIMITE_SUGERENCIAS):
+    """[(articulo, descripcion, localizadores)] de los artículos que mejor coinciden con el texto.
+    datos: la carga del inventario (inventario.datos), así índice y localizadores son de la misma."""
+    indice = datos.indice_descripciones()
+    return [
+        (articulo, descripcion, datos.localizadores_de(articulo))
+        for articulo, descripcion in indice.buscar(texto, limite)
+    ]
+
+
+def buscar_por_descripcion(texto, archivo_excel, limite=LIMITE_SUGERENCIAS):
+    """Artículos por pedazos de la descripción (sin importar acentos ni mayúsculas) o por
+    el comienzo del código, con los localizadores donde están"""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    try:
+        if not ruta_archivo:
+            print("Error: No se ha seleccionado ningún archivo")
+            return []
+
+        if es_servidor(ruta_archivo):
+            with etapa("servidor"):
+                sugerencias = [tuple(sugerencia) for sugerencia in obtener_cliente(ruta_archivo).buscar(texto, limite)]
+            contar("filas", len(sugerencias))
+            return sugerencias
+
+        with etapa("lectura"):
+            inventario = obtener_inventario(ruta_archivo)
+
+        with etapa("filtro"):
+            sugerencias = armar_sugerencias(inventario.datos, texto, limite)
+        contar("filas", len(sugerencias))
+        return sugerencias
+
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
+        return []
+    except Exception as e:
+        print(f"Error al procesar el archivo: {str(e)}")
+        return []
+
+
+def obtener_datos_por_localizador(localizador, archivo_excel):
+    resultados = []
+    ruta_archivo = obtener_ruta(archivo_excel)
+    
+    try:
+        # Verificar que la ruta no esté vacía
+        if not ruta_archivo:
+            print("Error: No se ha seleccionado ningún archivo")
+            return []
+
+        if es_servidor(ruta_archivo):
+            with etapa("servidor"):
+                resultados = FilasReporte(obtener_cliente(ruta_archivo).localizador(localizador))
+            contar("filas", len(resultados))
+            return resultados
+
+        with etapa("lectura"):
+            inventario = obtener_inventario(ruta_archivo)
+
+        # Buscar en el índice las filas del localizador
+        with etapa("filtro"):
+            coincidencias = inventario.filas_por_localizador(localizador)
+
+        # Extraer resultados en el orden solicitado
+        with etapa("conversión"):
+            resultados = _filas_reporte(coincidencias, COLUMNAS_PASILLO)
+
+        contar("filas", len(resultados))
+        return resultados
+
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
+        return []
+    except Exception as e:
+        print(f"Error al procesar el archivo: {str(e)}")
+        return []
+
+
+def trabajos_pasillos(archivo_excel, filtro=None, carpeta_destino="pdfs"):
+    """Arma los trabajos de renderizado de cada pasillo recorriendo el inventario una sola vez.
+    filtro: None (todos), lista de pasillos o texto como "P*, D01-D12"."""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        print("Error: No se ha seleccionado ningún archivo")
+        return []
+
+    if es_servidor(ruta_archivo):
+        with etapa("servidor"):
+            pasillos = obtener_cliente(ruta_archivo).pasillos(filtro)
+        return [("pasillo", pasillo, FilasReporte(columnas), carpeta_destino) for pasillo, columnas in pasillos]
+
+    with etapa("lectura"):
+        inventario = obtener_inventario(ruta_archivo)
+
+    trabajos = []
+    for pasillo, filas_pasillo in inventario.grupos_por_pasillo(filtro):
+        try:
+            datos_por_pasillo = armar_datos_pasillo(filas_pasillo, inventario)
+        except Exception as e:
+            # Un pasillo con datos rotos no frena al resto
+            print(f"Error al procesar el pasillo {pasillo}: {str(e)}")
+            continue
+        trabajos.append(("pasillo", pasillo, datos_por_pasillo, carpeta_destino))
+
+    return trabajos
+
+
+def trabajos_articulos(articulos, archivo_excel, carpeta_destino="pdfs"):
+    """Arma un trabajo Articulo{codigo} por cada artículo de la lista (los no encontrados quedan vacíos)"""
+    datos_por_articulo, _ = obtener_datos_por_articulos(articulos, archivo_excel)
+    return [
+        ("articulo", f"Articulo{articulo}", datos_por_articulo.get(re.sub(r'\.0$', '', str(articulo).strip()), []), carpeta_destino)
+        for articulo in articulos
+    ]
+
+
+def generar_pdfs_pasillos(archivo_excel, filtro=None, carpeta_destino="pdfs", trabajadores=None, progreso=None, cancelado=None):
+    """Crea un PDF por pasillo recorriendo el inventario una sola vez.
+    trabajadores: procesos para renderizar (None = uno por núcleo, 1 = sin procesos).
+    progreso(hechos, total) y cancelado (threading.Event) se pasan al renderizado."""
+    trabajos = trabajos_pasillos(archivo_excel, filtro, carpeta_destino)
+    contar("filas", sum(len(trabajo[2]) for trabajo in trabajos))
+    with etapa("pdf"):
+        return renderizar_pdfs(trabajos, trabajadores, progreso=progreso, cancelado=cancelado)
+
+
+def generar_pdfs_articulos(articulos, archivo_excel, carpeta_destino="pdfs", trabajadores=None, progreso=None, cancelado=None):
+    """Crea un PDF Articulo{codigo}.pdf por cada artículo de la lista, renderizando en paralelo"""
+    trabajos = trabajos_articulos(articulos, archivo_excel, carpeta_destino)
+    with etapa("pdf"):
+        return renderizar_pdfs(trabajos, trabajadores, progreso=progreso, cancelado=cancelado)
+
+
+def generar_pdfs_varios_articulos(articulos, archivo_excel, combinado=True, nombre_archivo="Articulos", carpeta_destino="pdfs",
+                                  trabajadores=None, progreso=None, cancelado=None):
+    """Reporte de una lista de artículos: un solo PDF agrupado por artículo (combinado=True)
+    o un PDF por artículo renderizados en paralelo. Los códigos sin stock no generan PDF.
+    Devuelve (rutas, códigos no encontrados)."""
+    datos_por_articulo, no_encontrados = obtener_datos_por_articulos(articulos, archivo_excel)
+    if not datos_por_articulo:
+        return [], no_encontrados
+
+    if combinado:
+        with etapa("pdf"):
+            ruta_pdf = crear_pdf_articulos(nombre_archivo, datos_por_articulo, no_encontrados, carpeta_destino)
+        return [ruta_pdf], no_encontrados
+
+    trabajos = [
+        ("articulo", f"Articulo{articulo}", datos, carpeta_destino)
+        for articulo, datos in datos_por_articulo.items()
+    ]
+    with etapa("pdf"):
+        return renderizar_pdfs(trabajos, trabajadores, progreso=progreso, cancelado=cancelado), no_encontrados
@@ -0,0 +1,182 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from openpyxl import load_workbook
+from inventario import obtener_ruta, huellas_hojas, conservar_hojas
+from cliente import es_servidor, obtener_cliente
+
+HOJA_DIFERENCIAS = "Diferencias"
+ENCABEZADOS_DIFERENCIAS = ["Localizador", "Artículo", "Desc Artículo", "En Mano", "LPN", "Estado"]
+CARPETA_DIARIOS = "diferencias_pendientes"
+
+# Un solo hilo a la vez escribe o vuelca los diarios
+_lock = threading.Lock()
+
+
+def _texto(valor):
+    # NaN / None quedan como celda vacía
+    if valor is None or valor != valor:
+        return ""
+    return str(valor)
+
+
+def _valor_celda(columna, texto):
+    if texto == "":
+        return None
+    if columna == "En Mano":
+        try:
+            return int(texto)
+        except ValueError:
+            return texto
+    return texto
+
+
+class DiarioDiferencias:
+    """Diario local de diferencias pendientes de pasar al Excel.
+    Cada diferencia se agrega al instante a un CSV (solo se agregan líneas, nunca se reescribe);
+    volcar() las pasa todas juntas a la hoja Diferencias con un único guardado del libro."""
+
+    def __init__(self, ruta_archivo, carpeta=CARPETA_DIARIOS):
+        self.ruta_archivo = ruta_archivo
+        # Un diario por Excel: nombre del archivo + hash de la ruta completa
+        base = os.path.splitext(os.path.basename(ruta_archivo))[0]
+        sufijo = hashlib.sha1(os.path.abspath(ruta_archivo).encode('utf-8')).hexdigest()[:10]
+        self.ruta_diario = os.path.join(carpeta, f"{base}-{sufijo}.csv")
+        # Lote que se está volcando: si la app se corta a mitad del guardado, se recupera de acá
+        self.ruta_volcado = os.path.join(carpeta, f"{base}-{sufijo}.volcando.json")
+
+    def agregar(self, datos, estado):
+        """Anota las filas (Localizador, Artículo, Desc Artículo, En Mano, LPN) con su estado"""
+        with _lock:
+            os.makedirs(os.path.dirname(self.ruta_diario), exist_ok=True)
+            with open(self.ruta_diario, 'a', newline='', encoding='utf-8') as f:
+                escritor = csv.writer(f)
+                registrado = datetime.now().isoformat(timespec='seconds')
+                for fila in datos:
+                    escritor.writerow([_texto(valor) for valor in fila] + [estado, registrado])
+                # Que quede en disco aunque se corte la luz
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _leer_diario(self):
+        if not os.path.exists(self.ruta_diario):
+            return []
+        with open(self.ruta_diario, newline='', encoding='utf-8') as f:
+            # La última columna es la fecha de registro, no va al Excel
+            return [fila[:len(ENCABEZADOS_DIFERENCIAS)] for fila in csv.reader(f) if fila]
+
+    def _leer_volcado(self):
+        if not os.path.exists(self.ruta_volcado):
+            return None
+        with open(self.ruta_volcado, encoding='utf-8') as f:
+            return json.load(f)
+
+    def pendientes(self):
+        """Cantidad de filas que todavía no están en el Excel"""
+        with _lock:
+            volcado = self._leer_volcado()
+            return len(self._leer_diario()) + (len(volcado["filas"]) if volcado else 0)
+
+    def filas_pendientes(self, filas_hoja):
+        """Filas anotadas que todavía no están en la hoja Diferencias.
+        filas_hoja: filas que tiene hoy la hoja, con el encabezado (0 si no existe)."""
+        with _lock:
+            filas = self._leer_diario()
+            volcado = self._leer_volcado()
+        # Un volcado cortado cuenta solo si no llegó a guardarse (mismo criterio que volcar)
+        if volcado is not None and filas_hoja < volcado["filas_antes"] + len(volcado["filas"]):
+            filas = volcado["filas"] + filas
+        return filas
+
+    def volcar(self):
+        """Pasa todas las diferencias pendientes a la hoja Diferencias en un único guardado.
+        Devuelve la cantidad de filas escritas."""
+        with _lock:
+            filas = self._leer_diario()
+            volcado = self._leer_volcado()
+            if not filas and volcado is None:
+                return 0
+
+            # Huellas de las hojas antes de guardar: las de stock no cambian aunque openpyxl reescriba sus bytes
+            huellas_antes = huellas_hojas(self.ruta_archivo)
+            book = load_workbook(self.ruta_archivo)
+            if HOJA_DIFERENCIAS not in book.sheetnames:
+                ws = book.create_sheet(HOJA_DIFERENCIAS)
+                ws.append(ENCABEZADOS_DIFERENCIAS)
+            else:
+                ws = book[HOJA_DIFERENCIAS]
+
+            if volcado is not None:
+                # Un volcado anterior se cortó: si el Excel no llegó a guardarse, esas filas se vuelven a escribir
+                guardado = ws.max_row >= volcado["filas_antes"] + len(volcado["filas"])
+                if not guardado:
+                    filas = volcado["filas"] + filas
+                if not filas:
+                    os.remove(self.ruta_volcado)
+                    return 0
+
+            # 1) El lote pasa del diario al archivo de volcado (escritura atómica)
+            temporal = self.ruta_volcado + ".tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({"filas_antes": ws.max_row, "filas": filas}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, self.ruta_volcado)
+            if os.path.exists(self.ruta_diario):
+                os.remove(self.ruta_diario)
+
+            # 2) Un solo guardado del libro para todo el lote
+            for fila in filas:
+                ws.append([_valor_celda(columna, texto) for columna, texto in zip(ENCABEZADOS_DIFERENCIAS, fila)])
+            book.save(self.ruta_archivo)
+            conservar_hojas(self.ruta_archivo, huellas_antes, (HOJA_DIFERENCIAS,))
+
+            # 3) Listo: el lote ya está en el Excel
+            os.remove(self.ruta_volcado)
+            return len(filas)
+
+
+def agregar_diferencia(datos, estado, archivo_excel):
+    """Anota las filas en el diario de diferencias (rápido, sin abrir el Excel).
+    Se pasan al Excel todas juntas con guardar_diferencias. Devuelve True si quedaron anotadas."""
+    try:
+        ruta_archivo = obtener_ruta(archivo_excel)
+
+        if not ruta_archivo:
+            print("Error: No se ha seleccionado ningún archivo")
+            return False
+
+        # Con un servidor de consultas, el diario (y el Excel) son los del servidor
+        if es_servidor(ruta_archivo):
+            obtener_cliente(ruta_archivo).agregar_diferencia(datos, estado)
+            return True
+
+        DiarioDiferencias(ruta_archivo).agregar(datos, estado)
+        return True
+
+    except Exception as e:
+        print(f"Error al agregar diferencias: {str(e)}")
+        return False
+
+
+def guardar_diferencias(archivo_excel):
+    """Pasa las diferencias pendientes a la hoja "Diferencias" con un solo guardado del Excel.
+    Devuelve la cantidad de filas guardadas."""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        return 0
+    if es_servidor(ruta_archivo):
+        return obtener_cliente(ruta_archivo).guardar_diferencias()
+    return DiarioDiferencias(ruta_archivo).volcar()
+
+
+def diferencias_pendientes(archivo_excel):
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        return 0
+    if es_servidor(ruta_archivo):
+        return obtener_cliente(ruta_archivo).diferencias_pendientes()
+    return DiarioDiferencias(ruta_archivo).pendientes()
@@ -0,0 +1,233 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+import pandas as pd
+from cache_inventario import hash_archivo
+from inventario import InventarioStore, DatosInventario, obtener_inventario, normalizar_articulos, normalizar_stock, SEPARADOR_SNAPSHOT
+from diferencias import HOJA_DIFERENCIAS
+
+RUTA_HISTORIAL = "historial.db"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL UNIQUE,
+    archivo TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    importado TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stock (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    fila INTEGER NOT NULL,
+    hoja TEXT,
+    localizador TEXT,
+    pasillo TEXT,
+    posicion INTEGER,
+    altura INTEGER,
+    subdivision REAL,
+    articulo TEXT,
+    descripcion TEXT,
+    en_mano NUMERIC,
+    udm TEXT,
+    lpn TEXT
+);
+CREATE TABLE IF NOT EXISTS conversiones (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    articulo TEXT NOT NULL,
+    u_x_b REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS diferencias (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    localizador TEXT,
+    articulo TEXT,
+    descripcion TEXT,
+    en_mano NUMERIC,
+    lpn TEXT,
+    estado TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_fecha ON snapshots(fecha);
+CREATE INDEX IF NOT EXISTS idx_stock_articulo ON stock(articulo, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_stock_localizador ON stock(localizador, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_stock_pasillo ON stock(snapshot_id, pasillo, altura, posicion);
+CREATE INDEX IF NOT EXISTS idx_stock_snapshot ON stock(snapshot_id, fila);
+CREATE INDEX IF NOT EXISTS idx_conversiones_snapshot ON conversiones(snapshot_id, articulo);
+CREATE INDEX IF NOT EXISTS idx_diferencias_snapshot ON diferencias(snapshot_id, articulo);
+"""
+
+# Columnas de la tabla stock -> columnas del inventario en memoria
+COLUMNAS_STOCK = {
+    'hoja': 'Hoja',
+    'localizador': 'Localizador',
+    'pasillo': 'Pasillo',
+    'posicion': 'Posicion',
+    'altura': 'Altura',
+    'subdivision': 'Subdivision',
+    'articulo': 'Artículo',
+    'descripcion': 'Desc Artículo',
+    'en_mano': 'En Mano',
+    'udm': 'UDM Primaria',
+    'lpn': 'LPN',
+}
+
+
+def conectar(ruta_db=RUTA_HISTORIAL):
+    conexion = sqlite3.connect(ruta_db)
+    conexion.execute("PRAGMA foreign_keys = ON")
+    conexion.executescript(ESQUEMA)
+    return conexion
+
+
+def ruta_snapshot(fecha, ruta_db=RUTA_HISTORIAL):
+    """Referencia a un snapshot que se puede pasar a obtener_datos_por_* en lugar de un Excel"""
+    return f"{ruta_db}{SEPARADOR_SNAPSHOT}{fecha}"
+
+
+def es_ruta_snapshot(ruta):
+    return SEPARADOR_SNAPSHOT in str(ruta)
+
+
+def _nulo(valor):
+    # pandas usa NaN y tipos de numpy; SQLite usa NULL y tipos de Python
+    if pd.isna(valor):
+        return None
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def _leer_diferencias(ruta_archivo):
+    try:
+        df = pd.read_excel(ruta_archivo, sheet_name=HOJA_DIFERENCIAS)
+    except ValueError:
+        # El libro no tiene hoja Diferencias
+        return pd.DataFrame()
+    if 'Artículo' in df.columns:
+        df['Artículo'] = normalizar_articulos(df['Artículo'])
+    return df
+
+
+def importar_libro(ruta_archivo, fecha=None, ruta_db=RUTA_HISTORIAL):
+    """Importa un Excel (stock, Conversiones y Diferencias) como snapshot de una fecha.
+    Por defecto la fecha es la de modificación del archivo. Si ya había un snapshot
+    de esa fecha, se reemplaza. Devuelve la cantidad de filas de stock importadas."""
+    if fecha is None:
+        fecha = datetime.fromtimestamp(os.path.getmtime(ruta_archivo)).strftime("%Y-%m-%d")
+
+    # Se reutiliza la lectura normal (motor rápido, caché en disco, normalización)
+    # Stock y conversiones de la misma carga
+    datos = obtener_inventario(ruta_archivo).datos
+    stock = datos.stock
+    diferencias = _leer_diferencias(ruta_archivo)
+
+    filas_stock = [
+        tuple(_nulo(valor) for valor in fila)
+        for fila in stock[list(COLUMNAS_STOCK.values())].itertuples(index=True, name=None)
+    ]
+
+    with conectar(ruta_db) as conexion:
+        conexion.execute("DELETE FROM snapshots WHERE fecha = ?", (fecha,))
+        cursor = conexion.execute(
+            "INSERT INTO snapshots (fecha, archivo, hash, importado) VALUES (?, ?, ?, ?)",
+            (fecha, os.path.abspath(ruta_archivo), hash_archivo(ruta_archivo), datetime.now().isoformat(timespec='seconds'))
+        )
+        snapshot_id = cursor.lastrowid
+
+        conexion.executemany(
+            f"INSERT INTO stock (snapshot_id, fila, {', '.join(COLUMNAS_STOCK)}) VALUES ({', '.join(['?'] * (len(COLUMNAS_STOCK) + 2))})",
+            ((snapshot_id,) + fila for fila in filas_stock)
+        )
+        conexion.executemany(
+            "INSERT INTO conversiones (snapshot_id, articulo, u_x_b) VALUES (?, ?, ?)",
+            ((snapshot_id, articulo, float(unidades)) for articulo, unidades in datos.unidades_por_bulto.items())
+        )
+        if not diferencias.empty:
+            columnas = ["Localizador", "Artículo", "Desc Artículo", "En Mano", "LPN", "Estado"]
+            diferencias = diferencias.reindex(columns=columnas)
+            conexion.executemany(
+                "INSERT INTO diferencias (snapshot_id, localizador, articulo, descripcion, en_mano, lpn, estado) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((snapshot_id,) + tuple(_nulo(valor) for valor in fila) for fila in diferencias.itertuples(index=False, name=None))
+            )
+
+    return len(filas_stock)
+
+
+def importar_libros(rutas_archivos, ruta_db=RUTA_HISTORIAL):
+    """Importa varios Excel, cada uno con la fecha de su archivo"""
+    return {ruta: importar_libro(ruta, ruta_db=ruta_db) for ruta in rutas_archivos}
+
+
+def listar_snapshots(ruta_db=RUTA_HISTORIAL):
+    with conectar(ruta_db) as conexion:
+        return conexion.execute("SELECT fecha, archivo, importado FROM snapshots ORDER BY fecha").fetchall()
+
+
+def historial_articulo(articulo, desde=None, hasta=None, ruta_db=RUTA_HISTORIAL):
+    """Dónde estuvo un artículo en cada snapshot: lista de (fecha, localizador, en_mano, lpn)"""
+    consulta = """
+        SELECT s.fecha, st.localizador, st.en_mano, st.lpn
+        FROM stock st JOIN snapshots s ON s.id = st.snapshot_id
+        WHERE st.articulo = ? AND s.fecha >= ? AND s.fecha <= ?
+        ORDER BY s.fecha, st.fila
+    """
+    with conectar(ruta_db) as conexion:
+        return conexion.execute(consulta, (str(articulo), desde or "0000-00-00", hasta or "9999-99-99")).fetchall()
+
+
+def historial_localizador(localizador, desde=None, hasta=None, ruta_db=RUTA_HISTORIAL):
+    """Qué hubo en un localizador en cada snapshot: lista de (fecha, artículo, en_mano, lpn)"""
+    consulta = """
+        SELECT s.fecha, st.articulo, st.en_mano, st.lpn
+        FROM stock st JOIN snapshots s ON s.id = st.snapshot_id
+        WHERE st.localizador = ? AND s.fecha >= ? AND s.fecha <= ?
+        ORDER BY s.fecha, st.fila
+    """
+    with conectar(ruta_db) as conexion:
+        return conexion.execute(consulta, (str(localizador).strip(), desde or "0000-00-00", hasta or "9999-99-99")).fetchall()
+
+
+class SnapshotStore(InventarioStore):
+    """Inventario de un snapshot guardado en SQLite, con los mismos índices y
+    consultas que el inventario leído del Excel"""
+
+    def __init__(self, referencia):
+        super().__init__(referencia)
+        self.ruta_db, self.fecha = referencia.split(SEPARADOR_SNAPSHOT, 1)
+
+    def _firma_snapshot(self):
+        with conectar(self.ruta_db) as conexion:
+            return conexion.execute(
+                "SELECT id, importado FROM snapshots WHERE fecha = ?", (self.fecha,)
+            ).fetchone()
+
+    def esta_vigente(self):
+        # Un snapshot solo cambia si se vuelve a importar esa fecha
+        return self.firma is not None and self.firma == self._firma_snapshot()
+
+    def _leer(self, reconstruir_cache=False):
+        inicio = time.perf_counter()
+        firma = self._firma_snapshot()
+        if firma is None:
+            raise FileNotFoundError(f"No hay snapshot del {self.fecha} en {self.ruta_db}")
+
+        snapshot_id = firma[0]
+        with conectar(self.ruta_db) as conexion:
+            stock = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS_STOCK)} FROM stock WHERE snapshot_id = ? ORDER BY fila",
+                conexion, params=(snapshot_id,)
+            ).rename(columns=COLUMNAS_STOCK)
+            unidades_por_bulto = dict(conexion.execute(
+                "SELECT articulo, u_x_b FROM conversiones WHERE snapshot_id = ?", (snapshot_id,)
+            ).fetchall())
+        self.tiempos = {'sqlite': time.perf_counter() - inicio}
+        # Mismos tipos que al leer el Excel (los snapshots viejos guardaban el LPN vacío)
+        inicio_normalizacion = time.perf_counter()
+        stock = normalizar_stock(stock)
+        self.tiempos['normalización'] = time.perf_counter() - inicio_normalizacion
+        self.origen = f"historial {self.fecha}"
+
+        inicio_indices = time.perf_counter()
+        datos = DatosInventario(stock, unidades_por_bulto)
+        self.tiempos['índices'] = time.perf_counter() - inicio_indices
+        self.datos = datos
+        self.firma = firma
+        self.segundos_carga = time.perf_counter() - inicio
+        self._anotar_carga()
@@ -0,0 +1,874 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from importlib.util import find_spec
+from operator import itemgetter
+from bisect import bisect_left, bisect_right
+from fnmatch import fnmatchcase
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.xml.constants import SHARED_STRINGS
+from medicion import anotar
+from busqueda import IndiceDescripciones
+from cache_inventario import (
+    clave_cache, leer_cache, escribir_cache, cache_disponible, clave_hoja, leer_cache_hoja, escribir_cache_hoja,
+    copiar_cache_hoja
+)
+
+# Hojas del Excel que no son de stock
+HOJAS_EXCLUIDAS = ["Diferencias", "Conversiones"]
+
+# Columnas de stock que usa la aplicación (más 'u x b' de Conversiones; el resto del export no se lee)
+COLUMNAS_DATOS = ['Localizador', 'Artículo', 'Desc Artículo', 'En Mano', 'UDM Primaria', 'LPN']
+# Únicas columnas que usa la aplicación (el resto del export no se lee)
+COLUMNAS_USADAS = ['Localizador', 'Artículo', 'Desc Artículo', 'En Mano', 'UDM Primaria', 'LPN', 'u x b']
+# Los códigos se leen como texto para que no pasen por float
+COLUMNAS_TEXTO = ['Localizador', 'Artículo', 'LPN']
+
+# Textos que se repiten mucho entre filas: en memoria van como categorías
+# (cada valor distinto se guarda una sola vez y cada fila tiene un código entero)
+COLUMNAS_CATEGORIAS = ['Artículo', 'Localizador', 'Desc Artículo', 'UDM Primaria', 'LPN', 'Hoja', 'Pasillo', 'Error']
+
+# Motores para leer el Excel, del más rápido al más lento
+MOTORES = ["calamine", "openpyxl_read_only", "openpyxl"]
+MOTOR_POR_DEFECTO = "auto"
+# Lo que lee openpyxl (el .xls viejo solo lo leen calamine o xlrd)
+EXTENSIONES_OPENPYXL = ('.xlsx', '.xlsm', '.xltx', '.xltm')
+
+# Las referencias a snapshots del historial tienen la forma "historial.db::2025-09-15"
+SEPARADOR_SNAPSHOT = "::"
+
+# En el XML del .xlsx: cada texto de la tabla compartida (<si>) y cada celda que usa uno (t="s")
+PATRON_TEXTO_COMPARTIDO = re.compile(rb'<si\b[^>]*?(?:/>|>(.*?)</si>)', re.S)
+# (se busca desde el atributo t="s", que solo llevan las celdas: empezar por <c es varias veces más lento)
+PATRON_CELDA_COMPARTIDA = re.compile(rb'\st="s"[^>]*>\s*<v>(\d+)</v>')
+
+
+def obtener_ruta(archivo_excel):
+    # Si es un StringVar de tkinter, extraer el valor
+    if hasattr(archivo_excel, 'get'):
+        return archivo_excel.get()
+    return archivo_excel
+
+
+def firma_archivo(ruta_archivo):
+    """Devuelve (mtime, tamaño) del archivo para saber si cambió"""
+    estado = os.stat(ruta_archivo)
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+def normalizar_articulos(serie):
+    # Limpiar decimales innecesarios (ej: "426367.0" -> "426367")
+    return serie.astype(str).str.replace(r'\.0$', '', regex=True)
+
+
+def motor_disponible(motor):
+    if motor == "calamine":
+        return find_spec("python_calamine") is not None
+    return motor in MOTORES
+
+
+def elegir_motor(motor=MOTOR_POR_DEFECTO, ruta_archivo=None):
+    """Devuelve el motor pedido si está instalado (y sirve para el archivo); si no, el siguiente más
+    rápido que sí esté. openpyxl no lee .xls: para un .xls sin calamine devuelve None y elige pandas."""
+    if motor == "auto":
+        candidatos = MOTORES
+    else:
+        candidatos = [motor] + [m for m in MOTORES if m != motor]
+    solo_pandas = ruta_archivo is not None and os.path.splitext(str(ruta_archivo))[1].lower() not in EXTENSIONES_OPENPYXL
+    if solo_pandas:
+        candidatos = [m for m in candidatos if not m.startswith("openpyxl")]
+
+    for candidato in candidatos:
+        if motor_disponible(candidato):
+            if motor not in ("auto", candidato):
+                print(f"Aviso: el motor {motor} no está disponible, se usa {candidato}")
+            return candidato
+    if solo_pandas:
+        if motor != "auto":
+            print(f"Aviso: el motor {motor} no lee {os.path.basename(str(ruta_archivo))}, se usa el lector de pandas")
+        return None
+    return "openpyxl"
+
+
+def _columna_usada(nombre):
+    return nombre in COLUMNAS_USADAS
+
+
+def _leer_hojas_streaming(ruta_archivo, tiempos, nombres=None):
+    # openpyxl en modo read_only: recorre las filas sin armar el libro en memoria
+    # y solo guarda las columnas que se usan
+    libro = load_workbook(ruta_archivo, read_only=True, data_only=True)
+    try:
+        hojas = {}
+        for hoja in libro.worksheets:
+            if hoja.title == "Diferencias" or (nombres is not None and hoja.title not in nombres):
+                continue
+            inicio = time.perf_counter()
+            filas = hoja.iter_rows(values_only=True)
+            encabezado = next(filas, None) or ()
+            usadas = [(i, nombre) for i, nombre in enumerate(encabezado) if _columna_usada(nombre)]
+            if not usadas:
+                hojas[hoja.title] = pd.DataFrame()
+                continue
+
+            ancho = max(i for i, _ in usadas) + 1
+            tomar = itemgetter(*[i for i, _ in usadas])
+            valores = []
+            for fila in filas:
+                if len(fila) < ancho:
+                    fila = tuple(fila) + (None,) * (ancho - len(fila))
+                valores.append(tomar(fila) if len(usadas) > 1 else (tomar(fila),))
+
+            df = pd.DataFrame(valores, columns=[nombre for _, nombre in usadas]).dropna(how='all')
+            for columna in COLUMNAS_TEXTO:
+                if columna in df.columns:
+                    df[columna] = df[columna].where(df[columna].isna(), df[columna].astype(str))
+            hojas[hoja.title] = df.reset_index(drop=True)
+            tiempos[hoja.title] = time.perf_counter() - inicio
+        return hojas
+    finally:
+        libro.close()
+
+
+def leer_hojas(ruta_archivo, motor, tiempos=None, nombres=None):
+    """Lee las hojas del Excel (menos Diferencias) con el motor elegido, solo las columnas usadas
+    (motor None: el que elija pandas según la extensión).
+    Si se pasa `tiempos` (dict), anota los segundos de lectura de cada hoja.
+    nombres: leer solo esas hojas (None = todas)."""
+    tiempos = {} if tiempos is None else tiempos
+    if motor == "openpyxl_read_only":
+        return _leer_hojas_streaming(ruta_archivo, tiempos, nombres)
+
+    hojas = {}
+    with pd.ExcelFile(ruta_archivo, engine=motor) as libro:
+        for nombre_hoja in libro.sheet_names:
+            if nombre_hoja == "Diferencias" or (nombres is not None and nombre_hoja not in nombres):
+                continue
+            inicio = time.perf_counter()
+            hojas[nombre_hoja] = libro.parse(nombre_hoja, usecols=_columna_usada,
+                                             dtype={columna: str for columna in COLUMNAS_TEXTO})
+            tiempos[nombre_hoja] = time.perf_counter() - inicio
+    return hojas
+
+
+def huellas_hojas(ruta_archivo):
+    """Huella de cada hoja de un .xlsx: nombre, dimensiones y su XML descomprimido, más solo los
+    textos compartidos que esa hoja usa (la tabla de textos es de todo el libro).
+    Así, escribir en Excel un texto nuevo en una hoja (por ejemplo Diferencias) no cambia la huella
+    de las demás. Devuelve {hoja: huella} en el orden del libro, o None si el archivo no es un .xlsx."""
+    if not zipfile.is_zipfile(ruta_archivo):
+        return None
+
+    try:
+        lector = ExcelReader(ruta_archivo, read_only=True)
+        try:
+            lector.read_manifest()
+            lector.read_workbook()
+            archivo = lector.archive
+            textos = lector.package.find(SHARED_STRINGS)
+            compartidos = PATRON_TEXTO_COMPARTIDO.findall(archivo.read(textos.PartName[1:])) if textos is not None else []
+
+            huellas = {}
+            for hoja, relacion in lector.parser.find_sheets():
+                xml = archivo.read(relacion.target.lstrip('/'))
+                dimension = re.search(rb'<dimension ref="([^"]*)"', xml[:2048])
+                huella = hashlib.sha256(f"{hoja.name}|{dimension.group(1).decode() if dimension else ''}|".encode('utf-8'))
+                huella.update(xml)
+                # La hoja solo guarda el número de cada texto: la huella lleva los textos de esos números
+                usados = PATRON_CELDA_COMPARTIDA.findall(xml) if compartidos else []
+                for indice in sorted({int(indice) for indice in usados}):
+                    huella.update(b"|%d|" % indice)
+                    huella.update(compartidos[indice] if indice < len(compartidos) else b"")
+                huellas[hoja.name] = huella.hexdigest()
+            return huellas
+        finally:
+            lector.archive.close()
+    except Exception as e:
+        print(f"Error al calcular las huellas de {ruta_archivo}: {str(e)}")
+        return None
+
+
+def armar_unidades_por_bulto(conversiones):
+    """Arma el dict artículo -> 'u x b' a partir de la hoja Conversiones"""
+    if conversiones is None or 'Artículo' not in conversiones.columns or 'u x b' not in conversiones.columns:
+        return {}
+
+    articulos = normalizar_articulos(conversiones['Artículo'])
+    unidades = pd.to_numeric(conversiones['u x b'], errors='coerce')
+
+    # Descartar conversiones vacías o en cero (no se puede dividir por ellas)
+    validas = unidades > 0
+    tabla = pd.Series(unidades[validas].values, index=articulos[validas].values)
+    # Si un artículo aparece repetido, vale la primera fila (igual que antes)
+    tabla = tabla[~tabla.index.duplicated()]
+    return tabla.to_dict()
+
+
+def convertir_a_bultos(filas, unidades_por_bulto):
+    """Devuelve la columna En Mano con las filas en UN pasadas a bultos, de una sola vez.
+    Las cantidades que no se pudieron leer quedan en 0 (la fila ya viene marcada en 'Error')."""
+    en_mano = np.trunc(pd.to_numeric(filas['En Mano'], errors='coerce').astype(float))
+    unidades = pd.to_numeric(filas['Artículo'].map(unidades_por_bulto), errors='coerce')
+
+    # Solo se convierten las filas en UN con una conversión válida, el resto queda igual
+    convertir = (filas['UDM Primaria'] == 'UN') & (unidades > 0)
+    return en_mano.where(~convertir, np.trunc(en_mano / unidades)).fillna(0).astype(np.int64)
+
+
+def _texto_limpio(serie):
+    # Vacíos como "" (no "nan") y sin espacios alrededor
+    return serie.astype(object).where(serie.notna(), '').astype(str).str.strip()
+
+
+def normalizar_stock(stock):
+    """Deja las columnas del stock tipadas en una sola pasada vectorizada: códigos como texto
+    limpio, En Mano entero, LPN con "-" si falta y el localizador partido.
+    Las filas con datos que no se pueden usar no cortan la carga: quedan marcadas en 'Error'."""
+    stock = stock.copy()
+    for columna in COLUMNAS_DATOS:
+        if columna not in stock.columns:
+            stock[columna] = pd.NA
+
+    # Solo el artículo puede llegar como float ("426367.0"); un localizador como P02.041.3.0 es válido
+    stock['Artículo'] = _texto_limpio(stock['Artículo']).str.replace(r'\.0$', '', regex=True)
+    stock['Localizador'] = _texto_limpio(stock['Localizador'])
+    stock['Desc Artículo'] = stock['Desc Artículo'].astype(object).where(stock['Desc Artículo'].notna(), '').astype(str)
+    stock['UDM Primaria'] = stock['UDM Primaria'].astype(object).where(stock['UDM Primaria'].notna(), '').astype(str).str.strip()
+    # Localizador y LPN ya se leen como texto (COLUMNAS_TEXTO)
+    lpn = _texto_limpio(stock['LPN'])
+    stock['LPN'] = lpn.where((lpn != '') & (lpn.str.lower() != 'nan'), '-')
+
+    # En Mano entero; una celda con texto o vacía no hace fallar al pasillo entero
+    en_mano = pd.to_numeric(stock['En Mano'], errors='coerce')
+    stock['En Mano'] = np.trunc(en_mano.astype(float)).astype('Int64')
+
+    # El localizador se parte una sola vez, al cargar
+    stock[['Pasillo', 'Posicion', 'Altura', 'Subdivision']] = partir_localizadores(stock['Localizador'])
+
+    errores = pd.Series('', index=stock.index, dtype=object)
+    errores = errores.mask(stock['Artículo'] == '', 'sin artículo')
+    errores = errores.mask((errores == '') & en_mano.isna(), 'En Mano inválido')
+    errores = errores.mask((errores == '') & (stock['Localizador'] == ''), 'sin localizador')
+    # Mismo criterio que partir_localizadores (999 también puede ser una posición real)
+    formato = stock['Localizador'].str.fullmatch(r'[^.]+\.\s*\d+\.\s*\d+\..+')
+    errores = errores.mask((errores == '') & ~formato, 'localizador inválido')
+    stock['Error'] = errores.astype(str)
+    return stock
+
+
+def procesar_hoja(nombre_hoja, df):
+    """Datos que se guardan de cada hoja: las conversiones como tabla (Artículo, u x b) y las
+    hojas de stock ya normalizadas (las que no tienen Artículo ni Localizador quedan vacías)"""
+    if nombre_hoja == 'Conversiones':
+        unidades = armar_unidades_por_bulto(df)
+        return pd.DataFrame({'Artículo': list(unidades.keys()), 'u x b': list(unidades.values())})
+
+    if 'Artículo' not in df.columns and 'Localizador' not in df.columns:
+        df = pd.DataFrame(columns=COLUMNAS_DATOS)
+    df = df.copy()
+    df['Hoja'] = nombre_hoja
+    return normalizar_stock(df)
+
+
+def partir_localizadores(localizadores):
+    """Separa P02.041.3.1 en Pasillo, Posicion, Altura y Subdivision (columnas)"""
+    partes = localizadores.str.split('.', expand=True)
+    for i in range(4):
+        if i not in partes.columns:
+            partes[i] = None
+
+    posicion = pd.to_numeric(partes[1], errors='coerce')
+    altura = pd.to_numeric(partes[2], errors='coerce')
+
+    # Localizadores raros (sin las 4 partes o no numéricos) van al final: 999
+    validos = partes[3].notna() & posicion.notna() & altura.notna()
+
+    return pd.DataFrame({
+        'Pasillo': partes[0],
+        'Posicion': posicion.where(validos, 999).astype(int),
+        'Altura': altura.where(validos, 999).astype(int),
+        'Subdivision': pd.to_numeric(partes[3], errors='coerce'),
+    }, index=localizadores.index)
+
+
+def _entero_chico(serie, tipo):
+    # Solo se achica si todos los valores entran (un número gigante en el Excel no corta la carga)
+    limite = np.iinfo(np.dtype(tipo.lower()))
+    valores = serie.dropna()
+    if len(valores) < len(serie) and tipo.islower():
+        # Los enteros de numpy no admiten vacíos
+        return serie
+    if valores.empty or (valores.min() >= limite.min and valores.max() <= limite.max):
+        return serie.astype(tipo)
+    return serie
+
+
+def compactar_stock(stock):
+    """Tipos chicos para el inventario en memoria: textos repetidos como categorías,
+    En Mano en 32 bits y las partes del localizador en 16 bits"""
+    stock = stock.copy()
+    for columna in COLUMNAS_CATEGORIAS:
+        if columna in stock.columns and not isinstance(stock[columna].dtype, pd.CategoricalDtype):
+            stock[columna] = stock[columna].astype('category')
+    # El índice de pasillos busca con bisect sobre las categorías: tienen que estar en orden alfabético
+    stock['Pasillo'] = stock['Pasillo'].cat.reorder_categories(sorted(stock['Pasillo'].cat.categories))
+    stock['En Mano'] = _entero_chico(stock['En Mano'].astype('Int64'), 'Int32')
+    stock['Posicion'] = _entero_chico(stock['Posicion'], 'int16')
+    stock['Altura'] = _entero_chico(stock['Altura'], 'int16')
+    stock['Subdivision'] = stock['Subdivision'].astype(np.float32)
+    return stock
+
+
+def memoria_stock(stock):
+    """Bytes que ocupa el inventario en memoria: total, por fila y por columna"""
+    por_columna = stock.memory_usage(index=True, deep=True)
+    total = int(por_columna.sum())
+    return {
+        "filas": len(stock),
+        "bytes": total,
+        "bytes_por_fila": round(total / len(stock), 1) if len(stock) else 0,
+        "columnas": {str(columna): int(bytes_columna) for columna, bytes_columna in por_columna.items()},
+    }
+
+
+def armar_filtro_pasillos(filtro):
+    """Convierte un filtro como "P*, D01-D12" (o una lista) en una función pasillo -> bool.
+    Un rango mal escrito (P01-D05, D01-) da ValueError."""
+    if not filtro or (isinstance(filtro, str) and not filtro.strip()):
+        return lambda pasillo: True
+
+    if isinstance(filtro, str):
+        filtro = re.split(r'[,;]', filtro)
+
+    patrones = []
+    rangos = []
+    for token in filtro:
+        token = str(token).replace(' ', '').upper()
+        if not token:
+            continue
+        # Rango de pasillos de la misma letra: D01-D12
+        rango = re.fullmatch(r'([A-Z]+)(\d+)[-–]([A-Z]*)(\d+)', token)
+        if rango and rango.group(3) in ('', rango.group(1)):
+            # D12-D01 es el mismo rango que D01-D12
+            desde, hasta = sorted((int(rango.group(2)), int(rango.group(4))))
+            rangos.append((rango.group(1), desde, hasta))
+        elif re.search(r'[-–]', token):
+            # Ningún pasillo tiene guion: un rango mal escrito no tiene que dar "ningún pasillo"
+            raise ValueError(f"Rango de pasillos inválido: {token} (ej: D01-D12, las dos puntas con la misma letra)")
+        else:
+            # Pasillo exacto o patrón: P02, P*, D1?
+            patrones.append(token)
+
+    def coincide(pasillo):
+        if any(fnmatchcase(pasillo, patron) for patron in patrones):
+            return True
+        partes = re.fullmatch(r'([A-Z]+)(\d+)', pasillo)
+        if not partes:
+            return False
+        numero = int(partes.group(2))
+        return any(letra == partes.group(1) and desde <= numero <= hasta for letra, desde, hasta in rangos)
+
+    return coincide
+
+
+class DatosInventario:
+    """Inventario de una carga ya compactado, con sus índices y las consultas sobre ellos.
+    No se modifica después de armado (solo se agrega el índice de descripciones la primera vez
+    que se pide): una recarga arma otro y lo reemplaza de una vez, así una consulta usa siempre
+    el stock y los índices de la misma carga aunque mientras tanto llegue otra."""
+
+    def __init__(self, stock, unidades_por_bulto):
+        stock = compactar_stock(stock)
+        # Conversiones: artículo -> unidades por bulto
+        self.unidades_por_bulto = unidades_por_bulto
+
+        # Índices hash: código -> posiciones de fila en self.stock
+        # (groupby().indices arma el dict en una sola pasada y respeta el orden original de las filas)
+        self.indice_articulos = stock.groupby('Artículo', sort=False, observed=True).indices
+        self.indice_localizadores = stock.groupby('Localizador', sort=False, observed=True).indices
+
+        # Índice ordenado por (pasillo, altura, posición): posiciones de fila y código del pasillo de cada una
+        # (los códigos de la categoría Pasillo siguen el orden alfabético de los pasillos).
+        # Orden estable: a igual pasillo/altura/posición se respeta el orden de las hojas
+        ordenado = stock.sort_values(['Pasillo', 'Altura', 'Posicion'], kind='stable')
+        self.orden_pasillos = stock.index.get_indexer(ordenado.index).astype(np.int32)
+        self.codigos_pasillos = ordenado['Pasillo'].cat.codes.to_numpy()
+        self.pasillos = ordenado['Pasillo'].cat.categories.tolist()
+
+        # Stock en bultos de todas las filas de una vez: las consultas solo toman la columna
+        stock['En Mano Bultos'] = _entero_chico(convertir_a_bultos(stock, unidades_por_bulto), 'int32')
+        self.stock = stock
+
+        # Índice de búsqueda por descripción (se arma la primera vez que se pide)
+        self._indice_descripciones = None
+        self._lock_descripciones = threading.Lock()
+        self.segundos_descripciones = None
+
+    def _filas(self, indice, clave):
+        posiciones = indice.get(clave)
+        if posiciones is None:
+            return self.stock.iloc[0:0]
+        return self.stock.iloc[posiciones]
+
+    def filas_por_articulo(self, articulo):
+        """Filas del artículo sin recorrer todo el inventario"""
+        return self._filas(self.indice_articulos, str(articulo))
+
+    def filas_por_articulos(self, articulos):
+        """Filas de varios artículos con un solo cruce contra el inventario.
+        Devuelve (filas agrupadas por artículo en el orden pedido, códigos no encontrados)."""
+        codigos = normalizar_articulos(pd.Series([str(articulo).strip() for articulo in articulos], dtype=object))
+        codigos = codigos[codigos != ''].drop_duplicates()
+        pedidos = pd.DataFrame({'Artículo': codigos.to_numpy(dtype=object), '_orden': np.arange(len(codigos))})
+
+        filas = pd.DataFrame({'Artículo': self.stock['Artículo'].to_numpy(dtype=object), '_fila': np.arange(len(self.stock))})
+        cruce = pedidos.merge(filas, on='Artículo', how='left', sort=False)
+
+        no_encontrados = cruce.loc[cruce['_fila'].isna(), 'Artículo'].tolist()
+        encontrados = cruce.dropna(subset=['_fila']).sort_values(['_orden', '_fila'], kind='stable')
+        return self.stock.iloc[encontrados['_fila'].to_numpy(dtype=np.int64)], no_encontrados
+
+    def filas_por_localizador(self, localizador):
+        """Filas del localizador sin recorrer todo el inventario"""
+        return self._filas(self.indice_localizadores, str(localizador).strip())
+
+    def filas_por_pasillo(self, pasillo):
+        """Filas cuyo localizador empieza con `pasillo`, ya ordenadas por altura y posición"""
+        pasillo = str(pasillo)
+        pasillo_base = pasillo.split('.')[0]
+
+        if '.' in pasillo:
+            # Prefijo con posición (ej: P02.041): el pasillo tiene que ser exacto
+            desde = bisect_left(self.pasillos, pasillo_base)
+            hasta = bisect_right(self.pasillos, pasillo_base)
+        else:
+            # Prefijo de pasillo (ej: P02 o P1): rango de todos los pasillos que empiezan así
+            desde = bisect_left(self.pasillos, pasillo_base)
+            hasta = bisect_left(self.pasillos, pasillo_base + '\uffff')
+
+        # Rango de categorías -> tramo de filas del índice ordenado
+        inicio = np.searchsorted(self.codigos_pasillos, desde, side='left')
+        fin = np.searchsorted(self.codigos_pasillos, hasta, side='left')
+
+        filas = self.stock.iloc[self.orden_pasillos[inicio:fin]]
+
+        if '.' in pasillo:
+            filas = filas[filas['Localizador'].str.startswith(pasillo)]
+        elif filas['Pasillo'].nunique() > 1:
+            # Varios pasillos en el rango: ordenar todo junto por altura y posición
+            filas = filas.iloc[np.lexsort((filas.index, filas['Posicion'], filas['Altura']))]
+
+        return filas
+
+    def grupos_por_pasillo(self, filtro=None):
+        """Recorre el índice ordenado una sola vez y devuelve (pasillo, filas) de cada pasillo"""
+        coincide = armar_filtro_pasillos(filtro)
+        codigos = self.codigos_pasillos
+        if len(codigos) == 0:
+            return
+
+        # Cada pasillo ocupa un tramo contiguo del índice: buscar dónde cambia
+        cortes = np.flatnonzero(codigos[1:] != codigos[:-1]) + 1
+        inicios = np.concatenate(([0], cortes))
+        fines = np.concatenate((cortes, [len(codigos)]))
+
+        for inicio, fin in zip(inicios, fines):
+            codigo = codigos[inicio]
+            pasillo = self.pasillos[codigo] if codigo >= 0 else ''
+            # Filas sin localizador no forman un pasillo
+            if pasillo in ('', 'nan') or not coincide(pasillo):
+                continue
+            yield pasillo, self.stock.iloc[self.orden_pasillos[inicio:fin]]
+
+    def en_mano_en_bultos(self, filas):
+        return filas['En Mano Bultos']
+
+    def indice_descripciones(self, construir=True):
+        """Índice para buscar artículos por pedazos de la descripción (ver busqueda.py).
+        construir=False devuelve None si todavía no se armó, en vez de armarlo."""
+        if construir and self._indice_descripciones is None:
+            # Lock propio del snapshot: armarlo no espera a una recarga del archivo
+            with self._lock_descripciones:
+                if self._indice_descripciones is None:
+                    inicio = time.perf_counter()
+                    self._indice_descripciones = IndiceDescripciones(self.stock)
+                    self.segundos_descripciones = time.perf_counter() - inicio
+        return self._indice_descripciones
+
+    def localizadores_de(self, articulo):
+        """Localizadores donde está el artículo, sin repetir y en el orden del inventario"""
+        return list(dict.fromkeys(self.filas_por_articulo(articulo)['Localizador'].tolist()))
+
+    def memoria(self):
+        return memoria_stock(self.stock)
+
+    def filas_con_error(self):
+        return self.stock[self.stock['Error'] != '']
+
+
+def _datos_vacios():
+    return DatosInventario(normalizar_stock(pd.DataFrame(columns=COLUMNAS_DATOS + ['Hoja'])), {})
+
+
+def _guardar_hojas(hojas):
+    """Lo que se guarda de cada hoja para no volver a leerla: las de stock ya están en el inventario
+    (se concatenan en este orden), así que alcanza con su tramo de filas y sus tipos;
+    Conversiones, que es chica, queda tal cual."""
+    guardadas = {}
+    inicio = 0
+    for nombre, (huella, df) in hojas.items():
+        if nombre in HOJAS_EXCLUIDAS or not len(df):
+            guardadas[nombre] = (huella, df)
+            continue
+        guardadas[nombre] = (huella, (inicio, inicio + len(df), df.dtypes.to_dict()))
+        inicio += len(df)
+    return guardadas
+
+
+class InventarioStore:
+    """Inventario en memoria: todas las hojas de stock en un único DataFrame"""
+
+    def __init__(self, ruta_archivo, motor=MOTOR_POR_DEFECTO):
+        self.ruta_archivo = ruta_archivo
+        # Motor pedido para leer el Excel y el que realmente se usó
+        self.motor = motor
+        self.motor_usado = None
+        # Segundos por etapa de la última carga y de lectura de cada hoja
+        self.tiempos = {}
+        self.tiempos_hojas = {}
+        self.firma = None
+        # Stock, conversiones e índices de la última carga (ver DatosInventario).
+        # Una recarga lo reemplaza entero, nunca se modifica en el lugar.
+        self.datos = _datos_vacios()
+        # Lo que queda de cada hoja para la próxima carga, con su huella: hoja -> (huella, guardado).
+        # Las de stock no se guardan aparte: son un tramo de filas de datos.stock (ver _guardar_hojas)
+        self.hojas = {}
+        # Hojas que se leyeron del Excel en la última carga (el resto salió de memoria o de la caché)
+        self.hojas_leidas = []
+        # Una sola carga a la vez: quien llega mientras se lee el archivo espera a esa carga
+        self._lock = threading.Lock()
+        self.segundos_carga = None
+        # De dónde salió la última carga: "excel" o "caché"
+        self.origen = None
+
+    def esta_vigente(self):
+        return self.firma is not None and self.firma == firma_archivo(self.ruta_archivo)
+
+    def cargar(self, reconstruir_cache=False):
+        """Lee el Excel solo si nunca se leyó o si cambió en disco.
+        reconstruir_cache=True ignora la caché en disco y la vuelve a generar."""
+        with self._lock:
+            if reconstruir_cache or not self.esta_vigente():
+                try:
+                    self._leer(reconstruir_cache)
+                except Exception:
+                    # Sin firma la próxima carga vuelve a leer todo lo que haga falta
+                    self.firma = None
+                    raise
+        return self
+
+    def _leer(self, reconstruir_cache=False):
+        inicio = time.perf_counter()
+        firma = firma_archivo(self.ruta_archivo)
+        self.tiempos = {}
+        self.tiempos_hojas = {}
+
+        # Un .xlsx se carga hoja por hoja: solo se vuelven a leer las hojas cuya huella cambió
+        huellas = huellas_hojas(self.ruta_archivo)
+        if huellas is None:
+            nuevo = self._leer_libro(reconstruir_cache)
+        else:
+            self.tiempos['huellas'] = time.perf_counter() - inicio
+            nuevo = self._leer_por_hojas(huellas, reconstruir_cache)
+
+        # Si solo cambió Diferencias el inventario y sus índices quedan como estaban
+        if nuevo is not None:
+            hojas, stock, unidades_por_bulto = nuevo
+            inicio_indices = time.perf_counter()
+            datos = DatosInventario(stock, unidades_por_bulto)
+            self.tiempos['índices'] = time.perf_counter() - inicio_indices
+            # Recién con los índices armados se reemplaza lo anterior: si algo falla, queda todo como estaba
+            self.hojas = _guardar_hojas(hojas)
+            self.datos = datos
+        self.firma = firma
+        self.segundos_carga = time.perf_counter() - inicio
+        self._anotar_carga()
+
+    def _leer_libro(self, reconstruir_cache=False):
+        # Libros que no son .xlsx: caché del archivo entero (mismo contenido = misma clave)
+        inicio = time.perf_counter()
+        clave = clave_cache(self.ruta_archivo) if cache_disponible() else None
+        cacheado = None if clave is None or reconstruir_cache else leer_cache(clave)
+
+        if cacheado is not None:
+            stock, unidades_por_bulto = cacheado
+            self.origen = "caché"
+            self.motor_usado = None
+            self.hojas_leidas = []
+            self.tiempos['caché'] = time.perf_counter() - inicio
+        else:
+            stock, unidades_por_bulto = self._leer_excel()
+            self.origen = "excel"
+            if clave is not None:
+                escribir_cache(clave, stock, unidades_por_bulto)
+        return {}, stock, unidades_por_bulto
+
+    def _leer_por_hojas(self, huellas, reconstruir_cache=False):
+        """Arma el inventario con las hojas que no cambiaron (de memoria o de la caché en disco)
+        y lee del Excel solo las demás. Devuelve (hojas, stock, conversiones) sin tocar el inventario
+        actual, o None si el stock y las conversiones no cambiaron."""
+        inicio = time.perf_counter()
+        anteriores = [(nombre, huella) for nombre, (huella, _) in self.hojas.items()]
+        hojas = {}
+        faltan = []
+        for nombre, huella in huellas.items():
+            if nombre == "Diferencias":
+                continue
+            if not reconstruir_cache:
+                previa = self.hojas.get(nombre)
+                if previa is not None and previa[0] == huella:
+                    hojas[nombre] = (huella, self._hoja_guardada(previa[1]))
+                    continue
+                df = leer_cache_hoja(clave_hoja(huella))
+                if df is not None:
+                    hojas[nombre] = (huella, df)
+                    continue
+            faltan.append(nombre)
+        self.tiempos['caché'] = time.perf_counter() - inicio
+
+        self.hojas_leidas = faltan
+        if faltan:
+            inicio = time.perf_counter()
+            self.motor_usado = elegir_motor(self.motor, self.ruta_archivo)
+            leidas = leer_hojas(self.ruta_archivo, self.motor_usado, self.tiempos_hojas, faltan)
+            self.tiempos['lectura'] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            for nombre in faltan:
+                hojas[nombre] = (huellas[nombre], procesar_hoja(nombre, leidas.get(nombre, pd.DataFrame())))
+            self.tiempos['normalización'] = time.perf_counter() - inicio
+            for nombre in faltan:
+                escribir_cache_hoja(clave_hoja(huellas[nombre]), hojas[nombre][1])
+            self.origen = "excel"
+        else:
+            self.motor_usado = None
+            self.origen = "caché"
+
+        # En el orden del libro, como si se hubieran leído todas juntas
+        hojas = {nombre: hojas[nombre] for nombre in huellas if nombre in hojas}
+        if [(nombre, huella) for nombre, (huella, _) in hojas.items()] == anteriores and len(self.datos.stock):
+            return None
+
+        partes = [df for nombre, (_, df) in hojas.items() if nombre not in HOJAS_EXCLUIDAS and len(df)]
+        stock = pd.concat(partes, ignore_index=True) if partes else self._normalizar([])
+        conversiones = hojas.get('Conversiones')
+        unidades_por_bulto = dict(zip(conversiones[1]['Artículo'], conversiones[1]['u x b'])) if conversiones else {}
+        return hojas, stock, unidades_por_bulto
+
+    def _hoja_guardada(self, guardado):
+        # Una hoja de stock vuelve a armarse desde su tramo del inventario, con los tipos que tenía al leerla
+        if isinstance(guardado, pd.DataFrame):
+            return guardado
+        inicio, fin, tipos = guardado
+        filas = self.datos.stock.iloc[inicio:fin].drop(columns='En Mano Bultos')
+        return filas.reset_index(drop=True).astype(tipos)
+
+    def hoja(self, nombre):
+        """Datos procesados de una hoja como salen de procesar_hoja (None si no está en la última carga)"""
+        guardado = self.hojas.get(nombre)
+        return None if guardado is None else self._hoja_guardada(guardado[1])
+
+    def renombrar_huellas(self, cambios):
+        """cambios: hoja -> (huella vieja, huella nueva) de hojas que se guardaron sin cambiar su contenido"""
+        with self._lock:
+            for nombre, (vieja, nueva) in cambios.items():
+                previa = self.hojas.get(nombre)
+                if previa is not None and previa[0] == vieja:
+                    self.hojas[nombre] = (nueva, previa[1])
+
+    def _anotar_carga(self):
+        # Si la carga ocurrió dentro de una operación medida, el detalle queda en su registro
+        anotar("carga", {
+            "origen": self.origen,
+            "motor": self.motor_usado,
+            "filas": len(self.stock),
+            "etapas": {etapa: round(segundos, 4) for etapa, segundos in self.tiempos.items()},
+            "hojas": {hoja: round(segundos, 4) for hoja, segundos in self.tiempos_hojas.items()},
+            "bytes_por_fila": self.memoria()["bytes_por_fila"],
+        })
+
+    def _leer_excel(self):
+        inicio = time.perf_counter()
+        self.motor_usado = elegir_motor(self.motor, self.ruta_archivo)
+        todas_las_hojas = leer_hojas(self.ruta_archivo, self.motor_usado, self.tiempos_hojas)
+        self.tiempos['lectura'] = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+
+        hojas_stock = []
+        for nombre_hoja, df in todas_las_hojas.items():
+            if nombre_hoja in HOJAS_EXCLUIDAS:
+                continue
+            if 'Artículo' not in df.columns and 'Localizador' not in df.columns:
+                continue
+            df = df.copy()
+            df['Hoja'] = nombre_hoja
+            hojas_stock.append(df)
+
+        stock = self._normalizar(hojas_stock)
+        unidades_por_bulto = armar_unidades_por_bulto(todas_las_hojas.get('Conversiones'))
+        self.hojas_leidas = list(todas_las_hojas)
+        self.tiempos['normalización'] = time.perf_counter() - inicio
+        return stock, unidades_por_bulto
+
+    def resumen(self):
+        """Texto corto para mostrar cuando el archivo terminó de cargar"""
+        origen = f"excel, motor {self.motor_usado}" if self.origen == "excel" else self.origen
+        if self.hojas and self.hojas_leidas and len(self.hojas_leidas) < len(self.hojas):
+            origen += f", {len(self.hojas_leidas)} de {len(self.hojas)} hojas"
+        etapas = ", ".join(f"{etapa} {segundos:.2f} s" for etapa, segundos in self.tiempos.items())
+        texto = (f"{len(self.stock)} filas, {len(self.indice_articulos)} artículos, "
+                 f"{len(self.unidades_por_bulto)} conversiones en {self.segundos_carga:.1f} s "
+                 f"(desde {origen}: {etapas})")
+        errores = len(self.filas_con_error())
+        if errores:
+            texto += f", {errores} filas con datos inválidos"
+        return texto
+
+    def _normalizar(self, hojas_stock):
+        if not hojas_stock:
+            return normalizar_stock(pd.DataFrame(columns=COLUMNAS_DATOS + ['Hoja']))
+        return normalizar_stock(pd.concat(hojas_stock, ignore_index=True))
+
+    # Cada consulta toma el snapshot vigente una sola vez y trabaja entera sobre él
+    @property
+    def stock(self):
+        return self.datos.stock
+
+    @property
+    def unidades_por_bulto(self):
+        return self.datos.unidades_por_bulto
+
+    @property
+    def indice_articulos(self):
+        return self.datos.indice_articulos
+
+    @property
+    def indice_localizadores(self):
+        return self.datos.indice_localizadores
+
+    def filas_por_articulo(self, articulo):
+        return self.datos.filas_por_articulo(articulo)
+
+    def filas_por_articulos(self, articulos):
+        return self.datos.filas_por_articulos(articulos)
+
+    def filas_por_localizador(self, localizador):
+        return self.datos.filas_por_localizador(localizador)
+
+    def filas_por_pasillo(self, pasillo):
+        return self.datos.filas_por_pasillo(pasillo)
+
+    def grupos_por_pasillo(self, filtro=None):
+        return self.datos.grupos_por_pasillo(filtro)
+
+    def en_mano_en_bultos(self, filas):
+        return filas['En Mano Bultos']
+
+    def indice_descripciones(self, construir=True):
+        datos = self.datos
+        indice = datos.indice_descripciones(construir)
+        if datos.segundos_descripciones is not None:
+            self.tiempos['índice descripciones'] = datos.segundos_descripciones
+        return indice
+
+    def localizadores_de(self, articulo):
+        return self.datos.localizadores_de(articulo)
+
+    def memoria(self):
+        """Bytes de todo lo que queda en memoria: el inventario compactado más lo que se guarda
+        de cada hoja para la próxima carga (columnas del stock en "columnas", el resto en "hojas")"""
+        memoria = self.datos.memoria()
+        memoria["hojas"] = {
+            nombre: int(guardado.memory_usage(index=True, deep=True).sum())
+            for nombre, (_, guardado) in self.hojas.items() if isinstance(guardado, pd.DataFrame)
+        }
+        memoria["bytes"] += sum(memoria["hojas"].values())
+        memoria["bytes_por_fila"] = round(memoria["bytes"] / memoria["filas"], 1) if memoria["filas"] else 0
+        return memoria
+
+    def filas_con_error(self):
+        return self.datos.filas_con_error()
+
+
+# Un inventario por archivo, se reutiliza mientras el archivo no cambie.
+# Quedan en memoria solo los últimos usados (el actual y, por ejemplo, el anterior de una comparación)
+MAXIMO_INVENTARIOS = 3
+_inventarios = OrderedDict()
+_lock_inventarios = threading.Lock()
+
+
+def conservar_hojas(ruta_archivo, huellas_antes, hojas_tocadas=("Diferencias",)):
+    """Después de guardar el libro con openpyxl cambiando solo `hojas_tocadas`: las demás hojas
+    tienen el mismo contenido aunque sus bytes cambien, así que sus datos ya procesados
+    (en memoria y en la caché) pasan a la huella nueva y no se vuelven a leer."""
+    huellas = huellas_hojas(ruta_archivo)
+    if huellas is None or not huellas_antes:
+        return
+
+    cambios = {
+        nombre: (huellas_antes[nombre], huella) for nombre, huella in huellas.items()
+        if nombre not in hojas_tocadas and nombre in huellas_antes and huellas_antes[nombre] != huella
+    }
+    for vieja, nueva in cambios.values():
+        copiar_cache_hoja(clave_hoja(vieja), clave_hoja(nueva))
+
+    with _lock_inventarios:
+        inventario = _inventarios.get(ruta_archivo)
+    if inventario is not None and cambios:
+        inventario.renombrar_huellas(cambios)
+
+
+def inventario_cargado(archivo_excel):
+    """El inventario del archivo si ya terminó de cargarse, sin esperar ni leer nada (o None).
+    Para lo que corre en la ventana mientras se escribe, que no puede quedar esperando."""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    with _lock_inventarios:
+        inventario = _inventarios.get(ruta_archivo)
+    if inventario is None or inventario.firma is None or inventario._lock.locked():
+        return None
+    return inventario
+
+
+def obtener_inventario(archivo_excel, reconstruir_cache=False, motor=None):
+    """Devuelve el inventario cargado del archivo, recargándolo si cambió.
+    motor: "auto", "calamine", "openpyxl_read_only" u "openpyxl" (si falta, se usa el siguiente).
+    También acepta una referencia a un snapshot del historial ("historial.db::2025-09-15")."""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        return None
+
+    with _lock_inventarios:
+        inventario = _inventarios.get(ruta_archivo)
+        if inventario is None:
+            if SEPARADOR_SNAPSHOT in ruta_archivo:
+                # Import acá adentro: historial importa este módulo
+                from historial import SnapshotStore
+                inventario = SnapshotStore(ruta_archivo)
+            else:
+                inventario = InventarioStore(ruta_archivo)
+            _inventarios[ruta_archivo] = inventario
+        _inventarios.move_to_end(ruta_archivo)
+        # El menos usado se suelta (quien lo esté usando todavía lo conserva hasta terminar)
+        while len(_inventarios) > MAXIMO_INVENTARIOS:
+            _inventarios.popitem(last=False)
+        if motor is not None:
+            inventario.motor = motor
+    # Si el archivo se está precargando en otro hilo, esto espera a esa misma carga
+    return inventario.cargar(reconstruir_cache)
@@ -1,132 +1,20 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from reportlab.pdfgen import canvas
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import os
-import pandas as pd
-from reportlab.lib.pagesizes import letter
-from openpyxl import load_workbook
-
-def pasar_a_bultos(articulo, en_mano, ruta_archivo):
-    # Leer la hoja "Conversiones"
-    df = pd.read_excel(ruta_archivo, sheet_name="Conversiones")
-
-    # Asegurar que la columna Artículo sea string (para evitar problemas con floats)
-    df['Artículo'] = df['Artículo'].astype(str).str.replace(r'\.0$', '', regex=True)
-
-    # Convertir también el parámetro articulo
-    articulo_str = str(articulo)
-
-    coincidencia = df[df['Artículo'] == articulo_str]
-
-    if not coincidencia.empty:
-        unidades_por_bulto = coincidencia['u x b'].iloc[0]
-        return int (en_mano / unidades_por_bulto)
-    
-    return en_mano
-
-
-
-def crear_pdf_articulo(nombre_archivo, datos_por_articulo, carpeta_destino="pdfs"):
-    # Crear la carpeta si no existe
-    if not os.path.exists(carpeta_destino):
-        os.makedirs(carpeta_destino)
-    
-    # Ruta completa del archivo
-    ruta_completa = os.path.join(carpeta_destino, f"{nombre_archivo}.pdf")
-    
-    # Crear el PDF
-    c = canvas.Canvas(ruta_completa, pagesize=letter)
-    width, height = letter
-    
-    # Configuración inicial
-    y_position = height - 50
-    row_height = 15  # mismo que pasillo
-    font_header = 9
-    font_data = 8
-
-    # Columnas (idénticas a pasillo)
-    col_localizador = 50
-    col_articulo = 120
-    col_descripcion = 190
-    col_en_mano = 390
-    col_lpn = 460
-    columns = [col_localizador, col_articulo, col_descripcion, col_en_mano, col_lpn]
-    
-    headers = ["Localizador", "Artículo", "Descripción", "En Mano", "LPN"]
-
-    if not datos_por_articulo:
-        c.setFont("Helvetica", font_data)
-        c.drawString(50, y_position, "No se encontraron datos para este artículo.")
-        c.save()
-        return ruta_completa
-
-    # Función para dibujar headers
-    def dibujar_headers(y_pos):
-        c.setFont("Helvetica-Bold", font_header)
-        for i, (header, col_x) in enumerate(zip(headers, columns)):
-            c.setFillColorRGB(0.9, 0.9, 0.9)
-            if i == 0:
-                c.rect(col_x, y_pos - row_height + 5, columns[1] - col_x, row_height, fill=1, stroke=1)
-            elif i == len(headers) - 1:
-                c.rect(col_x, y_pos - row_height + 5, width - 50 - col_x, row_height, fill=1, stroke=1)
-            else:
-                c.rect(col_x, y_pos - row_height + 5, columns[i+1] - col_x, row_height, fill=1, stroke=1)
-            c.setFillColorRGB(0, 0, 0)
-            c.drawString(col_x + 2, y_pos - 8, header)  # alineado igual que pasillo
-
-    # Dibujar headers iniciales
-    dibujar_headers(y_position)
-    y_position -= row_height
-
-    # Filas
-    c.setFont("Helvetica", font_data)
-    for i, (articulo, descripcion, en_mano, localizador, lpn) in enumerate(datos_por_articulo):
-        if y_position < 60:  # salto de página
-            c.showPage()
-            y_position = height - 50
-            dibujar_headers(y_position)
-            y_position -= row_height
-            c.setFont("Helvetica", font_data)
-
-        # Fondo alternado
-        c.setFillColorRGB(0.98, 0.98, 0.98) if i % 2 == 0 else c.setFillColorRGB(1, 1, 1)
-        for j, col_x in enumerate(columns):
-            if j == 0:
-                c.rect(col_x, y_position - row_height + 5, columns[1] - col_x, row_height, fill=1, stroke=1)
-            elif j == len(columns) - 1:
-                c.rect(col_x, y_position - row_height + 5, width - 50 - col_x, row_height, fill=1, stroke=1)
-            else:
-                c.rect(col_x, y_position - row_height + 5, columns[j+1] - col_x, row_height, fill=1, stroke=1)
-
-        c.setFillColorRGB(0, 0, 0)
-
-        # Stock
-        try:
-            stock_texto = str(en_mano) if en_mano != '' else '0'
-        except (ValueError, TypeError):
-            stock_texto = '0'
-        
-        # LPN
-        if pd.isna(lpn) or str(lpn).lower() == 'nan':
-            lpn_texto = "-"
-        else:
-            lpn_texto = str(lpn)
-        
-        # Descripción más corta para encajar
-        desc_truncada = str(descripcion)[:35] + "..." if len(str(descripcion)) > 35 else str(descripcion)
-
-        # Escribir datos (mismo offset que pasillo → -8)
-        c.drawString(col_localizador + 2, y_position - 8, str(localizador))
-        c.drawString(col_articulo + 2, y_position - 8, str(articulo))
-        c.drawString(col_descripcion + 2, y_position - 8, desc_truncada)
-        c.drawString(col_en_mano + 2, y_position - 8, stock_texto)
-        c.drawString(col_lpn + 2, y_position - 8, lpn_texto)
-
-        y_position -= row_height
-
-    c.save()
-    return ruta_completa
-
+import queue
+import threading
+from inventario import obtener_inventario, obtener_ruta, inventario_cargado
+from reportes import crear_pdf_articulo, crear_pdf_pasillo
+from consultas import (
+    obtener_datos_por_articulo, obtener_datos_por_pasillo, obtener_datos_por_localizador,
+    obtener_descripcion, generar_pdfs_pasillos, generar_pdfs_varios_articulos,
+    separar_codigos, leer_codigos, armar_sugerencias, buscar_por_descripcion
+)
+from diferencias import agregar_diferencia, guardar_diferencias, diferencias_pendientes
+from comparacion import comparar_libros, TITULOS_ESTADOS
+from analisis_diferencias import reportes_diferencias
+from cliente import es_servidor, direccion_servidor, obtener_cliente
+from medicion import medir_operacion, etapa
 
 def mostrar_mensaje_exito(mensaje, label_mensaje):
     label_mensaje.configure(text=mensaje, font=('Arial', 10, 'bold'))
@@ -141,279 +29,98 @@ def mostrar_mensaje_descripcion(descripcion, label_mensaje):
     # limpiar después de 30 segundos
     label_mensaje.after(30000, lambda: label_mensaje.configure(text="", font=('Arial', 10)))
 
-def obtener_datos_por_articulo(articulo, archivo_excel):
-    resultados = []
-    
-    try:
-        # Si es un StringVar de tkinter, extraer el valor
-        if hasattr(archivo_excel, 'get'):
-            ruta_archivo = archivo_excel.get()
-        else:
-            ruta_archivo = archivo_excel
-        
-        # Verificar que la ruta no esté vacía
-        if not ruta_archivo:
-            print("Error: No se ha seleccionado ningún archivo")
-            return []
-        
-        # CORRECCIÓN: Usar ruta_archivo en lugar de archivo_excel
-        todas_las_hojas = pd.read_excel(ruta_archivo, sheet_name=None)
-        
-        # Iterar sobre cada hoja
-        for nombre_hoja, df in todas_las_hojas.items():
-            # Verificar que la hoja tenga las columnas necesarias
-            if 'Artículo' in df.columns and nombre_hoja not in ["Diferencias", "Conversiones"]:
-                # Convertir la columna Artículo a string para evitar problemas con floats
-                df['Artículo'] = df['Artículo'].astype(str)
-                # Limpiar decimales innecesarios (ej: "426367.0" -> "426367")
-                df['Artículo'] = df['Artículo'].str.replace(r'\.0$', '', regex=True)
-                
-                # Convertir el parámetro articulo a string también
-                articulo_str = str(articulo)
-                
-                # Buscar filas donde la columna 'Artículo' coincida con el parámetro
-                coincidencias = df[df['Artículo'] == articulo_str]
-                
-                # Para cada coincidencia, extraer los datos en el orden solicitado
-                for _, fila in coincidencias.iterrows():
-                    articulo = fila.get('Artículo', '')
-                    en_mano = int(fila.get('En Mano', ''))
-                    TipoUnidad = fila.get('UDM Primaria', '')
-                    if( TipoUnidad == "UN"):
-                        en_mano = pasar_a_bultos(articulo, en_mano, ruta_archivo)
-
-                    resultado = (
-                        articulo,
-                        fila.get('Desc Artículo', ''),       
-                        en_mano,            
-                        fila.get('Localizador', ''),       
-                        fila.get('LPN', '')                 
-                    )
-                    resultados.append(resultado)
-        
-        return resultados
-        
-    except FileNotFoundError:
-        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
-        return []
-    except Exception as e:
-        print(f"Error al procesar el archivo: {str(e)}")
-        return []
-
-def crear_pdf_pasillo(pasillo, datos_por_pasillo, carpeta_destino="pdfs"):
-    
-    if not os.path.exists(carpeta_destino):
-        os.makedirs(carpeta_destino)
-    
-    ruta_completa = os.path.join(carpeta_destino, f"pasillo{pasillo}.pdf")
-    c = canvas.Canvas(ruta_completa, pagesize=letter)
-    width, height = letter
-    
-    # Configuración inicial
-    y_position = height - 50
-    row_height = 15  # compacto pero legible
-    font_header = 9
-    font_data = 8
-
-    if not datos_por_pasillo:
-        c.setFont("Helvetica", font_data)
-        c.drawString(50, y_position, f"No se encontraron datos para el pasillo {pasillo}.")
-        c.save()
-        return ruta_completa
-    
-    # Columnas
-    col_localizador = 50
-    col_articulo = 120
-    col_descripcion = 190
-    col_en_mano = 390
-    col_lpn = 460
-    columns = [col_localizador, col_articulo, col_descripcion, col_en_mano, col_lpn]
-    
-    headers = ["Localizador", "Artículo", "Descripción", "En Mano", "LPN"]
-    
-    def dibujar_headers(y_pos):
-        c.setFont("Helvetica-Bold", font_header)
-        for i, (header, col_x) in enumerate(zip(headers, columns)):
-            c.setFillColorRGB(0.9, 0.9, 0.9)
-            if i == 0:
-                c.rect(col_x, y_pos - row_height + 5, columns[1] - col_x, row_height, fill=1, stroke=1)
-            elif i == len(headers) - 1:
-                c.rect(col_x, y_pos - row_height + 5, width - 50 - col_x, row_height, fill=1, stroke=1)
-            else:
-                c.rect(col_x, y_pos - row_height + 5, columns[i+1] - col_x, row_height, fill=1, stroke=1)
-            c.setFillColorRGB(0, 0, 0)
-            # 🔹 Subido un poco para que no quede pisado
-            c.drawString(col_x + 2, y_pos - 8, header)
-    
-    # Dibujar encabezados iniciales
-    dibujar_headers(y_position)
-    y_position -= row_height
-    
-    # Filas
-    c.setFont("Helvetica", font_data)
-    for i, (localizador, articulo, desc, en_mano, lpn) in enumerate(datos_por_pasillo):
-        if y_position < 60:  # salto de página
-            c.showPage()
-            y_position = height - 50
-            dibujar_headers(y_position)
-            y_position -= row_height
-            c.setFont("Helvetica", font_data)
-        
-        # Fondo alternado
-        c.setFillColorRGB(0.98, 0.98, 0.98) if i % 2 == 0 else c.setFillColorRGB(1, 1, 1)
-        for j, col_x in enumerate(columns):
-            if j == 0:
-                c.rect(col_x, y_position - row_height + 5, columns[1] - col_x, row_height, fill=1, stroke=1)
-            elif j == len(columns) - 1:
-                c.rect(col_x, y_position - row_height + 5, width - 50 - col_x, row_height, fill=1, stroke=1)
+def mostrar_progreso(texto, label_mensaje):
+    label_mensaje.configure(text=f"⏳ {texto}", font=('Arial', 10))
+
+class TrabajadorFondo:
+    """Corre las tareas largas en un hilo aparte para que la ventana no se congele.
+    El hilo nunca toca Tk: deja progreso y resultado en una cola que se lee con root.after.
+    Una tarea cancelada que no llegó a hacer nada devuelve un valor vacío (None, 0, []): se muestra
+    "Tarea cancelada". Si devuelve algo, eso ya quedó hecho y se muestra igual."""
+
+    def __init__(self, root, label_mensaje, boton_cancelar=None):
+        self.root = root
+        self.label_mensaje = label_mensaje
+        self.boton_cancelar = boton_cancelar
+        self.cancelado = threading.Event()
+        self.ocupado = False
+        self._cola = queue.Queue()
+
+    def ejecutar(self, tarea, descripcion, al_terminar=None, al_fallar=None, operacion=None, **datos):
+        """tarea(progreso, cancelado) corre en el hilo; al_terminar/al_fallar corren en Tk.
+        Con `operacion` (nombre) la tarea se mide: queda en el log de operaciones con los `datos`
+        y se agrega una línea con los tiempos debajo del mensaje final."""
+        if self.ocupado:
+            mostrar_mensaje_no_encontrado("Hay una tarea en curso, esperá a que termine o cancelala", self.label_mensaje)
+            return False
+
+        self.ocupado = True
+        self.cancelado.clear()
+        self._al_terminar = al_terminar
+        self._al_fallar = al_fallar
+        mostrar_progreso(descripcion, self.label_mensaje)
+        if self.boton_cancelar is not None:
+            self.boton_cancelar.configure(state="normal")
+
+        self._resumen = None
+        threading.Thread(target=self._correr, args=(tarea, operacion, datos), daemon=True).start()
+        self.root.after(100, self._revisar_cola)
+        return True
+
+    def cancelar(self):
+        if self.ocupado:
+            self.cancelado.set()
+            mostrar_progreso("Cancelando...", self.label_mensaje)
+
+    def informar(self, texto):
+        # Se llama desde el hilo de la tarea
+        self._cola.put(("progreso", texto))
+
+    def _correr(self, tarea, operacion, datos):
+        try:
+            if operacion is None:
+                resultado = tarea(self.informar, self.cancelado)
             else:
-                c.rect(col_x, y_position - row_height + 5, columns[j+1] - col_x, row_height, fill=1, stroke=1)
-        
-        # Texto procesado
-        articulo_texto = "" if pd.isna(articulo) else str(articulo).replace('.0', '') if str(articulo).endswith('.0') else str(articulo)
-        stock_texto = "0" if pd.isna(en_mano) or en_mano == '' else str(en_mano)
-        lpn_texto = "-" if pd.isna(lpn) or str(lpn).lower() == 'nan' else str(lpn)
-        desc_truncada = str(desc)[:35] + "..." if len(str(desc)) > 35 else str(desc)
-        
-        c.setFillColorRGB(0, 0, 0)
-        # 🔹 Subido un poco (antes -10, ahora -8)
-        c.drawString(col_localizador + 2, y_position - 8, str(localizador))
-        c.drawString(col_articulo + 2, y_position - 8, articulo_texto)
-        c.drawString(col_descripcion + 2, y_position - 8, desc_truncada)
-        c.drawString(col_en_mano + 2, y_position - 8, stock_texto)
-        c.drawString(col_lpn + 2, y_position - 8, lpn_texto)
-        
-        y_position -= row_height
-    
-    c.save()
-    return ruta_completa
-
-
-def obtener_datos_por_pasillo(pasillo, archivo_excel):
-    resultados = []
-    
-    try:
-        # Si es un StringVar de tkinter, extraer el valor
-        if hasattr(archivo_excel, 'get'):
-            ruta_archivo = archivo_excel.get()
-        else:
-            ruta_archivo = archivo_excel
-        
-        # Verificar que la ruta no esté vacía
-        if not ruta_archivo:
-            print("Error: No se ha seleccionado ningún archivo")
-            return []
-        
-        # Leer todas las hojas del archivo Excel
-        todas_las_hojas = pd.read_excel(ruta_archivo, sheet_name=None)
-        
-        # Lista temporal para poder ordenar después
-        datos_temporales = []
-        
-        # Iterar sobre cada hoja
-        for nombre_hoja, df in todas_las_hojas.items():
-            # Verificar que la hoja tenga las columnas necesarias
-            if 'Localizador' in df.columns and nombre_hoja not in ["Diferencias", "Conversiones"]:
-                # Convertir localizador a string para poder hacer comparaciones
-                df['Localizador'] = df['Localizador'].astype(str)
-                
-                # Filtrar filas que pertenezcan al pasillo
-                filas_pasillo = df[df['Localizador'].str.startswith(pasillo, na=False)]
-                
-                # Para cada fila del pasillo, extraer los datos
-                for _, fila in filas_pasillo.iterrows():
-                    localizador = fila.get('Localizador', '')
-                    
-                    # Extraer altura y posición para ordenar
-                    try:
-                        # Formato: P02.041.3.1 -> dividir en partes
-                        partes = localizador.split('.')
-                        if len(partes) >= 4:
-                            posicion = int(partes[1])  # 041
-                            altura = int(partes[2])    # 3
-                        else:
-                            posicion = 999  # Para casos raros, ponerlos al final
-                            altura = 999
-                    except (ValueError, IndexError):
-                        posicion = 999
-                        altura = 999
-                    
-                    articulo = fila.get('Artículo', '')
-                    en_mano = int(fila.get('En Mano', ''))
-                    TipoUnidad = fila.get('UDM Primaria', '')
-                    if( TipoUnidad == "UN"):
-                        en_mano = pasar_a_bultos(articulo, en_mano, ruta_archivo)
-
-                    resultado = (
-                        localizador,                        # Columna C
-                        articulo,                           # Columna D
-                        fila.get('Desc Artículo', ''),      # Columna E  
-                        en_mano,                            # Columna H
-                        fila.get('LPN', ''),                # Columna O
-                        altura,                             # Para ordenar
-                        posicion                            # Para ordenar
-                    )
-                    datos_temporales.append(resultado)
-        
-        # Ordenar por altura y después por posición
-        datos_temporales.sort(key=lambda x: (x[5], x[6]))  # altura, posición
-        
-        # Quitar las columnas de ordenamiento y retornar solo los datos necesarios
-        resultados = [(loc, art, desc, stock, lpn) for loc, art, desc, stock, lpn, _, _ in datos_temporales]
-        
-        return resultados
-    
-    except FileNotFoundError:
-        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
-        return []
-    except Exception as e:
-        print(f"Error al procesar el archivo: {str(e)}")
-        return []
-    
-def obtener_descripcion(articulo, archivo_excel):
-    try:
-        # Si es un StringVar de tkinter, extraer el valor
-        if hasattr(archivo_excel, 'get'):
-            ruta_archivo = archivo_excel.get()
-        else:
-            ruta_archivo = archivo_excel
-
-        # Verificar que la ruta no esté vacía
-        if not ruta_archivo:
-            print("Error: No se ha seleccionado ningún archivo")
-            return ""
-
-        # Leer todas las hojas del Excel
-        todas_las_hojas = pd.read_excel(ruta_archivo, sheet_name=None)
-
-        # Convertir a string el artículo que buscamos
-        articulo_str = str(articulo)
-
-        # Buscar en cada hoja
-        for nombre_hoja, df in todas_las_hojas.items():
-            if 'Artículo' in df.columns and 'Desc Artículo' in df.columns and nombre_hoja not in ["Diferencias", "Conversiones"]:
-                # Convertir la columna Artículo a string
-                df['Artículo'] = df['Artículo'].astype(str)
-                df['Artículo'] = df['Artículo'].str.replace(r'\.0$', '', regex=True)
-
-                # Filtrar coincidencias
-                coincidencias = df[df['Artículo'] == articulo_str]
-
-                if not coincidencias.empty:
-                    # Devolver la primera descripción encontrada
-                    return str(coincidencias.iloc[0]['Desc Artículo'])
-
-        # Si no se encontró nada
-        return ""
+                with medir_operacion(operacion, **datos) as medicion:
+                    resultado = tarea(self.informar, self.cancelado)
+                    medicion.datos['cancelado'] = self.cancelado.is_set()
+                self._resumen = medicion.resumen()
+            self._cola.put(("ok", resultado))
+        except Exception as e:
+            self._cola.put(("error", e))
+
+    def _revisar_cola(self):
+        while True:
+            try:
+                tipo, valor = self._cola.get_nowait()
+            except queue.Empty:
+                break
+
+            if tipo == "progreso":
+                mostrar_progreso(valor, self.label_mensaje)
+                continue
+
+            # La tarea terminó (bien o mal)
+            self.ocupado = False
+            if self.boton_cancelar is not None:
+                self.boton_cancelar.configure(state="disabled")
+
+            if self.cancelado.is_set() and (tipo == "error" or not valor):
+                mostrar_mensaje_no_encontrado("Tarea cancelada", self.label_mensaje)
+            elif tipo == "ok" and self._al_terminar:
+                self._al_terminar(valor)
+                if self.cancelado.is_set():
+                    # Se canceló tarde: lo que se muestra ya estaba hecho
+                    self.label_mensaje.configure(text=f"{self.label_mensaje.cget('text')}\n(Cancelado: esto ya estaba hecho)")
+                if self._resumen:
+                    self.label_mensaje.configure(text=f"{self.label_mensaje.cget('text')}\n{self._resumen}")
+            elif tipo == "error" and self._al_fallar:
+                self._al_fallar(valor)
+            return
 
-    except FileNotFoundError:
-        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
-        return ""
-    except Exception as e:
-        print(f"Error al procesar el archivo: {str(e)}")
-        return ""
+        self.root.after(100, self._revisar_cola)
 
-def buscar_por_articulo(entry_articulo, archivo_excel, label_mensaje):
+def buscar_por_articulo(entry_articulo, archivo_excel, label_mensaje, trabajador):
     """Crea PDF para artículo específico"""
     articulo = entry_articulo.get().strip()
     
@@ -421,30 +128,118 @@ def buscar_por_articulo(entry_articulo, archivo_excel, label_mensaje):
         messagebox.showwarning("Advertencia", "Por favor ingresa el nombre del artículo")
         return
     
-    try:
-        nombre_archivo = f"Articulo{articulo}"
-        datos_por_articulo = obtener_datos_por_articulo(articulo, archivo_excel)
-        ruta_pdf = crear_pdf_articulo(nombre_archivo, datos_por_articulo)
-        mensaje = f"✓ PDF creado exitosamente: {nombre_archivo}.pdf"
-        mostrar_mensaje_exito(mensaje, label_mensaje)
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al crear el PDF: {str(e)}")
+    # La ruta se lee acá: el StringVar de Tk no se puede usar desde otro hilo
+    ruta_archivo = obtener_ruta(archivo_excel)
+    nombre_archivo = f"Articulo{articulo}"
+
+    def tarea(progreso, cancelado):
+        datos_por_articulo = obtener_datos_por_articulo(articulo, ruta_archivo)
+        # Última oportunidad de cancelar: después el PDF ya queda escrito
+        if cancelado.is_set():
+            return None
+        with etapa("pdf"):
+            return crear_pdf_articulo(nombre_archivo, datos_por_articulo)
+
+    trabajador.ejecutar(
+        tarea,
+        "Generando PDF del artículo...",
+        al_terminar=lambda ruta_pdf: mostrar_mensaje_exito(f"✓ PDF creado exitosamente: {nombre_archivo}.pdf", label_mensaje),
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al crear el PDF: {str(e)}"),
+        operacion="buscar_por_articulo", archivo=ruta_archivo, articulo=articulo
+    )
 
-def buscar_descripcion_articulo(entry_articulo, archivo_excel, label_mensaje):
-    """Crea PDF para artículo específico"""
+def buscar_descripcion_articulo(entry_articulo, archivo_excel, label_mensaje, trabajador):
+    """Muestra la descripción de un artículo"""
     articulo = entry_articulo.get().strip()
     
     if not articulo:
         messagebox.showwarning("Advertencia", "Por favor ingresa el nombre del artículo")
         return
     
-    try:
-        descripcion = obtener_descripcion(articulo, archivo_excel)
-        mostrar_mensaje_descripcion(descripcion, label_mensaje)
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al buscar artículo: {str(e)}")
+    ruta_archivo = obtener_ruta(archivo_excel)
+
+    def tarea(progreso, cancelado):
+        descripcion = obtener_descripcion(articulo, ruta_archivo)
+        if descripcion:
+            return descripcion
+        # No es un código: buscarlo como pedazo de descripción
+        sugerencias = buscar_por_descripcion(articulo, ruta_archivo, limite=5)
+        return "\n".join(f"{codigo} - {desc}" for codigo, desc, _ in sugerencias)
+
+    trabajador.ejecutar(
+        tarea,
+        "Buscando artículo...",
+        al_terminar=lambda descripcion: mostrar_mensaje_descripcion(descripcion, label_mensaje),
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al buscar artículo: {str(e)}"),
+        operacion="buscar_descripcion_articulo", archivo=ruta_archivo, articulo=articulo
+    )
+
+def actualizar_sugerencias(entry_articulo, lista_sugerencias, archivo_excel):
+    """Sugerencias mientras se escribe: artículos cuya descripción (o código) coincide con lo escrito"""
+    texto = entry_articulo.get().strip()
+    lista_sugerencias.delete(0, tk.END)
+    lista_sugerencias.sugerencias = []
+    if len(texto) < 2:
+        return
+
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if es_servidor(ruta_archivo):
+        # El pedido al servidor va en un hilo: la ventana no queda esperando a la red
+        respuesta = {}
+        hilo = threading.Thread(
+            target=lambda: respuesta.update(sugerencias=buscar_por_descripcion(texto, ruta_archivo)), daemon=True
+        )
+        hilo.start()
+
+        def revisar():
+            if hilo.is_alive():
+                lista_sugerencias.after(30, revisar)
+            elif entry_articulo.get().strip() == texto:
+                # Si se siguió escribiendo, estas sugerencias ya no sirven (viene otro pedido)
+                mostrar_sugerencias(lista_sugerencias, respuesta.get('sugerencias', []))
+        lista_sugerencias.after(30, revisar)
+        return
+
+    # Corre en la ventana: si el archivo todavía se está leyendo no hay sugerencias (no se espera)
+    inventario = inventario_cargado(ruta_archivo)
+    if inventario is None:
+        return
+    # Siempre la misma carga: si llega una recarga en el medio, esta búsqueda no la espera
+    datos = inventario.datos
+    if datos.indice_descripciones(construir=False) is None:
+        # El índice se arma una vez por carga, en segundo plano
+        threading.Thread(target=inventario.indice_descripciones, daemon=True).start()
+        return
 
-def buscar_por_pasillo(entry_pasillo, archivo_excel, label_mensaje):
+    mostrar_sugerencias(lista_sugerencias, armar_sugerencias(datos, texto))
+
+def mostrar_sugerencias(lista_sugerencias, sugerencias):
+    lista_sugerencias.delete(0, tk.END)
+    for articulo, descripcion, localizadores in sugerencias:
+        ubicaciones = ", ".join(localizadores[:3]) + (" ..." if len(localizadores) > 3 else "")
+        lista_sugerencias.insert(tk.END, f"{articulo} - {descripcion} ({ubicaciones})")
+    lista_sugerencias.sugerencias = sugerencias
+
+def programar_sugerencias(entry_articulo, lista_sugerencias, archivo_excel):
+    # Buscar cuando se deja de escribir un momento, no en cada tecla
+    pendiente = getattr(lista_sugerencias, 'pendiente', None)
+    if pendiente:
+        lista_sugerencias.after_cancel(pendiente)
+    lista_sugerencias.pendiente = lista_sugerencias.after(
+        150, lambda: actualizar_sugerencias(entry_articulo, lista_sugerencias, archivo_excel)
+    )
+
+def elegir_sugerencia(entry_articulo, lista_sugerencias, label_mensaje):
+    """Pasa el código de la sugerencia elegida al campo Artículo"""
+    seleccion = lista_sugerencias.curselection()
+    if not seleccion:
+        return
+    articulo, descripcion, localizadores = lista_sugerencias.sugerencias[seleccion[0]]
+    entry_articulo.delete(0, tk.END)
+    entry_articulo.insert(0, articulo)
+    mostrar_mensaje_descripcion(f"{descripcion}\nUbicaciones: {', '.join(localizadores)}", label_mensaje)
+
+def buscar_por_pasillo(entry_pasillo, archivo_excel, label_mensaje, trabajador):
     """Crea PDF para pasillo específico"""
     pasillo = entry_pasillo.get().strip().upper()
     
@@ -456,145 +251,308 @@ def buscar_por_pasillo(entry_pasillo, archivo_excel, label_mensaje):
         mostrar_mensaje_no_encontrado("Escriba el pasillo con el formato correcto", label_mensaje)
         return 
     
-    try:
-        nombre_archivo = f"Pasillo{pasillo}"
-        datos_por_pasillo = obtener_datos_por_pasillo(pasillo, archivo_excel)
-        crear_pdf_pasillo(pasillo, datos_por_pasillo)
-        mensaje = f"✓ PDF creado exitosamente: {nombre_archivo}.pdf"
+    ruta_archivo = obtener_ruta(archivo_excel)
+    nombre_archivo = f"Pasillo{pasillo}"
+
+    def tarea(progreso, cancelado):
+        datos_por_pasillo = obtener_datos_por_pasillo(pasillo, ruta_archivo)
+        # Última oportunidad de cancelar: después el PDF ya queda escrito
+        if cancelado.is_set():
+            return None
+        with etapa("pdf"):
+            return crear_pdf_pasillo(pasillo, datos_por_pasillo)
+
+    trabajador.ejecutar(
+        tarea,
+        f"Generando PDF del pasillo {pasillo}...",
+        al_terminar=lambda ruta_pdf: mostrar_mensaje_exito(f"✓ PDF creado exitosamente: {nombre_archivo}.pdf", label_mensaje),
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al crear el PDF: {str(e)}"),
+        operacion="buscar_por_pasillo", archivo=ruta_archivo, pasillo=pasillo
+    )
+
+def buscar_todos_los_pasillos(entry_filtro, archivo_excel, label_mensaje, trabajador):
+    """Crea PDFs para todos los pasillos (o los que coincidan con el filtro)"""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        messagebox.showwarning("Advertencia", "Por favor selecciona un archivo Excel")
+        return
+
+    filtro = entry_filtro.get().strip()
+
+    def tarea(progreso, cancelado):
+        return generar_pdfs_pasillos(
+            ruta_archivo, filtro,
+            progreso=lambda hechos, total: progreso(f"Generando PDFs de pasillos... {hechos}/{total}"),
+            cancelado=cancelado
+        )
+
+    def al_terminar(rutas):
+        if not rutas:
+            mostrar_mensaje_no_encontrado("No se encontraron pasillos para ese filtro", label_mensaje)
+            return
+        mensaje = f"✓ {len(rutas)} PDFs de pasillos creados exitosamente"
         mostrar_mensaje_exito(mensaje, label_mensaje)
+
+    trabajador.ejecutar(
+        tarea,
+        "Generando PDFs de pasillos...",
+        al_terminar=al_terminar,
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al crear los PDFs: {str(e)}"),
+        operacion="buscar_todos_los_pasillos", archivo=ruta_archivo, filtro=filtro
+    )
+
+def cargar_lista_articulos(text_articulos, label_mensaje):
+    """Carga en el cuadro de texto los códigos de un CSV, Excel o txt"""
+    ruta_lista = filedialog.askopenfilename(
+        title="Seleccionar lista de artículos",
+        filetypes=[("Listas", "*.csv *.xlsx *.xls *.txt"), ("Todos los archivos", "*.*")]
+    )
+    if not ruta_lista:
+        return
+    try:
+        codigos = leer_codigos(ruta_lista)
     except Exception as e:
-        messagebox.showerror("Error", f"Error al crear el PDF: {str(e)}")
+        messagebox.showerror("Error", f"No se pudo leer la lista: {str(e)}")
+        return
+    text_articulos.delete("1.0", "end")
+    text_articulos.insert("1.0", "\n".join(codigos))
+    mostrar_mensaje_exito(f"{len(codigos)} códigos cargados", label_mensaje)
+
+def buscar_varios_articulos(text_articulos, combinado_var, archivo_excel, label_mensaje, trabajador):
+    """Crea un PDF combinado (o uno por artículo) para una lista de artículos"""
+    articulos = separar_codigos(text_articulos.get("1.0", "end"))
+
+    if not articulos:
+        messagebox.showwarning("Advertencia", "Por favor ingresa o carga la lista de artículos")
+        return
+
+    ruta_archivo = obtener_ruta(archivo_excel)
+    combinado = combinado_var.get()
+
+    def tarea(progreso, cancelado):
+        rutas, no_encontrados = generar_pdfs_varios_articulos(
+            articulos, ruta_archivo, combinado,
+            progreso=lambda hechos, total: progreso(f"Generando PDFs de artículos... {hechos}/{total}"),
+            cancelado=cancelado
+        )
+        # Cancelado antes del primer PDF: no hay nada que mostrar
+        if cancelado.is_set() and not rutas:
+            return None
+        return rutas, no_encontrados
+
+    def al_terminar(resultado):
+        rutas, no_encontrados = resultado
+        if not rutas:
+            mostrar_mensaje_no_encontrado("No se encontró ninguno de los artículos", label_mensaje)
+            return
+        if combinado:
+            mensaje = f"✓ PDF creado exitosamente: {os.path.basename(rutas[0])}"
+        else:
+            mensaje = f"✓ {len(rutas)} PDFs de artículos creados exitosamente"
+        if no_encontrados:
+            mensaje += f"\nNo encontrados ({len(no_encontrados)}): " + ", ".join(no_encontrados[:10])
+            if len(no_encontrados) > 10:
+                mensaje += ", ..."
+        mostrar_mensaje_exito(mensaje, label_mensaje)
+
+    trabajador.ejecutar(
+        tarea,
+        f"Buscando {len(articulos)} artículos...",
+        al_terminar=al_terminar,
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al crear los PDFs: {str(e)}"),
+        operacion="buscar_varios_articulos", archivo=ruta_archivo, articulos=len(articulos), combinado=combinado
+    )
+
+def comparar_con_anterior(archivo_excel, label_mensaje, trabajador):
+    """Compara el Excel seleccionado con uno anterior: PDF y Excel con lo que se movió, cambió, entró o salió"""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        messagebox.showwarning("Advertencia", "Por favor selecciona un archivo Excel")
+        return
+    if es_servidor(ruta_archivo):
+        messagebox.showwarning("Advertencia", "Para comparar hay que seleccionar el archivo Excel actual (no un servidor)")
+        return
+
+    ruta_anterior = filedialog.askopenfilename(
+        title="Seleccionar el Excel anterior",
+        filetypes=[("Archivos Excel", "*.xlsx *.xls")]
+    )
+    if not ruta_anterior:
+        return
+
+    def al_terminar(resultado):
+        ruta_pdf, ruta_xlsx, cambios = resultado
+        detalle = " · ".join(f"{TITULOS_ESTADOS[estado]}: {cantidad}" for estado, cantidad in cambios.items())
+        mensaje = f"✓ Comparación creada: {os.path.basename(ruta_pdf)} y {os.path.basename(ruta_xlsx)}\n{detalle}"
+        mostrar_mensaje_exito(mensaje, label_mensaje)
+
+    trabajador.ejecutar(
+        lambda progreso, cancelado: comparar_libros(ruta_anterior, ruta_archivo),
+        "Comparando los dos archivos...",
+        al_terminar=al_terminar,
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al comparar los archivos: {str(e)}"),
+        operacion="comparar_libros", archivo=ruta_archivo, anterior=ruta_anterior
+    )
+
+def aviso_pendientes(archivo_excel):
+    # Diferencias que quedaron sin pasar al Excel (por ejemplo si la app se cerró de golpe)
+    pendientes = diferencias_pendientes(archivo_excel)
+    if pendientes:
+        return f" - {pendientes} diferencias pendientes de guardar"
+    return ""
 
 # --- Función para buscar archivo Excel
-def seleccionar_archivo(archivo_excel, lbl_archivo):
+def seleccionar_archivo(archivo_excel, lbl_archivo, label_mensaje, precarga):
     archivo = filedialog.askopenfilename(
         title="Seleccionar archivo Excel",
         filetypes=[("Archivos Excel", "*.xlsx *.xls")]
     )
-    if archivo:
+    # Si hay otra carga en curso se rechaza y queda el archivo de antes
+    if archivo and precargar_archivo(archivo, label_mensaje, precarga):
         archivo_excel.set(archivo)
         lbl_archivo.config(text=f"Archivo: {archivo}")
 
-def obtener_datos_por_localizador(localizador, archivo_excel):
-    resultados = []
-    
+def precargar_archivo(archivo, label_mensaje, precarga, reconstruir_cache=False):
+    # Precarga en segundo plano: hojas, índices y conversiones quedan listos antes de la primera búsqueda.
+    # Las búsquedas que lleguen antes esperan a esta misma carga en vez de leer el Excel otra vez.
+    def tarea(progreso, cancelado):
+        inventario = obtener_inventario(archivo, reconstruir_cache=reconstruir_cache)
+        # El índice de descripciones también queda listo para las sugerencias
+        inventario.indice_descripciones()
+        return inventario
+
+    return precarga.ejecutar(
+        tarea,
+        "Leyendo archivo Excel sin la caché..." if reconstruir_cache else "Leyendo archivo Excel...",
+        al_terminar=lambda inventario: mostrar_mensaje_exito(f"✓ Archivo listo: {inventario.resumen()}{aviso_pendientes(archivo)}", label_mensaje),
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al leer el archivo: {str(e)}"),
+        operacion="cargar_archivo", archivo=archivo, reconstruir_cache=reconstruir_cache
+    )
+
+def releer_archivo(archivo_excel, label_mensaje, precarga):
+    """Vuelve a leer el Excel entero sin usar la caché (y la rehace), por si la caché quedó mal"""
+    archivo = archivo_excel.get()
+    if not archivo:
+        messagebox.showwarning("Advertencia", "Primero seleccioná un archivo Excel")
+        return
+    if es_servidor(archivo):
+        messagebox.showwarning("Advertencia", "Conectado a un servidor: el Excel lo lee el servidor, no esta PC")
+        return
+    precargar_archivo(archivo, label_mensaje, precarga, reconstruir_cache=True)
+
+def conectar_servidor(archivo_excel, lbl_archivo, label_mensaje, precarga):
+    """Usa el inventario de un servidor de consultas (servidor.py) en vez de leer el Excel en esta PC"""
+    direccion = simpledialog.askstring("Conectar a servidor", "Dirección del servidor (ej: 192.168.0.10:8765):")
+    if not direccion:
+        return
     try:
-        # Si es un StringVar de tkinter, extraer el valor
-        if hasattr(archivo_excel, 'get'):
-            ruta_archivo = archivo_excel.get()
-        else:
-            ruta_archivo = archivo_excel
-
-        # Verificar que la ruta no esté vacía
-        if not ruta_archivo:
-            print("Error: No se ha seleccionado ningún archivo")
-            return []
-
-        # Leer todas las hojas del Excel
-        todas_las_hojas = pd.read_excel(ruta_archivo, sheet_name=None)
-
-        # Convertir a string el localizador buscado
-        localizador_str = str(localizador).strip()
-
-        # Buscar en cada hoja
-        for nombre_hoja, df in todas_las_hojas.items():
-            # Verificar que existan las columnas necesarias
-            columnas_necesarias = ['Localizador', 'Artículo', 'Desc Artículo', 'En Mano', 'LPN']
-            if all(col in df.columns for col in columnas_necesarias):
-                # Convertir la columna Localizador a string para comparar sin problemas
-                df['Localizador'] = df['Localizador'].astype(str).str.strip()
-
-                # Filtrar coincidencias
-                coincidencias = df[df['Localizador'] == localizador_str]
-
-                # Extraer resultados en el orden solicitado
-                for _, fila in coincidencias.iterrows():
-
-                    articulo = fila.get('Artículo', '')
-                    en_mano = int(fila.get('En Mano', ''))
-                    TipoUnidad = fila.get('UDM Primaria', '')
-                    if( TipoUnidad == "UN"):
-                        en_mano = pasar_a_bultos(articulo, en_mano, ruta_archivo)
-
-                    resultado = (
-                        fila.get('Localizador', ''),
-                        articulo,
-                        fila.get('Desc Artículo', ''),
-                        en_mano,
-                        fila.get('LPN', '')
-                    )
-                    resultados.append(resultado)
-
-        return resultados
-
-    except FileNotFoundError:
-        print(f"Error: No se pudo encontrar el archivo {ruta_archivo}")
-        return []
-    except Exception as e:
-        print(f"Error al procesar el archivo: {str(e)}")
-        return []
+        url = direccion_servidor(direccion)
+    except ValueError:
+        messagebox.showwarning("Advertencia", f"Dirección inválida: {direccion}")
+        return
+
+    def al_terminar(estado):
+        mensaje = f"✓ Conectado al servidor: {estado['resumen']}"
+        if estado['pendientes']:
+            mensaje += f" - {estado['pendientes']} diferencias pendientes de guardar"
+        mostrar_mensaje_exito(mensaje, label_mensaje)
+
+    # Si hay otra carga en curso se rechaza y queda el archivo de antes
+    if precarga.ejecutar(
+        lambda progreso, cancelado: obtener_cliente(url).estado(),
+        "Conectando al servidor...",
+        al_terminar=al_terminar,
+        al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo conectar al servidor {url}: {str(e)}"),
+        operacion="conectar_servidor", archivo=url
+    ):
+        archivo_excel.set(url)
+        lbl_archivo.config(text=f"Servidor: {url}")
 
 # --- Función para mostrar el formulario correcto
-def mostrar_formulario(form_container, modo_var, form_buscar_por_articulo, form_buscar_por_pasillo, form_diferencias):
+def mostrar_formulario(form_container, modo_var, form_buscar_por_articulo, form_varios_articulos, form_buscar_por_pasillo, form_diferencias, form_comparar):
     for child in form_container.winfo_children():
         child.pack_forget()
     if modo_var.get() == "Buscar por artículo":
         form_buscar_por_articulo.pack(fill="x")
+    elif modo_var.get() == "Varios artículos":
+        form_varios_articulos.pack(fill="x")
     elif modo_var.get() == "Buscar por pasillo":
         form_buscar_por_pasillo.pack(fill="x")
     elif modo_var.get() == "Diferencias":
         form_diferencias.pack(fill="x")
+    elif modo_var.get() == "Comparar con anterior":
+        form_comparar.pack(fill="x")
 
-def agregar_diferencia(datos, estado, archivo_excel):
-    try:
-        # Si es un StringVar de tkinter, extraer el valor
-        if hasattr(archivo_excel, 'get'):
-            ruta_archivo = archivo_excel.get()
-        else:
-            ruta_archivo = archivo_excel
+def mostrar_mensaje_no_encontrado(texto, label_mensaje):
+    label_mensaje.configure(text=texto, font=('Arial', 10, 'bold'))
+    label_mensaje.pack(pady=10) 
 
-        if not ruta_archivo:
-            print("Error: No se ha seleccionado ningún archivo")
-            return
+    # limpiar después de 10 segundos
+    label_mensaje.after(10000, lambda: label_mensaje.configure(text="", font=('Arial', 10)))
 
-        # Intentar abrir el Excel existente
-        try:
-            book = load_workbook(ruta_archivo)
-        except FileNotFoundError:
-            print(f"Error: No se encontró el archivo {ruta_archivo}")
-            return
+def guardar_diferencias_en_excel(archivo_excel, label_mensaje, trabajador):
+    """Vuelca al Excel todas las diferencias anotadas"""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        messagebox.showwarning("Advertencia", "Por favor selecciona un archivo Excel")
+        return
 
-        # Nombre de la hoja donde vamos a guardar las diferencias
-        hoja_diferencias = "Diferencias"
+    def al_terminar(guardadas):
+        if not guardadas:
+            mostrar_mensaje_no_encontrado("No hay diferencias pendientes", label_mensaje)
+            return
+        mostrar_mensaje_exito(f"✓ {guardadas} filas guardadas en la hoja Diferencias", label_mensaje)
+
+    def tarea(progreso, cancelado):
+        with etapa("guardado"):
+            return guardar_diferencias(ruta_archivo)
+
+    trabajador.ejecutar(
+        tarea,
+        "Guardando diferencias en el Excel...",
+        al_terminar=al_terminar,
+        al_fallar=lambda e: messagebox.showerror("Error", f"No se pudieron guardar las diferencias (quedan pendientes, cierre el Excel y reintente): {str(e)}"),
+        operacion="guardar_diferencias", archivo=ruta_archivo
+    )
 
-        # Si la hoja no existe, crearla con encabezados
-        if hoja_diferencias not in book.sheetnames:
-            ws = book.create_sheet(hoja_diferencias)
-            ws.append(["Localizador", "Artículo", "Desc Artículo", "En Mano", "LPN", "Estado"])
-        else:
-            ws = book[hoja_diferencias]
+def resumen_de_diferencias(archivo_excel, label_mensaje, trabajador):
+    """PDFs con los totales de faltantes y sobrantes por pasillo y por artículo, y el detalle"""
+    ruta_archivo = obtener_ruta(archivo_excel)
+    if not ruta_archivo:
+        messagebox.showwarning("Advertencia", "Por favor selecciona un archivo Excel")
+        return
 
-        # Agregar cada fila de datos
-        for fila in datos:
-            # fila es: (Localizador, Artículo, Desc Artículo, En Mano, LPN)
-            nueva_fila = list(fila) + [estado]  # agregamos la columna "Estado"
-            ws.append(nueva_fila)
+    def al_terminar(resultado):
+        ruta_resumen, ruta_detalle, totales = resultado
+        mensaje = (f"✓ Creados {os.path.basename(ruta_resumen)} y {os.path.basename(ruta_detalle)}\n"
+                   f"Faltan {totales['bultos_faltantes']} bultos ({totales['filas_faltantes']} filas) · "
+                   f"sobran {totales['bultos_sobrantes']} bultos ({totales['filas_sobrantes']} filas)")
+        mostrar_mensaje_exito(mensaje, label_mensaje)
 
-        # Guardar cambios
-        book.save(ruta_archivo)
+    trabajador.ejecutar(
+        lambda progreso, cancelado: reportes_diferencias(ruta_archivo),
+        "Armando el resumen de diferencias...",
+        al_terminar=al_terminar,
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al armar el resumen de diferencias: {str(e)}"),
+        operacion="resumen_diferencias", archivo=ruta_archivo
+    )
 
+def cerrar_aplicacion(root, archivo_excel):
+    """Antes de cerrar, pasa al Excel las diferencias pendientes"""
+    if es_servidor(obtener_ruta(archivo_excel)):
+        # Las diferencias quedan en el servidor, que las guarda en el Excel (y al terminar)
+        root.destroy()
+        return
+    try:
+        guardar_diferencias(archivo_excel)
     except Exception as e:
-        print(f"Error al agregar diferencias: {str(e)}")
-
-def mostrar_mensaje_no_encontrado(texto, label_mensaje):
-    label_mensaje.configure(text=texto, font=('Arial', 10, 'bold'))
-    label_mensaje.pack(pady=10) 
-
-    # limpiar después de 10 segundos
-    label_mensaje.after(10000, lambda: label_mensaje.configure(text="", font=('Arial', 10)))
+        # Quedan en el diario: se guardan la próxima vez que se abra este Excel
+        if not messagebox.askyesno("Diferencias sin guardar", f"No se pudieron guardar las diferencias en el Excel ({str(e)}).\nQuedan pendientes para la próxima vez. ¿Cerrar igual?"):
+            return
+    root.destroy()
 
-def agregar_diferencias(entry_diferencias, estado_var, archivo_excel, label_mensaje):
-    """Crea PDF para artículo específico"""
+def agregar_diferencias(entry_diferencias, estado_var, archivo_excel, label_mensaje, trabajador):
+    """Agrega al Excel las filas del localizador con su estado"""
     localizador = entry_diferencias.get().strip()
     estado = estado_var.get().strip()
     
@@ -602,23 +560,37 @@ def agregar_diferencias(entry_diferencias, estado_var, archivo_excel, label_mens
         messagebox.showwarning("Advertencia", "Por favor ingresa los campos faltantes")
         return
     
-    try:
-        datos = obtener_datos_por_localizador(localizador, archivo_excel)
+    ruta_archivo = obtener_ruta(archivo_excel)
 
-        if not datos:
+    def tarea(progreso, cancelado):
+        datos = obtener_datos_por_localizador(localizador, ruta_archivo)
+        if not datos or cancelado.is_set():
+            return 0
+        # Desde acá la diferencia queda anotada aunque se cancele
+
+        with etapa("diario"):
+            if not agregar_diferencia(datos, estado, ruta_archivo):
+                raise RuntimeError("No se pudo anotar la diferencia en el diario")
+            return diferencias_pendientes(ruta_archivo)
+
+    def al_terminar(pendientes):
+        if not pendientes:
             mostrar_mensaje_no_encontrado("No se encontró el localizador, escribalo manualmente en la página correspondiente", label_mensaje)
             return
-        
-        agregar_diferencia(datos, estado, archivo_excel)
-        mensaje = "Diferencia agregada!"
-        mostrar_mensaje_exito(mensaje, label_mensaje)
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al agregar diferencia: {str(e)}")
+        mostrar_mensaje_exito(f"Diferencia agregada! ({pendientes} filas pendientes de guardar en el Excel)", label_mensaje)
+
+    trabajador.ejecutar(
+        tarea,
+        "Buscando localizador...",
+        al_terminar=al_terminar,
+        al_fallar=lambda e: messagebox.showerror("Error", f"Error al agregar diferencia: {str(e)}"),
+        operacion="agregar_diferencias", archivo=ruta_archivo, localizador=localizador, estado=estado
+    )
 
 def main():
     root = tk.Tk()
     root.title("Gestionador de artículos")
-    root.geometry("600x400")
+    root.geometry("600x510")
 
     # Variable para guardar el archivo seleccionado
     archivo_excel = tk.StringVar(value="")
@@ -632,26 +604,49 @@ def main():
     # Label para mostrar archivo seleccionado
     lbl_archivo = ttk.Label(root, text="Archivo: (ninguno seleccionado)")
 
+    # Label para mensajes de estado (y progreso de las tareas en segundo plano)
+    label_mensaje = ttk.Label(root, text="", font=('Arial', 10))
+
+    # --- Tareas largas en segundo plano, con botón para cancelar
+    btn_cancelar = ttk.Button(root, text="Cancelar", state="disabled")
+    trabajador = TrabajadorFondo(root, label_mensaje, btn_cancelar)
+    btn_cancelar.configure(command=trabajador.cancelar)
+    # La precarga del archivo va por separado, así no bloquea las búsquedas (que la esperan)
+    precarga = TrabajadorFondo(root, label_mensaje)
+
     # --- Botón para seleccionar archivo
     btn_archivo = ttk.Button(
         root,
         text="Buscar archivo Excel",
-        command=lambda: seleccionar_archivo(archivo_excel, lbl_archivo)
+        command=lambda: seleccionar_archivo(archivo_excel, lbl_archivo, label_mensaje, precarga)
     )
 
-    btn_archivo.pack(pady=10)
+    btn_archivo.pack(pady=(10, 0))
+
+    # --- O usar el inventario que ya tiene cargado un servidor de consultas (servidor.py)
+    ttk.Button(
+        root,
+        text="Conectar a servidor...",
+        command=lambda: conectar_servidor(archivo_excel, lbl_archivo, label_mensaje, precarga)
+    ).pack(pady=(5, 0))
+
+    # --- Si la caché del Excel quedó mal: leerlo de nuevo entero
+    ttk.Button(
+        root,
+        text="Releer Excel (sin caché)",
+        command=lambda: releer_archivo(archivo_excel, label_mensaje, precarga)
+    ).pack(pady=(5, 10))
     lbl_archivo.pack()
 
-    # Label para mensajes de estado
-    label_mensaje = ttk.Label(root, text="", font=('Arial', 10))
-    label_mensaje.pack(side="bottom",pady=30)
+    btn_cancelar.pack(side="bottom", pady=(0, 10))
+    label_mensaje.pack(side="bottom",pady=(30, 5))
 
     # --- Combobox para elegir el modo
     ttk.Label(root, text="Elegí el modo:").pack(pady=(20, 5))
 
     modo_var = tk.StringVar()
     combo_modo = ttk.Combobox(root, textvariable=modo_var, state="readonly")
-    combo_modo["values"] = ("Buscar por artículo", "Buscar por pasillo", "Diferencias")
+    combo_modo["values"] = ("Buscar por artículo", "Varios artículos", "Buscar por pasillo", "Diferencias", "Comparar con anterior")
     combo_modo.pack()
 
     # Contenedor para los formularios
@@ -664,18 +659,46 @@ def main():
     entry_articulo = ttk.Entry(form_buscar_por_articulo)
     entry_articulo.grid(row=0, column=1, pady=5, sticky="ew")
 
+    # Sugerencias mientras se escribe (código o pedazo de la descripción); clic para elegir
+    lista_sugerencias = tk.Listbox(form_buscar_por_articulo, height=5, width=70)
+    lista_sugerencias.grid(row=1, column=0, columnspan=6, pady=5, sticky="ew")
+    lista_sugerencias.sugerencias = []
+    entry_articulo.bind("<KeyRelease>", lambda event: programar_sugerencias(entry_articulo, lista_sugerencias, archivo_excel))
+    lista_sugerencias.bind("<<ListboxSelect>>", lambda event: elegir_sugerencia(entry_articulo, lista_sugerencias, label_mensaje))
+
     ttk.Button(
         form_buscar_por_articulo, 
         text="Obtener PDF", 
-        command=lambda: buscar_por_articulo(entry_articulo, archivo_excel, label_mensaje)
+        command=lambda: buscar_por_articulo(entry_articulo, archivo_excel, label_mensaje, trabajador)
     ).grid(row=2, column=4, columnspan=2, pady=10)
 
     ttk.Button(
         form_buscar_por_articulo, 
         text="Buscar artículo", 
-        command=lambda: buscar_descripcion_articulo(entry_articulo, archivo_excel, label_mensaje)
+        command=lambda: buscar_descripcion_articulo(entry_articulo, archivo_excel, label_mensaje, trabajador)
+    ).grid(row=2, column=0, columnspan=2, pady=10)
+
+    # --- Formulario por Varios artículos (lista pegada o cargada de un CSV/Excel)
+    form_varios_articulos = ttk.Frame(form_container, padding=10)
+    ttk.Label(form_varios_articulos, text="Artículos:").grid(row=0, column=0, sticky="nw", pady=5)
+    text_articulos = tk.Text(form_varios_articulos, height=4, width=30)
+    text_articulos.grid(row=0, column=1, columnspan=3, pady=5, sticky="ew")
+
+    combinado_var = tk.BooleanVar(value=True)
+    ttk.Checkbutton(form_varios_articulos, text="Un solo PDF", variable=combinado_var).grid(row=1, column=1, sticky="w")
+
+    ttk.Button(
+        form_varios_articulos, 
+        text="Cargar lista...", 
+        command=lambda: cargar_lista_articulos(text_articulos, label_mensaje)
     ).grid(row=2, column=0, columnspan=2, pady=10)
 
+    ttk.Button(
+        form_varios_articulos, 
+        text="Obtener PDF", 
+        command=lambda: buscar_varios_articulos(text_articulos, combinado_var, archivo_excel, label_mensaje, trabajador)
+    ).grid(row=2, column=2, columnspan=2, pady=10)
+
     # --- Formulario por Buscar por pasillo
     form_buscar_por_pasillo = ttk.Frame(form_container, padding=10)
     ttk.Label(form_buscar_por_pasillo, text="Pasillo:").grid(row=0, column=0, sticky="w", pady=5)
@@ -685,9 +708,20 @@ def main():
     ttk.Button(
         form_buscar_por_pasillo, 
         text="Obtener PDF", 
-        command=lambda: buscar_por_pasillo(entry_pasillo, archivo_excel, label_mensaje)
+        command=lambda: buscar_por_pasillo(entry_pasillo, archivo_excel, label_mensaje, trabajador)
     ).grid(row=2, column=0, columnspan=2, pady=10)
 
+    # Impresión de todos los pasillos de una vez (filtro opcional: P*, D01-D12)
+    ttk.Label(form_buscar_por_pasillo, text="Filtro (vacío = todos):").grid(row=1, column=0, sticky="w", pady=5)
+    entry_filtro_pasillos = ttk.Entry(form_buscar_por_pasillo)
+    entry_filtro_pasillos.grid(row=1, column=1, pady=5, sticky="ew")
+
+    ttk.Button(
+        form_buscar_por_pasillo, 
+        text="Imprimir todos", 
+        command=lambda: buscar_todos_los_pasillos(entry_filtro_pasillos, archivo_excel, label_mensaje, trabajador)
+    ).grid(row=2, column=2, columnspan=2, pady=10)
+
     # --- Formulario por Diferencias
     form_diferencias = ttk.Frame(form_container, padding=10)
 
@@ -704,14 +738,42 @@ def main():
     ttk.Button(
         form_diferencias, 
         text="Agregar diferencia", 
-        command=lambda: agregar_diferencias(entry_diferencias, estado_var, archivo_excel, label_mensaje)
+        command=lambda: agregar_diferencias(entry_diferencias, estado_var, archivo_excel, label_mensaje, trabajador)
+    ).grid(row=2, column=0, columnspan=2, pady=10)
+
+    ttk.Button(
+        form_diferencias, 
+        text="Guardar en Excel", 
+        command=lambda: guardar_diferencias_en_excel(archivo_excel, label_mensaje, trabajador)
+    ).grid(row=2, column=2, columnspan=2, pady=10)
+
+    ttk.Button(
+        form_diferencias, 
+        text="Resumen de diferencias (PDF)", 
+        command=lambda: resumen_de_diferencias(archivo_excel, label_mensaje, trabajador)
+    ).grid(row=3, column=0, columnspan=4, pady=5)
+
+    # --- Formulario por Comparar con anterior (otro Excel de stock, por ejemplo el de ayer)
+    form_comparar = ttk.Frame(form_container, padding=10)
+    ttk.Label(
+        form_comparar,
+        text="Compara el archivo seleccionado con uno anterior:\nmovidos de localizador, cambios de cantidad, agregados y quitados"
+    ).grid(row=0, column=0, columnspan=4, sticky="w", pady=5)
+
+    ttk.Button(
+        form_comparar, 
+        text="Elegir Excel anterior y comparar", 
+        command=lambda: comparar_con_anterior(archivo_excel, label_mensaje, trabajador)
     ).grid(row=2, column=0, columnspan=2, pady=10)
 
     combo_modo.bind(
         "<<ComboboxSelected>>",
-        lambda event: mostrar_formulario(form_container, modo_var, form_buscar_por_articulo, form_buscar_por_pasillo, form_diferencias)
+        lambda event: mostrar_formulario(form_container, modo_var, form_buscar_por_articulo, form_varios_articulos, form_buscar_por_pasillo, form_diferencias, form_comparar)
     )
 
+    # Al cerrar la ventana se guardan las diferencias pendientes
+    root.protocol("WM_DELETE_WINDOW", lambda: cerrar_aplicacion(root, archivo_excel))
+
     root.mainloop()
 
 if __name__ == "__main__":
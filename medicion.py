@@ -0,0 +1,160 @@
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+CARPETA_LOGS = "logs"
+ARCHIVO_LOG = "operaciones.log"
+TAMANIO_LOG = 2 * 1024 * 1024
+COPIAS_LOG = 5
+CARPETA_PERFILES = os.path.join(CARPETA_LOGS, "perfiles")
+# GESTION_PERFIL=1 guarda un perfil de cProfile de cada operación (para ver en qué se va el tiempo)
+VARIABLE_PERFIL = "GESTION_PERFIL"
+
+_perfil_activo = os.environ.get(VARIABLE_PERFIL) == "1"
+_logger = None
+_lock_logger = threading.Lock()
+# Operación en curso de cada hilo: las funciones de más abajo anotan sus etapas ahí sin recibirla
+_actual = threading.local()
+
+
+def activar_perfil(activo=True):
+    global _perfil_activo
+    _perfil_activo = activo
+
+
+def obtener_logger():
+    """Log de operaciones: una línea JSON por operación, rotando por tamaño"""
+    global _logger
+    with _lock_logger:
+        if _logger is None:
+            logger = logging.getLogger("gestion_articulos.operaciones")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            try:
+                os.makedirs(CARPETA_LOGS, exist_ok=True)
+                handler = RotatingFileHandler(os.path.join(CARPETA_LOGS, ARCHIVO_LOG), maxBytes=TAMANIO_LOG,
+                                              backupCount=COPIAS_LOG, encoding='utf-8')
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            except OSError as e:
+                # Sin log (carpeta de solo lectura, por ejemplo) la aplicación sigue andando igual
+                print(f"Error al abrir el log de operaciones: {str(e)}")
+                logger.addHandler(logging.NullHandler())
+            _logger = logger
+        return _logger
+
+
+class Operacion:
+    """Tiempos por etapa, cantidades y datos de una operación (una búsqueda, un PDF, un guardado)"""
+
+    def __init__(self, nombre, **datos):
+        self.nombre = nombre
+        self.datos = datos
+        self.etapas = {}
+        self.cantidades = {}
+        self.inicio = datetime.now()
+        self.segundos = None
+        self.error = None
+
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(nombre, time.perf_counter() - inicio)
+
+    def sumar(self, etapa, segundos):
+        # Una etapa que se repite (ej: un PDF por pasillo) acumula su tiempo
+        self.etapas[etapa] = self.etapas.get(etapa, 0) + segundos
+
+    def contar(self, clave, cantidad):
+        self.cantidades[clave] = self.cantidades.get(clave, 0) + cantidad
+
+    def registro(self):
+        return {
+            "operacion": self.nombre,
+            "inicio": self.inicio.isoformat(timespec='milliseconds'),
+            "segundos": round(self.segundos, 4) if self.segundos is not None else None,
+            "etapas": {etapa: round(segundos, 4) for etapa, segundos in self.etapas.items()},
+            "cantidades": self.cantidades,
+            "datos": self.datos,
+            "error": self.error,
+        }
+
+    def resumen(self):
+        """Línea corta para mostrar en la ventana: total, etapas y filas"""
+        etapas = " · ".join(f"{etapa} {segundos:.2f}" for etapa, segundos in self.etapas.items())
+        texto = f"⏱ {self.segundos or 0:.2f} s"
+        if etapas:
+            texto += f" ({etapas})"
+        if 'filas' in self.cantidades:
+            texto += f" · {self.cantidades['filas']} filas"
+        return texto
+
+
+def _guardar_perfil(perfil, operacion):
+    os.makedirs(CARPETA_PERFILES, exist_ok=True)
+    ruta = os.path.join(CARPETA_PERFILES, f"{operacion.nombre}-{operacion.inicio:%Y%m%d-%H%M%S-%f}.prof")
+    perfil.dump_stats(ruta)
+    return ruta
+
+
+@contextmanager
+def medir_operacion(nombre, **datos):
+    """Mide todo lo que pasa adentro del with y lo deja en el log al terminar (aunque falle).
+    Con el perfil activo, además guarda un .prof en logs/perfiles."""
+    operacion = Operacion(nombre, **datos)
+    anterior = getattr(_actual, 'operacion', None)
+    _actual.operacion = operacion
+
+    perfil = cProfile.Profile() if _perfil_activo else None
+    inicio = time.perf_counter()
+    if perfil is not None:
+        perfil.enable()
+    try:
+        yield operacion
+    except Exception as e:
+        operacion.error = str(e)
+        raise
+    finally:
+        if perfil is not None:
+            perfil.disable()
+        operacion.segundos = time.perf_counter() - inicio
+        _actual.operacion = anterior
+        try:
+            if perfil is not None:
+                operacion.datos['perfil'] = _guardar_perfil(perfil, operacion)
+            obtener_logger().info(json.dumps(operacion.registro(), ensure_ascii=False, default=str))
+        except Exception as e:
+            print(f"Error al registrar la operación {nombre}: {str(e)}")
+
+
+def operacion_actual():
+    return getattr(_actual, 'operacion', None)
+
+
+def etapa(nombre):
+    """with etapa("filtro"): ... suma el tiempo a la operación en curso (si no hay, no hace nada)"""
+    operacion = operacion_actual()
+    if operacion is None:
+        return nullcontext()
+    return operacion.etapa(nombre)
+
+
+def contar(clave, cantidad):
+    operacion = operacion_actual()
+    if operacion is not None:
+        operacion.contar(clave, cantidad)
+
+
+def anotar(clave, valor):
+    operacion = operacion_actual()
+    if operacion is not None:
+        operacion.datos[clave] = valor
@@ -0,0 +1,573 @@
+import os
+import re
+import time
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.rl_accel import fp_str
+from cache_pdfs import CachePdfs, clave_reporte, soltar_enlace
+
+# Grilla común a todos los reportes: Localizador, Artículo, Descripción, En Mano, LPN
+COLUMNAS_TABLA = [50, 120, 190, 390, 460]
+ENCABEZADOS_TABLA = ["Localizador", "Artículo", "Descripción", "En Mano", "LPN"]
+# Grilla de la comparación de dos libros: dónde está ahora, dónde estaba, y los bultos de antes y de ahora
+COLUMNAS_COMPARACION = [50, 108, 166, 211, 371, 403, 435, 467]
+ENCABEZADOS_COMPARACION = ["Localizador", "Antes en", "Artículo", "Descripción", "Antes", "Ahora", "Dif.", "LPN"]
+LARGO_DESCRIPCION_COMPARACION = 30
+# Diferencias del recuento: detalle de cada fila anotada, y en el resumen los totales por pasillo y por artículo
+COLUMNAS_DETALLE_DIFERENCIAS = [50, 112, 170, 350, 395, 485]
+ENCABEZADOS_DETALLE_DIFERENCIAS = ["Localizador", "Artículo", "Descripción", "Bultos", "LPN", "Estado"]
+COLUMNAS_PASILLOS_DIFERENCIAS = [50, 92, 134, 184, 240, 294, 352, 412, 456, 508]
+ENCABEZADOS_PASILLOS_DIFERENCIAS = ["Pasillo", "Filas", "Bultos", "Falt. filas", "Falt. bultos",
+                                    "Sobr. filas", "Sobr. bultos", "Neto", "% filas", "% bultos"]
+COLUMNAS_ARTICULOS_DIFERENCIAS = [50, 110, 290, 345, 400, 450, 510]
+ENCABEZADOS_ARTICULOS_DIFERENCIAS = ["Artículo", "Descripción", "Faltante", "Sobrante", "Neto", "Neto UN", "Localiz."]
+ALTO_FILA = 15
+MARGEN_SUPERIOR = 50
+MARGEN_INFERIOR = 60
+FUENTE_ENCABEZADO = 9
+FUENTE_DATOS = 8
+LARGO_DESCRIPCION = 35
+
+# Escape de strings PDF (mismo resultado que el de reportlab, pero con str.translate)
+_ESCAPE_PDF = {c: '\\%03o' % c for c in list(range(32)) + list(range(127, 256))}
+_ESCAPE_PDF.update({ord('\\'): '\\\\', ord('('): '\\(', ord(')'): '\\)'})
+
+
+def _literal_pdf(texto):
+    """Texto listo para un operador Tj con Helvetica (WinAnsi), o None si tiene caracteres
+    que la fuente no tiene (esos los dibuja reportlab con su fuente de reemplazo)"""
+    try:
+        return texto.encode('cp1252').decode('latin-1').translate(_ESCAPE_PDF)
+    except UnicodeEncodeError:
+        return None
+
+
+class TablaPdf:
+    """Dibuja la tabla de los reportes sobre un canvas.
+    Las celdas (encabezado, filas pares/impares y páginas completas de filas) se arman una
+    sola vez como formularios (XObject) y cada página solo los referencia; el texto de cada
+    página va en un único objeto de texto. Las filas se consumen de un iterador de tuplas de
+    textos ya formateados (uno por columna), así no hace falta tener todo el reporte armado en memoria."""
+
+    def __init__(self, c, columnas=COLUMNAS_TABLA, encabezados=ENCABEZADOS_TABLA, prefijo=""):
+        self.c = c
+        self.columnas = columnas
+        self.encabezados = encabezados
+        # Los formularios son del documento: dos tablas con otra grilla en el mismo PDF usan otro prefijo
+        self.prefijo = prefijo
+        self.width, self.height = c._pagesize
+        self.y_inicial = self.height - MARGEN_SUPERIOR
+        self.indice = 0
+        self._formularios = set()
+
+    def _rects(self, y_pos):
+        for j, col_x in enumerate(self.columnas):
+            fin = self.columnas[j+1] if j < len(self.columnas) - 1 else self.width - 50
+            self.c.rect(col_x, y_pos - ALTO_FILA + 5, fin - col_x, ALTO_FILA, fill=1, stroke=1)
+
+    def _gris(self, indice):
+        # Fondo alternado
+        return 0.98 if indice % 2 == 0 else 1
+
+    def _formulario(self, nombre, dibujar, fila=True):
+        nombre = self.prefijo + nombre
+        if nombre not in self._formularios:
+            # Las filas se dibujan alrededor de y=0: el recuadro del formulario tiene que incluir y < 0
+            abajo, arriba = (-ALTO_FILA, ALTO_FILA) if fila else (0, self.height)
+            self.c.beginForm(nombre, lowerx=0, lowery=abajo, upperx=self.width, uppery=arriba)
+            dibujar()
+            self.c.endForm()
+            self._formularios.add(nombre)
+        return nombre
+
+    def _usar(self, nombre, y_pos):
+        # Los formularios de una fila se dibujan en y=0 y se trasladan a su lugar
+        self.c.saveState()
+        self.c.translate(0, y_pos)
+        self.c.doForm(nombre)
+        self.c.restoreState()
+
+    def encabezado(self, y_pos):
+        def dibujar():
+            self.c.setFillColorRGB(0.9, 0.9, 0.9)
+            self._rects(0)
+            self.c.setFillColorRGB(0, 0, 0)
+            self.c.setFont("Helvetica-Bold", FUENTE_ENCABEZADO)
+            for header, col_x in zip(self.encabezados, self.columnas):
+                self.c.drawString(col_x + 2, -8, header)
+        self._usar(self._formulario("encabezado", dibujar), y_pos)
+
+    def _grilla(self, y_pos, cantidad):
+        if y_pos == self.y_inicial - ALTO_FILA and cantidad == self.capacidad(y_pos):
+            # Página completa: un solo formulario con todas las celdas (dos variantes según la paridad)
+            paridad = self.indice % 2
+            def dibujar():
+                for k in range(cantidad):
+                    self.c.setFillColorRGB(*[self._gris(paridad + k)] * 3)
+                    self._rects(y_pos - k * ALTO_FILA)
+            self.c.doForm(self._formulario(f"pagina{paridad}", dibujar, fila=False))
+            return
+
+        for k in range(cantidad):
+            gris = self._gris(self.indice + k)
+            def dibujar(gris=gris):
+                self.c.setFillColorRGB(gris, gris, gris)
+                self._rects(0)
+            self._usar(self._formulario(f"fila{gris}", dibujar), y_pos - k * ALTO_FILA)
+
+    def _texto(self, bloque, y_pos):
+        # Todo el texto de la página en un solo bloque BT/ET con movimientos relativos (Td):
+        # el ancho de cada texto no importa y no se formatea una coordenada por celda
+        self.c.setFillColorRGB(0, 0, 0)
+        self.c.setFont("Helvetica", FUENTE_DATOS)
+        columnas = self.columnas
+        saltos = [fp_str(columnas[j+1] - columnas[j]) + " 0 Td" for j in range(len(columnas) - 1)]
+        nueva_fila = f"{fp_str(columnas[0] - columnas[-1])} {fp_str(-ALTO_FILA)} Td"
+
+        operadores = [f"BT {fp_str(columnas[0] + 2)} {fp_str(y_pos - 8)} Td"]
+        raros = []
+        for k, fila in enumerate(bloque):
+            if k:
+                operadores.append(nueva_fila)
+            for j, valor in enumerate(fila):
+                if j:
+                    operadores.append(saltos[j-1])
+                literal = _literal_pdf(valor)
+                if literal is None:
+                    raros.append((columnas[j] + 2, y_pos - k * ALTO_FILA - 8, valor))
+                elif literal:
+                    operadores.append(f"({literal}) Tj")
+        operadores.append("ET")
+        self.c.addLiteral("\n".join(operadores))
+
+        for x, y, valor in raros:
+            self.c.drawString(x, y, valor)
+
+    def capacidad(self, y_pos):
+        """Cuántas filas entran desde y_pos hasta el margen inferior"""
+        if y_pos < MARGEN_INFERIOR:
+            return 0
+        return int((y_pos - MARGEN_INFERIOR) // ALTO_FILA) + 1
+
+    def nueva_pagina(self):
+        self.c.showPage()
+        return self.y_inicial
+
+    def escribir_filas(self, filas, y_pos):
+        """Escribe las filas desde y_pos, cortando página (con encabezado) cuando hace falta.
+        Devuelve la posición donde quedó."""
+        filas = iter(filas)
+        pendiente = next(filas, None)
+        while pendiente is not None:
+            cantidad = self.capacidad(y_pos)
+            if cantidad == 0:  # salto de página
+                y_pos = self.nueva_pagina()
+                self.encabezado(y_pos)
+                y_pos -= ALTO_FILA
+                continue
+
+            bloque = [pendiente] + list(islice(filas, cantidad - 1))
+            pendiente = next(filas, None)
+
+            self._grilla(y_pos, len(bloque))
+
+            self._texto(bloque, y_pos)
+
+            y_pos -= ALTO_FILA * len(bloque)
+            self.indice += len(bloque)
+
+        return y_pos
+
+
+def _texto_descripcion(descripciones, largo=LARGO_DESCRIPCION):
+    # Descripción más corta para encajar
+    textos = [str(desc) for desc in descripciones]
+    return [texto[:largo] + "..." if len(texto) > largo else texto for texto in textos]
+
+
+def _columnas(filas):
+    # Las consultas devuelven las filas ya separadas por columna; una lista de tuplas se separa acá
+    columnas = getattr(filas, 'columnas', None)
+    return columnas if columnas is not None else tuple(zip(*filas))
+
+
+# Los datos llegan normalizados desde la carga (códigos limpios, En Mano entero, LPN con "-"):
+# acá solo se pasan a texto, columna por columna
+def textos_articulo(datos_por_articulo):
+    """Filas (articulo, descripcion, en_mano, localizador, lpn) -> textos en el orden de la tabla"""
+    if not datos_por_articulo:
+        return []
+    articulos, descripciones, en_mano, localizadores, lpns = _columnas(datos_por_articulo)
+    return zip(map(str, localizadores), map(str, articulos), _texto_descripcion(descripciones),
+               map(str, en_mano), map(str, lpns))
+
+
+def textos_pasillo(datos_por_pasillo):
+    """Filas (localizador, articulo, descripcion, en_mano, lpn) -> textos de la tabla"""
+    if not datos_por_pasillo:
+        return []
+    localizadores, articulos, descripciones, en_mano, lpns = _columnas(datos_por_pasillo)
+    return zip(map(str, localizadores), map(str, articulos), _texto_descripcion(descripciones),
+               map(str, en_mano), map(str, lpns))
+
+
+def textos_comparacion(filas):
+    """Filas (localizador, localizador anterior, articulo, descripcion, antes, ahora, diferencia, lpn) -> textos"""
+    if not filas:
+        return []
+    localizadores, anteriores, articulos, descripciones, antes, ahora, diferencias, lpns = _columnas(filas)
+    return zip(map(str, localizadores), map(str, anteriores), map(str, articulos),
+               _texto_descripcion(descripciones, LARGO_DESCRIPCION_COMPARACION),
+               map(str, antes), map(str, ahora), map(_con_signo, diferencias), map(str, lpns))
+
+
+def _con_signo(numero):
+    return f"{numero:+d}" if numero else "0"
+
+
+def _porcentaje(valor):
+    # Sin stock en el pasillo no hay tasa
+    return "-" if valor is None or valor != valor else f"{valor:.1f}%"
+
+
+def textos_detalle_diferencias(filas):
+    """Filas (localizador, articulo, descripcion, bultos, lpn, estado) -> textos"""
+    if not filas:
+        return []
+    localizadores, articulos, descripciones, bultos, lpns, estados = _columnas(filas)
+    return zip(map(str, localizadores), map(str, articulos), _texto_descripcion(descripciones),
+               map(str, bultos), map(str, lpns), map(str, estados))
+
+
+def textos_pasillos_diferencias(filas):
+    """Filas (pasillo, filas y bultos del stock, filas y bultos faltantes, filas y bultos sobrantes,
+    neto, % filas, % bultos) -> textos"""
+    if not filas:
+        return []
+    pasillos, filas_stock, bultos_stock, filas_faltantes, bultos_faltantes, filas_sobrantes, bultos_sobrantes, \
+        netos, tasas_filas, tasas_bultos = _columnas(filas)
+    return zip(map(str, pasillos), map(str, filas_stock), map(str, bultos_stock), map(str, filas_faltantes),
+               map(str, bultos_faltantes), map(str, filas_sobrantes), map(str, bultos_sobrantes),
+               map(_con_signo, netos), map(_porcentaje, tasas_filas), map(_porcentaje, tasas_bultos))
+
+
+def textos_articulos_diferencias(filas):
+    """Filas (articulo, descripcion, bultos faltantes, bultos sobrantes, neto, neto en unidades, localizadores) -> textos"""
+    if not filas:
+        return []
+    articulos, descripciones, faltantes, sobrantes, netos, netos_unidades, localizadores = _columnas(filas)
+    return zip(map(str, articulos), _texto_descripcion(descripciones), map(str, faltantes), map(str, sobrantes),
+               map(_con_signo, netos), map(_con_signo, netos_unidades), map(str, localizadores))
+
+
+def _nuevo_canvas(nombre_pdf, carpeta_destino, invariant):
+    # Crear la carpeta si no existe
+    if not os.path.exists(carpeta_destino):
+        os.makedirs(carpeta_destino)
+
+    ruta_completa = os.path.join(carpeta_destino, nombre_pdf)
+    soltar_enlace(ruta_completa)
+    # invariant=1: sin fecha ni ID aleatorio, mismos datos -> mismos bytes
+    return ruta_completa, canvas.Canvas(ruta_completa, pagesize=letter, invariant=invariant)
+
+
+def _sin_datos(c, texto):
+    c.setFont("Helvetica", FUENTE_DATOS)
+    c.drawString(50, c._pagesize[1] - MARGEN_SUPERIOR, texto)
+    c.save()
+
+
+def crear_pdf_tabla(c, filas):
+    """Encabezado + filas (textos ya formateados) y guarda el PDF"""
+    tabla = TablaPdf(c)
+    tabla.encabezado(tabla.y_inicial)
+    tabla.escribir_filas(filas, tabla.y_inicial - ALTO_FILA)
+    c.save()
+
+
+def _generar(nombre_pdf, carpeta_destino, clave, dibujar):
+    """Reutiliza el PDF guardado con esa clave o lo dibuja (dibujar()) y lo guarda en la caché.
+    Sin clave se dibuja siempre."""
+    if clave is None:
+        return dibujar()
+
+    ruta_completa = os.path.join(carpeta_destino, nombre_pdf)
+    with CachePdfs(carpeta_destino) as cache:
+        if not cache.reutilizar(clave, ruta_completa):
+            dibujar()
+            cache.registrar(clave, ruta_completa)
+    return ruta_completa
+
+
+def _pdf_articulo(nombre_archivo, datos_por_articulo, carpeta_destino, invariant):
+    ruta_completa, c = _nuevo_canvas(f"{nombre_archivo}.pdf", carpeta_destino, invariant)
+
+    if not datos_por_articulo:
+        _sin_datos(c, "No se encontraron datos para este artículo.")
+        return ruta_completa
+
+    crear_pdf_tabla(c, textos_articulo(datos_por_articulo))
+    return ruta_completa
+
+
+def _pdf_pasillo(pasillo, datos_por_pasillo, carpeta_destino, invariant):
+    ruta_completa, c = _nuevo_canvas(f"pasillo{pasillo}.pdf", carpeta_destino, invariant)
+
+    if not datos_por_pasillo:
+        _sin_datos(c, f"No se encontraron datos para el pasillo {pasillo}.")
+        return ruta_completa
+
+    crear_pdf_tabla(c, textos_pasillo(datos_por_pasillo))
+    return ruta_completa
+
+
+def _nombre_pdf(tipo, nombre):
+    return f"pasillo{nombre}.pdf" if tipo == "pasillo" else f"{nombre}.pdf"
+
+
+def crear_pdf_articulo(nombre_archivo, datos_por_articulo, carpeta_destino="pdfs", invariant=None, cache=True):
+    clave = clave_reporte("articulo", nombre_archivo, invariant, datos_por_articulo) if cache else None
+    return _generar(_nombre_pdf("articulo", nombre_archivo), carpeta_destino, clave,
+                    lambda: _pdf_articulo(nombre_archivo, datos_por_articulo, carpeta_destino, invariant))
+
+
+def crear_pdf_pasillo(pasillo, datos_por_pasillo, carpeta_destino="pdfs", invariant=None, cache=True):
+    clave = clave_reporte("pasillo", pasillo, invariant, datos_por_pasillo) if cache else None
+    return _generar(_nombre_pdf("pasillo", pasillo), carpeta_destino, clave,
+                    lambda: _pdf_pasillo(pasillo, datos_por_pasillo, carpeta_destino, invariant))
+
+
+def _titulo_bloque(c, texto, y_position):
+    # Título de un bloque (un artículo, una sección) en negrita; devuelve dónde sigue la tabla
+    c.setFillColorRGB(0, 0, 0)
+    c.setFont("Helvetica-Bold", FUENTE_ENCABEZADO + 1)
+    c.drawString(COLUMNAS_TABLA[0], y_position - 8, texto)
+    return y_position - ALTO_FILA - 5
+
+
+def crear_pdf_articulos(nombre_archivo, datos_por_articulo, no_encontrados=(), carpeta_destino="pdfs", invariant=None, cache=True):
+    """Un solo PDF con varios artículos: un bloque por artículo (con su total) y al final
+    la lista de códigos no encontrados. datos_por_articulo: {articulo: filas de obtener_datos_por_articulo}"""
+    clave = clave_reporte("articulos", nombre_archivo, invariant, datos_por_articulo, list(no_encontrados)) if cache else None
+    return _generar(f"{nombre_archivo}.pdf", carpeta_destino, clave,
+                    lambda: _pdf_articulos(nombre_archivo, datos_por_articulo, no_encontrados, carpeta_destino, invariant))
+
+
+def _pdf_articulos(nombre_archivo, datos_por_articulo, no_encontrados, carpeta_destino, invariant):
+    ruta_completa, c = _nuevo_canvas(f"{nombre_archivo}.pdf", carpeta_destino, invariant)
+    tabla = TablaPdf(c)
+    y_position = tabla.y_inicial
+
+    for articulo, filas in datos_por_articulo.items():
+        # Título del artículo + encabezados + al menos una fila en la misma página
+        if y_position < MARGEN_INFERIOR + 3 * ALTO_FILA:
+            y_position = tabla.nueva_pagina()
+
+        descripcion = str(filas[0][1]) if filas else ""
+        total = sum(_columnas(filas)[2]) if filas else 0
+        y_position = _titulo_bloque(c, f"Artículo {articulo} - {descripcion[:50]}  (Total: {total})", y_position)
+
+        tabla.encabezado(y_position)
+        # Cada bloque arranca con fondo claro
+        tabla.indice = 0
+        y_position = tabla.escribir_filas(textos_articulo(filas), y_position - ALTO_FILA)
+        y_position -= ALTO_FILA
+
+    if no_encontrados:
+        if y_position < MARGEN_INFERIOR + 2 * ALTO_FILA:
+            y_position = tabla.nueva_pagina()
+        y_position = _titulo_bloque(c, f"No encontrados ({len(no_encontrados)})", y_position)
+
+        # Los códigos van en renglones de a varios
+        por_renglon = 10
+        for inicio in range(0, len(no_encontrados), por_renglon):
+            if y_position < MARGEN_INFERIOR:
+                y_position = tabla.nueva_pagina()
+            c.setFont("Helvetica", FUENTE_DATOS)
+            c.drawString(COLUMNAS_TABLA[0], y_position - 8, ", ".join(map(str, no_encontrados[inicio:inicio + por_renglon])))
+            y_position -= ALTO_FILA
+
+    c.save()
+    return ruta_completa
+
+
+def _escribir_secciones(c, tabla, bloques, textos, y_position):
+    """Una sección por bloque con filas: título con la cantidad, encabezados y la tabla.
+    bloques: {título de la sección: filas}; textos: función que pasa las filas a textos"""
+    for seccion, filas in bloques.items():
+        if not filas:
+            continue
+        # Título de la sección + encabezados + al menos una fila en la misma página
+        if y_position < MARGEN_INFERIOR + 3 * ALTO_FILA:
+            y_position = tabla.nueva_pagina()
+        y_position = _titulo_bloque(c, f"{seccion} ({len(filas)})", y_position)
+
+        tabla.encabezado(y_position)
+        tabla.indice = 0
+        y_position = tabla.escribir_filas(textos(filas), y_position - ALTO_FILA)
+        y_position -= ALTO_FILA
+    return y_position
+
+
+def _sin_filas(c, texto, y_position):
+    c.setFont("Helvetica", FUENTE_DATOS)
+    c.drawString(COLUMNAS_TABLA[0], y_position - 8, texto)
+    c.save()
+
+
+def crear_pdf_comparacion(nombre_archivo, titulo, bloques, carpeta_destino="pdfs", invariant=None):
+    """PDF de la comparación de dos libros: un título general y una sección por tipo de cambio
+    (con su cantidad), cada una con la tabla de comparación. bloques: {título de la sección: filas}"""
+    ruta_completa, c = _nuevo_canvas(f"{nombre_archivo}.pdf", carpeta_destino, invariant)
+    tabla = TablaPdf(c, COLUMNAS_COMPARACION, ENCABEZADOS_COMPARACION)
+    y_position = _titulo_bloque(c, titulo, tabla.y_inicial)
+
+    if not any(bloques.values()):
+        _sin_filas(c, "No hay diferencias entre los dos archivos.", y_position)
+        return ruta_completa
+
+    _escribir_secciones(c, tabla, bloques, textos_comparacion, y_position)
+    c.save()
+    return ruta_completa
+
+
+def crear_pdf_detalle_diferencias(nombre_archivo, titulo, bloques, carpeta_destino="pdfs", invariant=None, cache=True):
+    """PDF con cada diferencia anotada, una sección por pasillo. bloques: {título de la sección: filas}"""
+    def dibujar():
+        ruta_completa, c = _nuevo_canvas(f"{nombre_archivo}.pdf", carpeta_destino, invariant)
+        tabla = TablaPdf(c, COLUMNAS_DETALLE_DIFERENCIAS, ENCABEZADOS_DETALLE_DIFERENCIAS)
+        y_position = _titulo_bloque(c, titulo, tabla.y_inicial)
+        if not any(bloques.values()):
+            _sin_filas(c, "No hay diferencias anotadas.", y_position)
+            return ruta_completa
+        _escribir_secciones(c, tabla, bloques, textos_detalle_diferencias, y_position)
+        c.save()
+        return ruta_completa
+
+    clave = clave_reporte("detalle_diferencias", nombre_archivo, titulo, invariant, bloques) if cache else None
+    return _generar(f"{nombre_archivo}.pdf", carpeta_destino, clave, dibujar)
+
+
+def crear_pdf_resumen_diferencias(nombre_archivo, titulo, totales, pasillos, articulos, carpeta_destino="pdfs",
+                                  invariant=None, cache=True):
+    """PDF resumen de las diferencias: renglones de totales, la tabla por pasillo (con la tasa de
+    diferencias sobre el stock de cada uno) y la tabla por artículo"""
+    def dibujar():
+        ruta_completa, c = _nuevo_canvas(f"{nombre_archivo}.pdf", carpeta_destino, invariant)
+        tabla_pasillos = TablaPdf(c, COLUMNAS_PASILLOS_DIFERENCIAS, ENCABEZADOS_PASILLOS_DIFERENCIAS, prefijo="pasillos_")
+        tabla_articulos = TablaPdf(c, COLUMNAS_ARTICULOS_DIFERENCIAS, ENCABEZADOS_ARTICULOS_DIFERENCIAS, prefijo="articulos_")
+        y_position = _titulo_bloque(c, titulo, tabla_pasillos.y_inicial)
+
+        c.setFont("Helvetica", FUENTE_DATOS + 1)
+        for renglon in totales:
+            c.drawString(COLUMNAS_TABLA[0], y_position - 8, renglon)
+            y_position -= ALTO_FILA
+        y_position -= ALTO_FILA
+
+        if not pasillos:
+            _sin_filas(c, "No hay diferencias anotadas.", y_position)
+            return ruta_completa
+        y_position = _escribir_secciones(c, tabla_pasillos, {"Por pasillo": pasillos}, textos_pasillos_diferencias, y_position)
+        _escribir_secciones(c, tabla_articulos, {"Por artículo": articulos}, textos_articulos_diferencias, y_position)
+        c.save()
+        return ruta_completa
+
+    clave = clave_reporte("resumen_diferencias", nombre_archivo, titulo, invariant, list(totales), pasillos, articulos) if cache else None
+    return _generar(f"{nombre_archivo}.pdf", carpeta_destino, clave, dibujar)
+
+
+def contar_paginas(ruta_pdf):
+    """Cantidad de páginas de un PDF generado por estas funciones"""
+    with open(ruta_pdf, 'rb') as f:
+        return len(re.findall(rb'/Type /Page\b(?!s)', f.read()))
+
+
+def _renderizar(trabajo):
+    # Se ejecuta dentro de cada proceso: recibe solo las filas ya armadas, no el Excel.
+    # La caché la maneja el proceso principal (un solo escritor del manifiesto).
+    tipo, nombre, datos, carpeta_destino, invariant = trabajo
+    inicio = time.perf_counter()
+    if tipo == "pasillo":
+        ruta = crear_pdf_pasillo(nombre, datos, carpeta_destino, invariant=invariant, cache=False)
+    else:
+        ruta = crear_pdf_articulo(nombre, datos, carpeta_destino, invariant=invariant, cache=False)
+    return ruta, time.perf_counter() - inicio
+
+
+def renderizar_pdfs(trabajos, trabajadores=None, invariant=None, progreso=None, cancelado=None, detalle=False, cache=True):
+    """Renderiza una lista de trabajos (tipo, nombre, datos, carpeta_destino) en varios procesos.
+    tipo es "pasillo" o "articulo". Devuelve las rutas en el mismo orden que los trabajos
+    (con detalle=True, tuplas (ruta, segundos de renderizado)).
+    Los PDFs cuyos datos no cambiaron desde la última vez se toman de la caché sin renderizar.
+    progreso(hechos, total) se llama después de cada PDF; si cancelado (threading.Event)
+    se activa, no se empiezan más PDFs y se devuelven los que ya estaban listos."""
+    trabajos = [tuple(trabajo) + (invariant,) for trabajo in trabajos]
+    if not trabajos:
+        return []
+
+    resultados = [None] * len(trabajos)
+    hechos = 0
+    caches = {}
+    claves = {}
+    pendientes = []
+
+    # Crear las carpetas antes, para que los procesos no compitan creándolas
+    for carpeta_destino in {trabajo[3] for trabajo in trabajos}:
+        os.makedirs(carpeta_destino, exist_ok=True)
+        if cache:
+            caches[carpeta_destino] = CachePdfs(carpeta_destino)
+
+    try:
+        for indice, trabajo in enumerate(trabajos):
+            tipo, nombre, datos, carpeta_destino, _ = trabajo
+            if not cache:
+                pendientes.append(indice)
+                continue
+            inicio = time.perf_counter()
+            claves[indice] = clave_reporte(tipo, nombre, invariant, datos)
+            ruta = os.path.join(carpeta_destino, _nombre_pdf(tipo, nombre))
+            if caches[carpeta_destino].reutilizar(claves[indice], ruta):
+                resultados[indice] = (ruta, time.perf_counter() - inicio)
+                hechos += 1
+                if progreso:
+                    progreso(hechos, len(trabajos))
+            else:
+                pendientes.append(indice)
+
+        def terminado(indice, resultado):
+            nonlocal hechos
+            resultados[indice] = resultado
+            if cache:
+                caches[trabajos[indice][3]].registrar(claves[indice], resultado[0])
+            hechos += 1
+            if progreso:
+                progreso(hechos, len(trabajos))
+
+        if trabajadores is None:
+            trabajadores = os.cpu_count() or 1
+        trabajadores = min(trabajadores, len(pendientes))
+
+        # Un solo trabajador: mismo camino, sin levantar procesos
+        if trabajadores <= 1:
+            for indice in pendientes:
+                if cancelado is not None and cancelado.is_set():
+                    break
+                terminado(indice, _renderizar(trabajos[indice]))
+        else:
+            with ProcessPoolExecutor(max_workers=trabajadores) as executor:
+                futuros = [(indice, executor.submit(_renderizar, trabajos[indice])) for indice in pendientes]
+                for indice, futuro in futuros:
+                    if cancelado is not None and cancelado.is_set():
+                        # Los que no arrancaron se descartan; los que están corriendo terminan solos
+                        for _, pendiente in futuros:
+                            pendiente.cancel()
+                        break
+                    terminado(indice, futuro.result())
+    finally:
+        for cache_carpeta in caches.values():
+            cache_carpeta.guardar_manifiesto()
+
+    rutas = [resultado for resultado in resultados if resultado is not None]
+    return rutas if detalle else [ruta for ruta, _ in rutas]
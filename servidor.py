@@ -0,0 +1,284 @@
+"""Servidor de consultas: una sola copia del inventario cargada e indexada, compartida por
+varias terminales por HTTP/JSON (en la misma PC o en la red local).
+
+Ejemplos:
+    python servidor.py --archivo stock.xlsx                   (solo esta PC, puerto 8765)
+    python servidor.py --archivo stock.xlsx --host 0.0.0.0    (toda la red local)
+
+No pide usuario ni clave: con --host 0.0.0.0 cualquiera en la red puede consultar y también
+anotar y guardar diferencias en el Excel. --solo-lectura deja solo las consultas.
+
+Las terminales se conectan con "Conectar a servidor" en main.py, o con
+cli.py ... --archivo http://PC:8765.
+"""
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from inventario import obtener_inventario, MOTORES, MOTOR_POR_DEFECTO
+from consultas import (
+    obtener_datos_por_articulo, obtener_datos_por_articulos, obtener_datos_por_pasillo,
+    obtener_datos_por_localizador, obtener_descripcion, buscar_por_descripcion, trabajos_pasillos
+)
+from diferencias import agregar_diferencia, guardar_diferencias, diferencias_pendientes
+from analisis_diferencias import analisis_diferencias, analisis_a_json
+from busqueda import LIMITE_SUGERENCIAS
+from medicion import medir_operacion
+from cliente import PUERTO_POR_DEFECTO
+
+HOST_POR_DEFECTO = "127.0.0.1"
+HOSTS_LOCALES = ("127.0.0.1", "localhost", "::1")
+# Una conexión sin pedidos se cierra a los 5 minutos (el cliente abre otra sola)
+TIEMPO_INACTIVA = 300
+LARGO_MAXIMO_PEDIDO = 10 * 1024 * 1024
+
+
+def _columnas(filas):
+    # Filas de las consultas (FilasReporte) -> una lista por columna, como viajan en el JSON
+    return [list(columna) for columna in filas.columnas] if filas else []
+
+
+def _parametro(parametros, nombre):
+    valores = parametros.get(nombre)
+    if not valores or not valores[0].strip():
+        raise ValueError(f"Falta el parámetro {nombre}")
+    return valores[0].strip()
+
+
+class ManejadorConsultas(BaseHTTPRequestHandler):
+    """Atiende los pedidos de una conexión. Con HTTP/1.1 la conexión queda abierta entre
+    pedidos, así cada terminal reutiliza la suya en vez de conectarse en cada búsqueda."""
+    protocol_version = "HTTP/1.1"
+    timeout = TIEMPO_INACTIVA
+    # Encabezados y JSON salen en dos escrituras: sin esto, en una conexión reutilizada cada
+    # respuesta espera ~40 ms al ACK demorado del cliente
+    disable_nagle_algorithm = True
+
+    # (método, ruta) -> (nombre de la operación, función que arma la respuesta)
+    RUTAS = {}
+    # Rutas que escriben (diario de diferencias y Excel): no se atienden con --solo-lectura
+    RUTAS_ESCRITURA = set()
+
+    def log_message(self, formato, *args):
+        # Cada pedido ya queda en logs/operaciones.log con sus tiempos
+        pass
+
+    def _responder(self, estado, datos):
+        contenido = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(contenido)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def _leer_cuerpo(self):
+        """Bytes del cuerpo del pedido. Uno demasiado grande (o sin un largo válido) no se lee:
+        la conexión se cierra después de responder, así esos bytes no se toman como otro pedido."""
+        try:
+            largo = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            largo = -1
+        if largo < 0 or largo > LARGO_MAXIMO_PEDIDO:
+            self.close_connection = True
+            raise ValueError("Pedido demasiado grande" if largo > 0 else "Content-Length inválido")
+        return self.rfile.read(largo)
+
+    def _cuerpo(self):
+        contenido = self._leer_cuerpo()
+        return json.loads(contenido.decode('utf-8')) if contenido else {}
+
+    def _rechazar(self, estado, mensaje):
+        # El cuerpo se descarta igual, para que la conexión quede lista para el próximo pedido
+        try:
+            self._leer_cuerpo()
+        except ValueError:
+            pass
+        self._responder(estado, {"error": mensaje})
+
+    def _atender(self, metodo):
+        partes = urlsplit(self.path)
+        clave = (metodo, partes.path.rstrip('/') or '/')
+        ruta = self.RUTAS.get(clave)
+        if ruta is None:
+            self._rechazar(404, f"No existe {metodo} {partes.path}")
+            return
+        if self.server.solo_lectura and clave in self.RUTAS_ESCRITURA:
+            self._rechazar(403, "El servidor es de solo lectura: no se pueden anotar ni guardar diferencias")
+            return
+
+        nombre, funcion = ruta
+        archivo_excel = self.server.archivo_excel
+        try:
+            cuerpo = self._cuerpo() if metodo == "POST" else {}
+            with medir_operacion(f"servidor_{nombre}", archivo=archivo_excel, cliente=self.client_address[0]):
+                respuesta = funcion(archivo_excel, parse_qs(partes.query), cuerpo)
+        except ValueError as e:
+            self._responder(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._responder(500, {"error": str(e)})
+            return
+        self._responder(200, respuesta)
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+
+def _estado(archivo_excel, parametros, cuerpo):
+    inventario = obtener_inventario(archivo_excel)
+    return {
+        "archivo": archivo_excel,
+        "resumen": inventario.resumen(),
+        "filas": len(inventario.stock),
+        "pendientes": diferencias_pendientes(archivo_excel),
+    }
+
+
+def _articulo(archivo_excel, parametros, cuerpo):
+    return {"columnas": _columnas(obtener_datos_por_articulo(_parametro(parametros, "codigo"), archivo_excel))}
+
+
+def _articulos(archivo_excel, parametros, cuerpo):
+    datos_por_articulo, no_encontrados = obtener_datos_por_articulos(cuerpo.get("codigos") or [], archivo_excel)
+    return {
+        "articulos": {articulo: _columnas(filas) for articulo, filas in datos_por_articulo.items()},
+        "no_encontrados": no_encontrados,
+    }
+
+
+def _pasillo(archivo_excel, parametros, cuerpo):
+    return {"columnas": _columnas(obtener_datos_por_pasillo(_parametro(parametros, "pasillo").upper(), archivo_excel))}
+
+
+def _pasillos(archivo_excel, parametros, cuerpo):
+    filtro = parametros.get("filtro", [None])[0]
+    return {"pasillos": [[nombre, _columnas(datos)] for _, nombre, datos, _ in trabajos_pasillos(archivo_excel, filtro)]}
+
+
+def _localizador(archivo_excel, parametros, cuerpo):
+    return {"columnas": _columnas(obtener_datos_por_localizador(_parametro(parametros, "localizador"), archivo_excel))}
+
+
+def _descripcion(archivo_excel, parametros, cuerpo):
+    return {"descripcion": obtener_descripcion(_parametro(parametros, "codigo"), archivo_excel)}
+
+
+def _buscar(archivo_excel, parametros, cuerpo):
+    limite = int(parametros.get("limite", [LIMITE_SUGERENCIAS])[0])
+    sugerencias = buscar_por_descripcion(_parametro(parametros, "texto"), archivo_excel, limite)
+    return {"articulos": [list(sugerencia) for sugerencia in sugerencias]}
+
+
+def _agregar_diferencia(archivo_excel, parametros, cuerpo):
+    filas, estado = cuerpo.get("filas"), cuerpo.get("estado")
+    if not filas or estado not in ("FALTANTE", "SOBRANTE"):
+        raise ValueError("Faltan las filas o el estado (FALTANTE / SOBRANTE)")
+    if not agregar_diferencia(filas, estado, archivo_excel):
+        raise RuntimeError("No se pudo anotar la diferencia en el diario del servidor")
+    return {"pendientes": diferencias_pendientes(archivo_excel)}
+
+
+def _diferencias(archivo_excel, parametros, cuerpo):
+    return {"pendientes": diferencias_pendientes(archivo_excel)}
+
+
+def _guardar_diferencias(archivo_excel, parametros, cuerpo):
+    return {"guardadas": guardar_diferencias(archivo_excel)}
+
+
+def _analisis_diferencias(archivo_excel, parametros, cuerpo):
+    return analisis_a_json(analisis_diferencias(archivo_excel))
+
+
+ManejadorConsultas.RUTAS = {
+    ("GET", "/estado"): ("estado", _estado),
+    ("GET", "/articulo"): ("articulo", _articulo),
+    ("POST", "/articulos"): ("articulos", _articulos),
+    ("GET", "/pasillo"): ("pasillo", _pasillo),
+    ("GET", "/pasillos"): ("pasillos", _pasillos),
+    ("GET", "/localizador"): ("localizador", _localizador),
+    ("GET", "/descripcion"): ("descripcion", _descripcion),
+    ("GET", "/buscar"): ("buscar", _buscar),
+    ("GET", "/diferencias"): ("diferencias", _diferencias),
+    ("POST", "/diferencias"): ("agregar_diferencia", _agregar_diferencia),
+    ("POST", "/diferencias/guardar"): ("guardar_diferencias", _guardar_diferencias),
+    ("GET", "/diferencias/analisis"): ("analisis_diferencias", _analisis_diferencias),
+}
+ManejadorConsultas.RUTAS_ESCRITURA = {("POST", "/diferencias"), ("POST", "/diferencias/guardar")}
+
+
+class ServidorInventario(ThreadingHTTPServer):
+    """Un hilo por conexión; todos usan el mismo inventario cargado (obtener_inventario ya
+    se puede usar desde varios hilos y recarga solo si el Excel cambió)"""
+    daemon_threads = True
+
+    def __init__(self, direccion, archivo_excel, solo_lectura=False):
+        super().__init__(direccion, ManejadorConsultas)
+        self.archivo_excel = archivo_excel
+        self.solo_lectura = solo_lectura
+
+
+def crear_servidor(archivo_excel, host=HOST_POR_DEFECTO, puerto=PUERTO_POR_DEFECTO, motor=None, solo_lectura=False):
+    """Carga el inventario (con el índice de descripciones) y arma el servidor, todavía sin atender.
+    server_address tiene el puerto real (puerto=0 elige uno libre).
+    solo_lectura=True rechaza anotar y guardar diferencias."""
+    inventario = obtener_inventario(archivo_excel, motor=motor)
+    inventario.indice_descripciones()
+    return ServidorInventario((host, puerto), archivo_excel, solo_lectura)
+
+
+def iniciar_servidor(archivo_excel, host=HOST_POR_DEFECTO, puerto=PUERTO_POR_DEFECTO, motor=None, solo_lectura=False):
+    """Como crear_servidor, pero ya atendiendo en un hilo aparte (servidor.shutdown() lo detiene)"""
+    servidor = crear_servidor(archivo_excel, host, puerto, motor, solo_lectura)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparte un inventario cargado con varias terminales por HTTP/JSON")
+    parser.add_argument("--archivo", required=True, help="Excel de stock (o historial.db::AAAA-MM-DD)")
+    parser.add_argument("--host", default=HOST_POR_DEFECTO,
+                        help="0.0.0.0 para atender a toda la red local (por defecto: solo esta PC). "
+                             "Sin clave: cualquiera en la red puede anotar y guardar diferencias en el Excel (ver --solo-lectura)")
+    parser.add_argument("--puerto", type=int, default=PUERTO_POR_DEFECTO)
+    parser.add_argument("--motor", choices=[MOTOR_POR_DEFECTO] + MOTORES, default=None, help="lector del Excel")
+    parser.add_argument("--solo-lectura", action="store_true", help="solo consultas: no se pueden anotar ni guardar diferencias")
+    args = parser.parse_args(argv)
+
+    try:
+        servidor = crear_servidor(args.archivo, args.host, args.puerto, args.motor, args.solo_lectura)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+
+    host, puerto = servidor.server_address[:2]
+    print(f"Inventario listo: {obtener_inventario(args.archivo).resumen()}")
+    print(f"Atendiendo en http://{host}:{puerto} (Ctrl+C para terminar)")
+    if args.host not in HOSTS_LOCALES and not args.solo_lectura:
+        print("Atención: cualquiera en la red puede anotar y guardar diferencias en el Excel (--solo-lectura para evitarlo)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        # Las diferencias que anotaron las terminales no quedan solo en el diario
+        try:
+            guardadas = guardar_diferencias(args.archivo)
+            if guardadas:
+                print(f"{guardadas} diferencias guardadas en el Excel")
+        except Exception as e:
+            print(f"Error: no se pudieron guardar las diferencias (quedan pendientes): {str(e)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
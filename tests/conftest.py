@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+from openpyxl import Workbook
+
+# Los módulos de la aplicación están sueltos en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENCABEZADO_STOCK = ["Localizador", "Artículo", "Desc Artículo", "En Mano", "UDM Primaria", "LPN"]
+
+
+@pytest.fixture(autouse=True)
+def carpeta_trabajo(tmp_path, monkeypatch):
+    # cache/, logs/, pdfs/ y los diarios se crean relativos a la carpeta actual
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def crear_libro(tmp_path):
+    """crear_libro(nombre, {hoja: [filas]}) -> ruta de un .xlsx con esas hojas (la primera fila es el encabezado)"""
+    def crear(nombre, hojas):
+        libro = Workbook()
+        libro.remove(libro.active)
+        for hoja, filas in hojas.items():
+            ws = libro.create_sheet(hoja)
+            for fila in filas:
+                ws.append(list(fila))
+        ruta = str(tmp_path / nombre)
+        libro.save(ruta)
+        return ruta
+    return crear
@@ -0,0 +1,40 @@
+from analisis_diferencias import analisis_diferencias, COLUMNAS_PASILLOS, COLUMNAS_ARTICULOS
+from diferencias import DiarioDiferencias, ENCABEZADOS_DIFERENCIAS
+from conftest import ENCABEZADO_STOCK
+
+
+def test_totales_por_pasillo_y_por_articulo_con_pendientes(crear_libro):
+    ruta = crear_libro("stock.xlsx", {
+        "Stock": [
+            ENCABEZADO_STOCK,
+            ["P01.001.1.1", "100", "Azúcar", 24, "UN", "LPN1"],
+            ["P01.002.1.1", "200", "Yerba", 5, "CJ", "LPN2"],
+            ["P02.001.1.1", "100", "Azúcar", 36, "UN", "LPN3"],
+            ["P02.002.1.1", "300", "Arroz", 4, "CJ", "LPN4"],
+        ],
+        "Conversiones": [["Artículo", "u x b"], ["100", 12]],
+        "Diferencias": [
+            ENCABEZADOS_DIFERENCIAS,
+            ["P01.001.1.1", "100", "Azúcar", 2, "LPN1", "FALTANTE"],
+            ["P01.002.1.1", "200", "Yerba", 5, "LPN2", "FALTANTE"],
+            # Anotada dos veces: cuenta una
+            ["P01.002.1.1", "200", "Yerba", 5, "LPN2", "FALTANTE"],
+        ],
+    })
+    # Pendiente de guardar y sin cantidad: se toman los bultos del stock (36 UN / 12 = 3)
+    DiarioDiferencias(ruta).agregar([["P02.001.1.1", "100", "Azúcar", None, "LPN3"]], "SOBRANTE")
+
+    analisis = analisis_diferencias(ruta)
+
+    assert analisis['pasillos'][COLUMNAS_PASILLOS].values.tolist() == [
+        ["P01", 2, 7, 2, 7, 0, 0, -7, 100.0, 100.0],
+        ["P02", 2, 7, 0, 0, 1, 3, 3, 50.0, 42.9],
+    ]
+    # De la mayor diferencia neta a la menor; las unidades usan Conversiones (sin conversión, 1 por bulto)
+    assert analisis['articulos'][COLUMNAS_ARTICULOS].values.tolist() == [
+        ["200", "Yerba", 5, 0, -5, -5, 1],
+        ["100", "Azúcar", 2, 3, 1, 12, 2],
+    ]
+    totales = analisis['totales']
+    assert (totales['filas_anotadas'], totales['filas_ignoradas'], totales['sin_guardar']) == (4, 1, 1)
+    assert (totales['bultos_faltantes'], totales['bultos_sobrantes'], totales['neto_bultos'], totales['neto_unidades']) == (7, 3, -4, 7)
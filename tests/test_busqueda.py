@@ -0,0 +1,42 @@
+import pandas as pd
+from busqueda import IndiceDescripciones
+
+
+def _indice():
+    return IndiceDescripciones(pd.DataFrame({
+        'Artículo': ["123456", "123499", "654321", "777123", "888888", "555555"],
+        'Desc Artículo': ["Azúcar 1Kg", "Azucarera plástica", "Yerba Mate 500g", "Harina 000 x 1kg", "Azul marino", "Arroz largo"],
+    }))
+
+
+def _articulos(resultados):
+    return [articulo for articulo, _ in resultados]
+
+
+def test_prefijo_de_palabra():
+    indice = _indice()
+    assert sorted(_articulos(indice.buscar("azu"))) == ["123456", "123499", "888888"]
+    # La palabra entera va antes que la que solo empieza así
+    assert _articulos(indice.buscar("azucar")) == ["123456", "123499"]
+
+
+def test_pedazo_de_palabra_por_trigramas():
+    indice = _indice()
+    assert sorted(_articulos(indice.buscar("ucar"))) == ["123456", "123499"]
+    assert _articulos(indice.buscar("1kg harin")) == ["777123"]
+
+
+def test_prefijo_de_codigo():
+    indice = _indice()
+    # 777123 tiene "123" en el medio del código: no cuenta
+    assert sorted(_articulos(indice.buscar("1234"))) == ["123456", "123499"]
+    assert _articulos(indice.buscar("65432")) == ["654321"]
+
+
+def test_termino_de_dos_letras_adentro_de_la_palabra():
+    indice = _indice()
+    assert sorted(_articulos(indice.buscar("er"))) == ["123499", "654321"]
+    # Si además empieza así, va primero
+    encontrados = _articulos(indice.buscar("ar"))
+    assert encontrados[0] == "555555"
+    assert sorted(encontrados[1:]) == ["123456", "123499", "777123", "888888"]
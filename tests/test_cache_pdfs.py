@@ -0,0 +1,77 @@
+import json
+import os
+import cache_pdfs
+from cache_pdfs import CachePdfs, CARPETA_RENDERS, ARCHIVO_MANIFIESTO
+from consultas import trabajos_pasillos
+from reportes import renderizar_pdfs
+from conftest import ENCABEZADO_STOCK
+
+
+def _leer(ruta):
+    with open(ruta, 'rb') as f:
+        return f.read()
+
+
+def _guardados(carpeta):
+    renders = os.path.join(carpeta, CARPETA_RENDERS)
+    return sorted(nombre[:-4] for nombre in os.listdir(renders) if nombre.endswith(".pdf"))
+
+
+def test_pdf_nuevo_encima_no_pisa_el_guardado(crear_libro, tmp_path):
+    carpeta = str(tmp_path / "pdfs")
+    hojas = {"Stock": [ENCABEZADO_STOCK, ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"]]}
+    ruta = crear_libro("stock.xlsx", hojas)
+    [ruta_pdf] = renderizar_pdfs(trabajos_pasillos(ruta, "P01", carpeta), 1, invariant=1)
+    [clave] = _guardados(carpeta)
+    ruta_guardado = os.path.join(carpeta, CARPETA_RENDERS, f"{clave}.pdf")
+    original = _leer(ruta_guardado)
+    # El PDF de siempre es un enlace al guardado
+    assert os.path.samefile(ruta_pdf, ruta_guardado)
+
+    # Otros datos con el mismo nombre de PDF, sin caché y con caché: el guardado sigue igual
+    hojas["Stock"][1][3] = 9
+    crear_libro("stock.xlsx", hojas)
+    renderizar_pdfs(trabajos_pasillos(ruta, "P01", carpeta), 1, invariant=1, cache=False)
+    assert _leer(ruta_pdf) != original
+    assert _leer(ruta_guardado) == original
+
+    hojas["Stock"][1][3] = 7
+    crear_libro("stock.xlsx", hojas)
+    renderizar_pdfs(trabajos_pasillos(ruta, "P01", carpeta), 1, invariant=1)
+    assert _leer(ruta_guardado) == original
+    assert len(_guardados(carpeta)) == 2 and _leer(ruta_pdf) != original
+
+
+def _registrar(carpeta, clave, tamanio):
+    ruta = os.path.join(carpeta, f"{clave}.pdf")
+    with open(ruta, 'wb') as f:
+        f.write(b"x" * tamanio)
+    with CachePdfs(carpeta) as cache:
+        cache.registrar(clave, ruta)
+
+
+def test_se_borran_los_menos_usados_por_cantidad(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_pdfs, "MAXIMO_RENDERS", 2)
+    carpeta = str(tmp_path)
+    for clave in ("a", "b", "c"):
+        _registrar(carpeta, clave, 10)
+    assert _guardados(carpeta) == ["b", "c"]
+
+    # Reutilizar "b" lo vuelve el más reciente: sale "c"
+    with CachePdfs(carpeta) as cache:
+        assert cache.reutilizar("b", os.path.join(carpeta, "b.pdf"))
+    _registrar(carpeta, "d", 10)
+    assert _guardados(carpeta) == ["b", "d"]
+    with open(os.path.join(carpeta, CARPETA_RENDERS, ARCHIVO_MANIFIESTO), encoding='utf-8') as f:
+        assert sorted(json.load(f)) == ["b", "d"]
+
+
+def test_se_borran_los_menos_usados_por_tamanio(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_pdfs, "LIMITE_RENDERS_BYTES", 2500)
+    carpeta = str(tmp_path)
+    for clave in ("a", "b", "c"):
+        _registrar(carpeta, clave, 1000)
+    assert _guardados(carpeta) == ["b", "c"]
+    # Uno más grande que el resto junto deja solo a ese
+    _registrar(carpeta, "d", 2400)
+    assert _guardados(carpeta) == ["d"]
@@ -0,0 +1,42 @@
+import pytest
+import comparacion
+from comparacion import comparar_inventarios, resumen_comparacion
+from inventario import obtener_inventario
+from conftest import ENCABEZADO_STOCK
+
+
+@pytest.fixture
+def inventarios(crear_libro):
+    comunes = [["P01.004.1.1", "5", "Fideos", 1, "CJ", "LPN5"]]
+    antes = crear_libro("antes.xlsx", {"Stock": [ENCABEZADO_STOCK] + comunes + [
+        ["P01.001.1.1", "1", "Azúcar", 5, "CJ", "LPN1"],
+        ["P01.002.1.1", "2", "Yerba", 3, "CJ", "LPN2"],
+        ["P01.003.1.1", "3", "Arroz", 4, "CJ", "LPN3"],
+    ]})
+    ahora = crear_libro("ahora.xlsx", {"Stock": [ENCABEZADO_STOCK] + comunes + [
+        ["P01.001.1.1", "1", "Azúcar", 7, "CJ", "LPN1"],
+        ["P02.005.1.1", "2", "Yerba", 3, "CJ", "LPN2"],
+        ["P03.001.1.1", "4", "Harina", 2, "CJ", "LPN4"],
+    ]})
+    return obtener_inventario(antes), obtener_inventario(ahora)
+
+
+ESPERADO = [
+    ["MOVIDO", "P02.005.1.1", "P01.002.1.1", "2", 3, 3, 0],
+    ["CANTIDAD", "P01.001.1.1", "", "1", 5, 7, 2],
+    ["AGREGADO", "P03.001.1.1", "", "4", 0, 2, 2],
+    ["QUITADO", "P01.003.1.1", "", "3", 4, 0, -4],
+]
+COLUMNAS = ["Estado", "Localizador", "Localizador Anterior", "Artículo", "Bultos Antes", "Bultos Ahora", "Diferencia"]
+
+
+def test_comparar_inventarios_clasifica_cada_cambio(inventarios):
+    comparacion_libros = comparar_inventarios(*inventarios)
+    assert comparacion_libros[COLUMNAS].astype(object).values.tolist() == ESPERADO
+    assert resumen_comparacion(comparacion_libros) == {"MOVIDO": 1, "CANTIDAD": 1, "AGREGADO": 1, "QUITADO": 1}
+
+
+def test_claves_que_no_entran_en_un_entero(inventarios, monkeypatch):
+    # Con muchas combinaciones posibles se numeran las que aparecen: mismo resultado
+    monkeypatch.setattr(comparacion, "MAXIMO_CLAVE", 10)
+    assert comparar_inventarios(*inventarios)[COLUMNAS].astype(object).values.tolist() == ESPERADO
@@ -0,0 +1,26 @@
+import consultas
+from consultas import obtener_datos_por_articulos
+from conftest import ENCABEZADO_STOCK
+
+
+def test_articulos_agrupados_en_el_orden_pedido(crear_libro):
+    ruta = crear_libro("stock.xlsx", {"Stock": [
+        ENCABEZADO_STOCK,
+        ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"],
+        ["P02.001.1.1", "2", "Yerba", 2, "CJ", "LPN2"],
+        ["P03.001.1.1", "1", "Azúcar", 3, "CJ", "LPN3"],
+    ]})
+    resultados, no_encontrados = obtener_datos_por_articulos(["2", "9", "1"], ruta)
+    assert list(resultados) == ["2", "1"]
+    assert [fila[3] for fila in resultados["1"]] == ["P01.001.1.1", "P03.001.1.1"]
+    assert no_encontrados == ["9"]
+
+
+def test_error_devuelve_los_articulos_pedidos(crear_libro, monkeypatch):
+    ruta = crear_libro("stock.xlsx", {"Stock": [ENCABEZADO_STOCK, ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"]]})
+
+    def contar(nombre, cantidad):
+        if nombre == "filas":
+            raise RuntimeError("falla después de agrupar")
+    monkeypatch.setattr(consultas, "contar", contar)
+    assert obtener_datos_por_articulos(["1", "2"], ruta) == ({}, ["1", "2"])
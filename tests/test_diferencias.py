@@ -0,0 +1,64 @@
+import json
+import os
+from openpyxl import load_workbook
+from diferencias import DiarioDiferencias, ENCABEZADOS_DIFERENCIAS
+from conftest import ENCABEZADO_STOCK
+
+STOCK = [ENCABEZADO_STOCK, ["P02.041.3.1", "123456", "AZUCAR 1KG", 24, "UN", "L1"]]
+PRIMERA = ["P02.041.3.1", "123456", "AZUCAR 1KG", "24", "L1", "FALTANTE"]
+SEGUNDA = ["P02.042.1.2", "654321", "YERBA 500G", "10", "L2", "SOBRANTE"]
+
+
+def _filas_hoja(ruta):
+    libro = load_workbook(ruta, read_only=True)
+    try:
+        return [["" if valor is None else str(valor) for valor in fila] for fila in libro["Diferencias"].iter_rows(min_row=2, values_only=True)]
+    finally:
+        libro.close()
+
+
+def _volcado_cortado(diario, filas_antes, filas):
+    # Lo que deja volcar() si la aplicación se corta antes de terminar
+    os.makedirs(os.path.dirname(diario.ruta_volcado), exist_ok=True)
+    with open(diario.ruta_volcado, 'w', encoding='utf-8') as f:
+        json.dump({"filas_antes": filas_antes, "filas": filas}, f)
+
+
+def test_volcado_cortado_antes_de_guardar_se_retoma(crear_libro):
+    ruta = crear_libro("stock.xlsx", {"Stock": STOCK, "Diferencias": [ENCABEZADOS_DIFERENCIAS]})
+    diario = DiarioDiferencias(ruta)
+    _volcado_cortado(diario, 1, [PRIMERA])
+    diario.agregar([SEGUNDA[:5]], "SOBRANTE")
+
+    # El Excel no llegó a guardarse: el lote cortado sigue pendiente, antes que lo anotado después
+    assert diario.filas_pendientes(1) == [PRIMERA, SEGUNDA]
+    assert diario.pendientes() == 2
+
+    assert diario.volcar() == 2
+    assert _filas_hoja(ruta) == [PRIMERA, SEGUNDA]
+    assert not os.path.exists(diario.ruta_volcado) and not os.path.exists(diario.ruta_diario)
+    assert diario.pendientes() == 0
+
+
+def test_volcado_ya_guardado_no_duplica_filas(crear_libro):
+    ruta = crear_libro("stock.xlsx", {"Stock": STOCK, "Diferencias": [ENCABEZADOS_DIFERENCIAS, PRIMERA]})
+    diario = DiarioDiferencias(ruta)
+    # Se cortó después de guardar el Excel, antes de borrar el volcado
+    _volcado_cortado(diario, 1, [PRIMERA])
+    assert diario.filas_pendientes(2) == []
+
+    diario.agregar([SEGUNDA[:5]], "SOBRANTE")
+    assert diario.filas_pendientes(2) == [SEGUNDA]
+    assert diario.volcar() == 1
+    assert _filas_hoja(ruta) == [PRIMERA, SEGUNDA]
+    assert not os.path.exists(diario.ruta_volcado) and not os.path.exists(diario.ruta_diario)
+
+
+def test_volcado_ya_guardado_sin_filas_nuevas_solo_borra_el_volcado(crear_libro):
+    ruta = crear_libro("stock.xlsx", {"Stock": STOCK, "Diferencias": [ENCABEZADOS_DIFERENCIAS, PRIMERA]})
+    diario = DiarioDiferencias(ruta)
+    _volcado_cortado(diario, 1, [PRIMERA])
+
+    assert diario.volcar() == 0
+    assert _filas_hoja(ruta) == [PRIMERA]
+    assert not os.path.exists(diario.ruta_volcado)
@@ -0,0 +1,63 @@
+import json
+from cli import main as cli_main
+from historial import importar_libro, listar_snapshots, historial_articulo, historial_localizador, ruta_snapshot
+from inventario import obtener_inventario
+from conftest import ENCABEZADO_STOCK
+
+COLUMNAS = ["Localizador", "Artículo", "Desc Artículo", "En Mano", "LPN", "En Mano Bultos"]
+
+
+def _valores(filas):
+    return filas[COLUMNAS].values.tolist()
+
+
+def test_importar_dos_libros_y_consultar_el_historial(crear_libro, tmp_path):
+    lunes = crear_libro("lunes.xlsx", {
+        "Stock": [ENCABEZADO_STOCK,
+                  ["P02.041.3.1", 123456, "AZUCAR 1KG", 24, "UN", "L1"],
+                  ["P02.042.1.2", 654321, "YERBA 500G", 10, "UN", "L2"]],
+        "Conversiones": [["Artículo", "U x B"], [123456, 12]],
+    })
+    martes = crear_libro("martes.xlsx", {
+        "Stock": [ENCABEZADO_STOCK,
+                  ["D35.010.2.1", 123456, "AZUCAR 1KG", 12, "UN", "L1"],
+                  ["P02.041.3.1", 654321, "YERBA 500G", 10, "UN", "L2"]],
+        "Conversiones": [["Artículo", "U x B"], [123456, 12]],
+    })
+    db = str(tmp_path / "h.db")
+
+    assert importar_libro(lunes, "2025-09-15", db) == 2
+    assert importar_libro(martes, "2025-09-16", db) == 2
+    assert [fecha for fecha, _, _ in listar_snapshots(db)] == ["2025-09-15", "2025-09-16"]
+
+    assert historial_articulo("123456", ruta_db=db) == [
+        ("2025-09-15", "P02.041.3.1", 24, "L1"),
+        ("2025-09-16", "D35.010.2.1", 12, "L1"),
+    ]
+    assert historial_articulo("123456", desde="2025-09-16", ruta_db=db) == [("2025-09-16", "D35.010.2.1", 12, "L1")]
+    assert [articulo for _, articulo, _, _ in historial_localizador("P02.041.3.1", ruta_db=db)] == ["123456", "654321"]
+
+    # El snapshot responde igual que el Excel del que salió
+    for fecha, ruta in [("2025-09-15", lunes), ("2025-09-16", martes)]:
+        snapshot = obtener_inventario(ruta_snapshot(fecha, db))
+        excel = obtener_inventario(ruta)
+        assert snapshot.origen.startswith("historial")
+        assert snapshot.unidades_por_bulto == excel.unidades_por_bulto
+        for articulo in ["123456", "654321"]:
+            assert _valores(snapshot.filas_por_articulo(articulo)) == _valores(excel.filas_por_articulo(articulo))
+        assert _valores(snapshot.filas_por_pasillo("P02")) == _valores(excel.filas_por_pasillo("P02"))
+
+
+def test_cli_importar_e_historial(crear_libro, tmp_path, capsys):
+    libro = crear_libro("stock.xlsx", {"Stock": [ENCABEZADO_STOCK, ["P02.041.3.1", 123456, "AZUCAR 1KG", 24, "UN", "L1"]]})
+    db = str(tmp_path / "h.db")
+
+    assert cli_main(["importar", libro, "--fecha", "2025-09-15", "--db", db]) == 0
+    assert json.loads(capsys.readouterr().out)["snapshots"] == ["2025-09-15"]
+
+    assert cli_main(["historial", "123456", "--db", db]) == 0
+    assert json.loads(capsys.readouterr().out)["historial"] == [
+        {"fecha": "2025-09-15", "localizador": "P02.041.3.1", "en_mano": 24, "lpn": "L1"}
+    ]
+
+    assert cli_main(["historial", "999999", "--db", db]) == 3
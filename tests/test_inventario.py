@@ -0,0 +1,276 @@
+import re
+import threading
+import zipfile
+import pandas as pd
+import pytest
+import inventario as modulo_inventario
+from inventario import (
+    normalizar_stock, obtener_inventario, huellas_hojas, elegir_motor, leer_hojas, armar_filtro_pasillos, _entero_chico
+)
+from consultas import obtener_datos_por_localizador
+from conftest import ENCABEZADO_STOCK
+
+
+def test_normalizar_stock_solo_quita_el_decimal_del_articulo():
+    stock = pd.DataFrame({
+        'Localizador': [' P02.041.3.0 '],
+        'Artículo': [426367.0],
+        'Desc Artículo': ['Azúcar'],
+        'En Mano': [10],
+        'UDM Primaria': ['CJ'],
+        'LPN': ['LPN10.0'],
+    })
+    normalizado = normalizar_stock(stock)
+    assert normalizado['Artículo'].tolist() == ['426367']
+    assert normalizado['Localizador'].tolist() == ['P02.041.3.0']
+    assert normalizado['LPN'].tolist() == ['LPN10.0']
+    assert normalizado['Error'].tolist() == ['']
+    assert normalizado['Subdivision'].tolist() == [0]
+
+
+def test_localizador_terminado_en_cero(crear_libro):
+    ruta = crear_libro("stock.xlsx", {"Stock": [
+        ENCABEZADO_STOCK,
+        ["P02.041.3.0", "426367", "Azúcar", 10, "CJ", "LPN1"],
+        ["P02.041.3.1", "426368", "Yerba", 5, "CJ", "LPN2"],
+    ]})
+    filas = obtener_datos_por_localizador("P02.041.3.0", ruta)
+    assert list(filas) == [("P02.041.3.0", "426367", "Azúcar", 10, "LPN1")]
+
+
+def test_en_mano_todo_vacio_no_corta_la_carga(crear_libro):
+    ruta = crear_libro("stock.xlsx", {"Stock": [
+        ENCABEZADO_STOCK,
+        ["P02.041.3.1", "426367", "Azúcar", None, "CJ", "LPN1"],
+        ["P02.042.3.1", "426368", "Yerba", None, "CJ", "LPN2"],
+    ]})
+    inventario = obtener_inventario(ruta)
+    assert inventario.stock['En Mano'].isna().all()
+    assert inventario.filas_con_error()['Error'].tolist() == ['En Mano inválido'] * 2
+    assert list(obtener_datos_por_localizador("P02.041.3.1", ruta)) == [("P02.041.3.1", "426367", "Azúcar", 0, "LPN1")]
+
+
+def test_entero_chico():
+    assert str(_entero_chico(pd.Series([pd.NA, pd.NA], dtype='Int64'), 'Int32').dtype) == 'Int32'
+    assert str(_entero_chico(pd.Series([1, 2**40], dtype='Int64'), 'Int32').dtype) == 'Int64'
+    assert str(_entero_chico(pd.Series([1, 2], dtype='int64'), 'int16').dtype) == 'int16'
+
+
+def test_elegir_motor_segun_la_extension(crear_libro, monkeypatch, capsys):
+    monkeypatch.setattr(modulo_inventario, "motor_disponible", lambda motor: True)
+    assert elegir_motor("openpyxl", "stock.xls") == "calamine"
+    assert elegir_motor("openpyxl", "stock.xlsx") == "openpyxl"
+
+    # Sin calamine, un .xls no puede ir a openpyxl: lo lee pandas con el lector que corresponda
+    monkeypatch.setattr(modulo_inventario, "motor_disponible", lambda motor: motor != "calamine")
+    assert elegir_motor("auto", "stock.xlsx") == "openpyxl_read_only"
+    assert elegir_motor("auto", "stock.XLS") is None
+    assert elegir_motor("openpyxl", "stock.xls") is None
+    assert "se usa el lector de pandas" in capsys.readouterr().out
+
+    ruta = crear_libro("stock.xlsx", {"Stock": [ENCABEZADO_STOCK, ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"]]})
+    assert leer_hojas(ruta, None)["Stock"]['Localizador'].tolist() == ["P01.001.1.1"]
+
+
+PASILLOS = ["P01", "P02", "P05", "P12", "D01", "D09", "D10", "D35", "PD1"]
+
+
+def _filtrados(filtro):
+    coincide = armar_filtro_pasillos(filtro)
+    return [pasillo for pasillo in PASILLOS if coincide(pasillo)]
+
+
+def test_filtro_de_pasillos_rangos_y_patrones():
+    assert _filtrados(None) == _filtrados("  ") == PASILLOS
+    assert _filtrados("D01-D10") == ["D01", "D09", "D10"]
+    # Sin repetir la letra, con guion largo, al revés o con espacios
+    assert _filtrados("d1-10") == _filtrados("D01–D10") == _filtrados("D10-D01") == _filtrados(" D01 - D10 ") == ["D01", "D09", "D10"]
+    # P y D mezclados: cada rango solo toma los de su letra
+    assert _filtrados("P*; D09-D35") == ["P01", "P02", "P05", "P12", "D09", "D10", "D35", "PD1"]
+    assert _filtrados("P01-P05, D35") == ["P01", "P02", "P05", "D35"]
+    assert _filtrados(["p02", "D3?"]) == ["P02", "D35"]
+    assert _filtrados("X99") == []
+
+
+@pytest.mark.parametrize("filtro", ["P01-D05", "D01-", "-D05", "P*-D*"])
+def test_filtro_de_pasillos_con_rango_invalido(filtro):
+    with pytest.raises(ValueError, match="Rango de pasillos inválido"):
+        armar_filtro_pasillos(filtro)
+
+
+def test_carga_fallida_no_deja_el_inventario_a_medias(crear_libro, monkeypatch):
+    hojas = {
+        "Stock": [ENCABEZADO_STOCK, ["P02.041.3.1", "426367", "Azúcar", 10, "UN", "LPN1"]],
+        "Conversiones": [["Artículo", "u x b"], ["426367", 5]],
+    }
+    ruta = crear_libro("stock.xlsx", hojas)
+    inventario = obtener_inventario(ruta)
+    assert inventario.stock['En Mano Bultos'].tolist() == [2]
+
+    # Cambia el stock y el armado de índices falla una vez
+    hojas["Stock"].append(["P02.042.3.1", "426368", "Yerba", 20, "UN", "LPN2"])
+    crear_libro("stock.xlsx", hojas)
+    convertir = modulo_inventario.convertir_a_bultos
+    monkeypatch.setattr(modulo_inventario, "convertir_a_bultos", lambda *args: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        inventario.cargar()
+    # Lo anterior queda entero y la próxima carga vuelve a intentar
+    assert inventario.firma is None
+    assert inventario.stock['En Mano Bultos'].tolist() == [2]
+    assert list(inventario.indice_articulos) == ['426367']
+
+    monkeypatch.setattr(modulo_inventario, "convertir_a_bultos", convertir)
+    inventario.cargar()
+    assert inventario.stock['En Mano Bultos'].tolist() == [2, 20]
+    assert list(obtener_datos_por_localizador("P02.042.3.1", ruta)) == [("P02.042.3.1", "426368", "Yerba", 20, "LPN2")]
+
+
+def test_recarga_no_mezcla_stock_e_indices(crear_libro):
+    hojas = {"Stock": [
+        ENCABEZADO_STOCK,
+        ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"],
+        ["P02.001.1.1", "2", "Yerba", 2, "CJ", "LPN2"],
+    ]}
+    ruta = crear_libro("stock.xlsx", hojas)
+    inventario = obtener_inventario(ruta)
+    grupos = inventario.grupos_por_pasillo()
+    assert next(grupos)[0] == "P01"
+
+    # Llega una recarga a mitad de la consulta: la consulta sigue con la carga que tomó
+    hojas["Stock"][1:] = [["P00.001.1.1", "3", "Arroz", 3, "CJ", "LPN3"]] + hojas["Stock"][1:]
+    crear_libro("stock.xlsx", hojas)
+    anteriores = inventario.datos
+    inventario.cargar()
+    assert inventario.datos is not anteriores
+    pasillo, filas = next(grupos)
+    assert pasillo == "P02" and filas['Artículo'].tolist() == ["2"]
+    assert [pasillo for pasillo, _ in inventario.grupos_por_pasillo()] == ["P00", "P01", "P02"]
+
+
+def test_indice_descripciones_no_espera_una_recarga(crear_libro):
+    ruta = crear_libro("stock.xlsx", {"Stock": [ENCABEZADO_STOCK, ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"]]})
+    inventario = obtener_inventario(ruta)
+    resultado = []
+    # Mientras otro hilo tiene tomada la carga del archivo, el índice se arma igual
+    with inventario._lock:
+        hilo = threading.Thread(target=lambda: resultado.append(inventario.indice_descripciones()))
+        hilo.start()
+        hilo.join(5)
+        assert not hilo.is_alive()
+    assert resultado[0].buscar("azucar", 5) == [("1", "Azúcar")]
+
+
+def test_solo_se_relee_la_hoja_que_cambio(crear_libro):
+    hojas = {
+        "Norte": [ENCABEZADO_STOCK, ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"]],
+        "Sur": [ENCABEZADO_STOCK, ["D01.001.1.1", "2", "Yerba", 2, "CJ", "LPN2"]],
+    }
+    ruta = crear_libro("stock.xlsx", hojas)
+    inventario = obtener_inventario(ruta)
+    assert inventario.hojas_leidas == ["Norte", "Sur"]
+
+    # Cambia solo un número de Sur: Norte sale de memoria
+    hojas["Sur"][1][3] = 5
+    crear_libro("stock.xlsx", hojas)
+    inventario.cargar()
+    assert inventario.hojas_leidas == ["Sur"]
+    assert inventario.filas_por_localizador("D01.001.1.1")['En Mano'].tolist() == [5]
+    assert inventario.filas_por_localizador("P01.001.1.1")['En Mano'].tolist() == [1]
+
+
+def _con_textos_compartidos(ruta):
+    """Pasa los textos del libro de openpyxl (en cada celda) a la tabla compartida, como los guarda Excel"""
+    with zipfile.ZipFile(ruta) as libro:
+        partes = {nombre: libro.read(nombre) for nombre in libro.namelist()}
+
+    textos = []
+
+    def compartir(celda):
+        texto = celda.group(2)
+        if texto not in textos:
+            textos.append(texto)
+        return b'<c r="%s" t="s"><v>%d</v></c>' % (celda.group(1), textos.index(texto))
+
+    for nombre in sorted(nombre for nombre in partes if nombre.startswith("xl/worksheets/")):
+        partes[nombre] = re.sub(rb'<c r="([A-Z]+\d+)" t="inlineStr"><is><t>(.*?)</t></is></c>', compartir, partes[nombre])
+    partes["xl/sharedStrings.xml"] = (
+        b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        + b"".join(b"<si><t>%s</t></si>" % texto for texto in textos) + b"</sst>"
+    )
+    partes["[Content_Types].xml"] = partes["[Content_Types].xml"].replace(
+        b"</Types>", b'<Override PartName="/xl/sharedStrings.xml" ContentType='
+                     b'"application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>')
+    partes["xl/_rels/workbook.xml.rels"] = partes["xl/_rels/workbook.xml.rels"].replace(
+        b"</Relationships>", b'<Relationship Id="rIdTextos" Target="sharedStrings.xml" Type='
+                             b'"http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"/></Relationships>')
+
+    with zipfile.ZipFile(ruta, "w", zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in partes.items():
+            libro.writestr(nombre, contenido)
+    return ruta
+
+
+def test_texto_nuevo_en_una_hoja_no_cambia_la_huella_de_las_demas(crear_libro):
+    hojas = {
+        "Norte": [ENCABEZADO_STOCK, ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"]],
+        "Diferencias": [["Localizador", "Estado"], ["P01.001.1.1", "FALTANTE"]],
+    }
+    ruta = _con_textos_compartidos(crear_libro("stock.xlsx", hojas))
+    antes = huellas_hojas(ruta)
+    inventario = obtener_inventario(ruta)
+    assert inventario.filas_por_localizador("P01.001.1.1")['Desc Artículo'].tolist() == ["Azúcar"]
+
+    # Un texto nuevo en Diferencias va al final de la tabla compartida: Norte sigue igual
+    hojas["Diferencias"].append(["P09.009.9.9", "SOBRANTE"])
+    despues = huellas_hojas(_con_textos_compartidos(crear_libro("stock.xlsx", hojas)))
+    assert despues["Norte"] == antes["Norte"]
+    assert despues["Diferencias"] != antes["Diferencias"]
+
+    # Mismo XML de Norte pero otro texto en el número que usa: la huella cambia
+    hojas["Norte"][1][2] = "Azucar"
+    cambiado = huellas_hojas(_con_textos_compartidos(crear_libro("stock.xlsx", hojas)))
+    assert cambiado["Norte"] != antes["Norte"]
+    inventario.cargar()
+    assert inventario.hojas_leidas == ["Norte"]
+    assert inventario.filas_por_localizador("P01.001.1.1")['Desc Artículo'].tolist() == ["Azucar"]
+
+
+def test_hojas_sin_cambios_salen_del_inventario_compactado(crear_libro):
+    hojas = {
+        "Norte": [ENCABEZADO_STOCK] + [[f"P01.{numero:03d}.1.1", str(numero), f"Artículo {numero}", numero, "UN", f"LPN{numero}"]
+                                       for numero in range(50)],
+        "Sur": [ENCABEZADO_STOCK, ["D01.001.1.1", "2", "Yerba", 2, "CJ", None]],
+        "Conversiones": [["Artículo", "u x b"], ["3", 2]],
+    }
+    ruta = crear_libro("stock.xlsx", hojas)
+    inventario = obtener_inventario(ruta)
+    # Del stock no queda otra copia aparte del inventario compactado: solo Conversiones
+    assert list(inventario.memoria()["hojas"]) == ["Conversiones"]
+    assert inventario.memoria()["bytes"] > sum(inventario.memoria()["columnas"].values())
+    # Y una hoja se vuelve a armar igual a como se leyó
+    leida = modulo_inventario.leer_hojas(ruta, inventario.motor_usado)["Norte"]
+    pd.testing.assert_frame_equal(inventario.hoja("Norte"), modulo_inventario.procesar_hoja("Norte", leida))
+
+    hojas["Sur"][1][3] = 5
+    crear_libro("stock.xlsx", hojas)
+    inventario.cargar()
+    assert inventario.hojas_leidas == ["Sur"]
+
+    # Lo mismo que leer el libro de cero
+    nuevo = modulo_inventario.InventarioStore(ruta).cargar(reconstruir_cache=True)
+    pd.testing.assert_frame_equal(inventario.stock, nuevo.stock)
+    assert inventario.stock['En Mano Bultos'].tolist()[:4] == [0, 1, 2, 1]
+
+
+def test_quedan_solo_los_ultimos_inventarios(crear_libro):
+    rutas = [crear_libro(f"stock{numero}.xlsx", {"Stock": [ENCABEZADO_STOCK, [f"P0{numero}.001.1.1", str(numero), "Azúcar", 1, "CJ", "LPN1"]]})
+             for numero in range(modulo_inventario.MAXIMO_INVENTARIOS + 1)]
+    primero = obtener_inventario(rutas[0])
+    for ruta in rutas[1:-1]:
+        obtener_inventario(ruta)
+    # El primero se volvió a usar: el que se suelta es el segundo
+    assert obtener_inventario(rutas[0]) is primero
+    obtener_inventario(rutas[-1])
+    cargados = [ruta for ruta in rutas if ruta in modulo_inventario._inventarios]
+    assert len(cargados) == modulo_inventario.MAXIMO_INVENTARIOS
+    assert rutas[0] in cargados and rutas[1] not in cargados
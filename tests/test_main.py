@@ -0,0 +1,100 @@
+import threading
+import main
+from main import TrabajadorFondo, seleccionar_archivo
+
+
+class EtiquetaFalsa:
+    """Lo que usa la aplicación de un ttk.Label / tk.Tk, sin ventana"""
+
+    def __init__(self):
+        self.texto = ""
+
+    def configure(self, text=None, **opciones):
+        if text is not None:
+            self.texto = text
+
+    config = configure
+
+    def cget(self, opcion):
+        return self.texto
+
+    def after(self, milisegundos, funcion=None):
+        pass
+
+    def pack(self, **opciones):
+        pass
+
+
+class VariableFalsa:
+    def __init__(self, valor=""):
+        self.valor = valor
+
+    def get(self):
+        return self.valor
+
+    def set(self, valor):
+        self.valor = valor
+
+
+def _esperar(trabajador):
+    # Sin ventana no corre root.after: se revisa la cola a mano hasta que la tarea termine
+    while trabajador.ocupado:
+        trabajador._revisar_cola()
+
+
+def test_cancelada_sin_hacer_nada():
+    etiqueta = EtiquetaFalsa()
+    trabajador = TrabajadorFondo(EtiquetaFalsa(), etiqueta)
+    terminadas = []
+
+    def tarea(progreso, cancelado):
+        trabajador.cancelar()
+        return None if cancelado.is_set() else "hecho"
+
+    trabajador.ejecutar(tarea, "Probando...", al_terminar=terminadas.append)
+    _esperar(trabajador)
+    assert etiqueta.texto == "Tarea cancelada" and terminadas == []
+
+
+def test_cancelada_cuando_ya_habia_terminado():
+    etiqueta = EtiquetaFalsa()
+    trabajador = TrabajadorFondo(EtiquetaFalsa(), etiqueta)
+
+    def tarea(progreso, cancelado):
+        # El PDF ya se escribió cuando llega la cancelación
+        trabajador.cancelar()
+        return "pdfs/Articulo1.pdf"
+
+    trabajador.ejecutar(tarea, "Probando...", al_terminar=lambda ruta: etiqueta.configure(text=f"✓ {ruta}"))
+    _esperar(trabajador)
+    assert etiqueta.texto == "✓ pdfs/Articulo1.pdf\n(Cancelado: esto ya estaba hecho)"
+
+
+def test_seleccionar_archivo_con_carga_en_curso(monkeypatch):
+    monkeypatch.setattr(main.filedialog, "askopenfilename", lambda **opciones: "nuevo.xlsx")
+    etiqueta = EtiquetaFalsa()
+    precarga = TrabajadorFondo(EtiquetaFalsa(), etiqueta)
+    liberar = threading.Event()
+    precarga.ejecutar(lambda progreso, cancelado: liberar.wait(5), "Leyendo archivo Excel...")
+
+    archivo_excel = VariableFalsa("anterior.xlsx")
+    lbl_archivo = EtiquetaFalsa()
+    seleccionar_archivo(archivo_excel, lbl_archivo, etiqueta, precarga)
+    liberar.set()
+    _esperar(precarga)
+    # Se rechazó: sigue el archivo de antes
+    assert archivo_excel.get() == "anterior.xlsx" and lbl_archivo.texto == ""
+
+
+def test_diferencia_que_no_se_anoto_muestra_error(monkeypatch):
+    errores = []
+    monkeypatch.setattr(main, "obtener_datos_por_localizador", lambda localizador, archivo: [("P02.041.3.1", "1", "Azúcar", 1, "LPN1")])
+    monkeypatch.setattr(main, "agregar_diferencia", lambda datos, estado, archivo: False)
+    monkeypatch.setattr(main.messagebox, "showerror", lambda titulo, mensaje: errores.append(mensaje))
+    etiqueta = EtiquetaFalsa()
+    trabajador = TrabajadorFondo(EtiquetaFalsa(), etiqueta)
+
+    main.agregar_diferencias(VariableFalsa("P02.041.3.1"), VariableFalsa("FALTANTE"), VariableFalsa("stock.xlsx"), etiqueta, trabajador)
+    _esperar(trabajador)
+    assert len(errores) == 1 and "No se pudo anotar" in errores[0]
+    assert "Diferencia agregada" not in etiqueta.texto
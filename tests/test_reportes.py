@@ -0,0 +1,42 @@
+import os
+from consultas import trabajos_pasillos, trabajos_articulos
+from reportes import renderizar_pdfs, contar_paginas
+from conftest import ENCABEZADO_STOCK
+
+
+def _stock():
+    # Tres pasillos, uno con varias páginas, y acentos en las descripciones
+    filas = [ENCABEZADO_STOCK]
+    for pasillo, cantidad in (("P01", 3), ("P02", 120), ("D01", 5)):
+        for numero in range(cantidad):
+            filas.append([f"{pasillo}.{numero // 4:03d}.{numero % 4 + 1}.1", str(1000 + numero),
+                          f"Artículo {numero} - azúcar ñandú", numero, "CJ", f"LPN{pasillo}{numero}"])
+    return {"Stock": filas}
+
+
+def test_renderizado_en_paralelo_igual_al_serial(crear_libro, tmp_path):
+    ruta = crear_libro("stock.xlsx", _stock())
+    trabajos = trabajos_pasillos(ruta) + trabajos_articulos(["1000", "1001", "9999"], ruta)
+    lotes = {}
+    for trabajadores in (1, 2):
+        carpeta = str(tmp_path / f"pdfs{trabajadores}")
+        lote = [(tipo, nombre, datos, carpeta) for tipo, nombre, datos, _ in trabajos]
+        rutas = renderizar_pdfs(lote, trabajadores, invariant=1, cache=False)
+        assert len(rutas) == len(trabajos)
+        lotes[trabajadores] = {os.path.basename(ruta): open(ruta, 'rb').read() for ruta in rutas}
+
+    assert lotes[1].keys() == lotes[2].keys()
+    for nombre, contenido in lotes[1].items():
+        assert contenido == lotes[2][nombre], nombre
+    assert contar_paginas(str(tmp_path / "pdfs1" / "pasilloP02.pdf")) > 1
+
+
+def test_pdf_de_la_cache_igual_al_dibujado(crear_libro, tmp_path):
+    ruta = crear_libro("stock.xlsx", _stock())
+    carpeta = str(tmp_path / "pdfs")
+    trabajos = trabajos_pasillos(ruta, "P*", carpeta)
+    dibujados = [open(ruta_pdf, 'rb').read() for ruta_pdf in renderizar_pdfs(trabajos, 1, invariant=1)]
+    # La segunda vez salen de la caché, con los mismos bytes
+    reutilizados = renderizar_pdfs(trabajos, 1, invariant=1)
+    assert [open(ruta_pdf, 'rb').read() for ruta_pdf in reutilizados] == dibujados
+    assert len(os.listdir(os.path.join(carpeta, ".renders"))) == len(trabajos) + 1
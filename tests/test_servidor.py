@@ -0,0 +1,61 @@
+import http.client
+import json
+import pytest
+import servidor
+from servidor import iniciar_servidor
+from conftest import ENCABEZADO_STOCK
+
+
+@pytest.fixture
+def abrir_servidor(crear_libro):
+    """abrir_servidor(**opciones) -> conexión HTTP a un servidor con un stock de prueba"""
+    servidores = []
+    conexiones = []
+
+    def abrir(**opciones):
+        ruta = crear_libro("stock.xlsx", {"Stock": [ENCABEZADO_STOCK, ["P01.001.1.1", "1", "Azúcar", 1, "CJ", "LPN1"]]})
+        srv = iniciar_servidor(ruta, puerto=0, **opciones)
+        servidores.append(srv)
+        conexion = http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=5)
+        conexiones.append(conexion)
+        return conexion
+
+    yield abrir
+    for conexion in conexiones:
+        conexion.close()
+    for srv in servidores:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _pedir(conexion, metodo, ruta, cuerpo=None, encabezados=None):
+    conexion.request(metodo, ruta, body=cuerpo, headers=encabezados or {})
+    respuesta = conexion.getresponse()
+    return respuesta, json.loads(respuesta.read().decode('utf-8'))
+
+
+def test_pedido_demasiado_grande_cierra_la_conexion(abrir_servidor, monkeypatch):
+    monkeypatch.setattr(servidor, "LARGO_MAXIMO_PEDIDO", 10)
+    conexion = abrir_servidor()
+    respuesta, datos = _pedir(conexion, "POST", "/articulos", json.dumps({"codigos": ["1", "2", "3"]}))
+    assert respuesta.status == 400 and datos["error"] == "Pedido demasiado grande"
+    # El cuerpo no se leyó: la conexión no puede seguir usándose
+    assert respuesta.getheader("Connection") == "close" and respuesta.will_close
+
+
+def test_ruta_inexistente_descarta_el_cuerpo(abrir_servidor):
+    conexion = abrir_servidor()
+    respuesta, _ = _pedir(conexion, "POST", "/no-existe", b'{"x": 1}')
+    assert respuesta.status == 404 and not respuesta.will_close
+    # La misma conexión sigue sirviendo
+    respuesta, datos = _pedir(conexion, "GET", "/articulo?codigo=1")
+    assert respuesta.status == 200 and datos["columnas"][0] == ["1"]
+
+
+def test_solo_lectura_no_anota_diferencias(abrir_servidor):
+    conexion = abrir_servidor(solo_lectura=True)
+    fila = ["P01.001.1.1", "1", "Azúcar", 1, "LPN1"]
+    respuesta, _ = _pedir(conexion, "POST", "/diferencias", json.dumps({"filas": [fila], "estado": "FALTANTE"}))
+    assert respuesta.status == 403
+    respuesta, datos = _pedir(conexion, "GET", "/diferencias")
+    assert respuesta.status == 200 and datos["pendientes"] == 0